@@ -0,0 +1,274 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple, NamedTuple
+import calendar
+import re
+
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'tues': 1, 'wednesday': 2, 'weds': 2,
+    'thursday': 3, 'thurs': 3, 'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
+    'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7, 'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9, 'october': 10, 'oct': 10, 'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+}
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+# Times used for parts of the day
+PARTS_OF_DAY = {
+    'morning': time(9), 'noon': time(12), 'afternoon': time(14),
+    'evening': time(18), 'tonight': time(20), 'midnight': time(23, 59)
+}
+
+def _alternation(words):
+    return '|'.join(sorted(words, key=len, reverse=True))
+
+# A single day; "every" marks a recurrence, not a due date
+DAY_GRAMMAR = rf'''
+    (?<!every\ )\b(?:
+        (?P<relative>day\ after\ tomorrow|today|tonight|tomorrow|tmrw)
+      | end\ of\ (?:the\ )?(?P<end_of>day|week|month|year)
+      | in\ (?P<in_count>\d+|{_alternation(NUMBER_WORDS)})\ (?P<in_unit>day|week|month)s?
+      | (?:(?P<weekend_modifier>this|next)\ )?(?P<weekend>weekend)
+      | (?:(?P<weekday_modifier>next|this|coming)\ )?(?P<weekday>{_alternation(WEEKDAYS)})
+      | (?P<period_modifier>next|this|coming)\ (?P<period>week|month|year)
+      | (?P<iso_year>\d{{4}})-(?P<iso_month>\d{{1,2}})-(?P<iso_day>\d{{1,2}})
+      | (?P<numeric_month>\d{{1,2}})/(?P<numeric_day>\d{{1,2}})(?:/(?P<numeric_year>\d{{2}}|\d{{4}}))?
+      | (?P<month>{_alternation(MONTHS)})\.?\ (?P<month_day>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\ (?P<month_year>\d{{4}}))?
+      | (?P<day_month>\d{{1,2}})(?:st|nd|rd|th)?\ (?:of\ )?(?P<day_month_name>{_alternation(MONTHS)})(?:,?\ (?P<day_month_year>\d{{4}}))?
+    )\b
+'''
+
+CLOCK = r'(?P<{0}hour>\d{{1,2}})(?::(?P<{0}minute>\d{{2}}))?\ ?(?:(?P<{0}meridiem>[ap])\.?m\b\.?)'
+
+# A time of day, or a range of times ("2-4pm", "between 2pm and 4:30pm")
+TIME_GRAMMAR = rf'''
+    (?<!every\ )\b(?:
+        (?P<range_hour>\d{{1,2}})(?::(?P<range_minute>\d{{2}}))?\ ?(?:(?P<range_meridiem>[ap])\.?m\.?)?
+        \ ?(?:-|–|to|until|till|and)\ ?{CLOCK.format('end_')}
+      | {CLOCK.format('')}
+      | (?P<clock_hour>\d{{1,2}}):(?P<clock_minute>\d{{2}})\b
+      | (?P<part>{_alternation(PARTS_OF_DAY)})\b
+    )
+'''
+
+# Joins two days into a range ("Jan 15-17", "Monday to Wednesday")
+RANGE_CONNECTOR = r'\ ?(?:-|–|to|through|thru|until|till|and)\ ?'
+
+class ResolvedDate(NamedTuple):
+    start: datetime
+    end: datetime
+    has_time: bool
+
+    def due(self) -> str:
+        """The deadline as stored on a task: the end of the range, with a time if one was given."""
+        return self.end.isoformat() if self.has_time else self.end.date().isoformat()
+
+class DateResolver:
+    """
+    Resolves due date phrases against a reference day.
+
+    Understands relative days ("tomorrow", "in 3 days", "next Friday", "this
+    weekend", "end of the month"), explicit dates ("2024-03-01", "3/14",
+    "March 14th, 2025", "14 March"), times of day ("4pm", "16:30", "tonight")
+    and ranges of either ("Jan 15-17", "Monday to Wednesday", "2-4pm"); a
+    range resolves to its end as the deadline.
+
+    The grammar is compiled once per resolver. Resolutions are memoized per
+    (phrase, reference day), so repeated phrases in bulk imports cost a dict
+    lookup after the first time.
+    """
+
+    def __init__(self, memo_size: int = 4096):
+        self.day_regex = re.compile(DAY_GRAMMAR, re.IGNORECASE | re.VERBOSE)
+        self.time_regex = re.compile(TIME_GRAMMAR, re.IGNORECASE | re.VERBOSE)
+        self.range_regex = re.compile(RANGE_CONNECTOR, re.IGNORECASE | re.VERBOSE)
+        self.day_number_regex = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\b')
+        self.resolve = lru_cache(maxsize=memo_size)(self._resolve)
+
+    def find(self, text: str, reference_date: date) -> Optional[ResolvedDate]:
+        """Resolve the first date and time mentioned anywhere in the text."""
+        phrase = self._extract_phrase(text)
+        return self.resolve(phrase.lower(), reference_date) if phrase else None
+
+    def _extract_phrase(self, text: str) -> str:
+        """The date (or date range) and time spans of the text, joined."""
+        spans = []
+
+        day_match = self.day_regex.search(text)
+        if day_match:
+            end = day_match.end()
+            connector = self.range_regex.match(text, end)
+            if connector:
+                range_end = (self.day_regex.match(text, connector.end())
+                             or self.day_number_regex.match(text, connector.end()))
+                if range_end:
+                    end = range_end.end()
+            spans.append(text[day_match.start():end])
+
+        time_match = self.time_regex.search(text)
+        if time_match and not (day_match and day_match.group('relative') == time_match.group(0)):
+            spans.append(time_match.group(0))
+
+        return ' '.join(spans)
+
+    def _resolve(self, phrase: str, reference_date: date) -> Optional[ResolvedDate]:
+        """Resolve a short date/time phrase such as an extracted span or a named entity."""
+        try:
+            start_day = end_day = None
+            day_match = self.day_regex.search(phrase)
+            if day_match:
+                start_day = end_day = self._resolve_day(day_match, reference_date)
+                connector = self.range_regex.match(phrase, day_match.end())
+                if connector:
+                    range_end = self.day_regex.match(phrase, connector.end())
+                    if range_end:
+                        end_day = self._resolve_day(range_end, reference_date)
+                    else:
+                        day_number = self.day_number_regex.match(phrase, connector.end())
+                        if day_number:
+                            end_day = start_day.replace(day=int(day_number.group(1)))
+                    if end_day < start_day:
+                        end_day = start_day
+
+            times = None
+            time_match = self.time_regex.search(phrase, day_match.end() if day_match else 0)
+            if time_match is None and day_match and day_match.group('relative') == 'tonight':
+                time_match = self.time_regex.search(phrase)
+            if time_match:
+                times = self._resolve_times(time_match)
+        except ValueError:
+            return None  # e.g. "2/30" or "25:00"
+
+        if start_day is None and times is None:
+            return None
+
+        start_day = start_day or reference_date
+        end_day = end_day or start_day
+        if times is None:
+            return ResolvedDate(datetime.combine(start_day, time()), datetime.combine(end_day, time()), False)
+
+        start_time, end_time = times
+        return ResolvedDate(datetime.combine(start_day, start_time), datetime.combine(end_day, end_time), True)
+
+    def _resolve_day(self, match: re.Match, today: date) -> date:
+        groups = match.groupdict()
+
+        if groups['relative']:
+            offsets = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'tmrw': 1, 'day after tomorrow': 2}
+            return today + timedelta(days=offsets[groups['relative'].lower()])
+
+        if groups['end_of']:
+            unit = groups['end_of'].lower()
+            if unit == 'day':
+                return today
+            if unit == 'week':
+                return max(today, today + timedelta(days=4 - today.weekday()))  # Friday
+            if unit == 'month':
+                return today.replace(day=calendar.monthrange(today.year, today.month)[1])
+            return today.replace(month=12, day=31)
+
+        if groups['in_unit']:
+            count = groups['in_count'].lower()
+            count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+            unit = groups['in_unit'].lower()
+            if unit == 'month':
+                return self._add_months(today, count)
+            return today + timedelta(days=count * (7 if unit == 'week' else 1))
+
+        if groups['weekend']:
+            saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+            if today.weekday() == 6:
+                saturday = today  # Already the weekend
+            if (groups['weekend_modifier'] or '').lower() == 'next':
+                saturday += timedelta(days=7)
+            return saturday
+
+        if groups['weekday']:
+            weekday = WEEKDAYS[groups['weekday'].lower()]
+            modifier = (groups['weekday_modifier'] or '').lower()
+            if modifier == 'next':
+                # The given day of next week
+                monday = today - timedelta(days=today.weekday())
+                return monday + timedelta(days=7 + weekday)
+            days_ahead = (weekday - today.weekday()) % 7
+            if days_ahead == 0 and modifier != 'this':
+                days_ahead = 7
+            return today + timedelta(days=days_ahead)
+
+        if groups['period']:
+            period = groups['period'].lower()
+            upcoming = groups['period_modifier'].lower() != 'this'
+            if period == 'week':
+                return today + timedelta(days=7) if upcoming else max(today, today + timedelta(days=4 - today.weekday()))
+            if period == 'month':
+                if upcoming:
+                    return self._add_months(today, 1)
+                return today.replace(day=calendar.monthrange(today.year, today.month)[1])
+            return today.replace(year=today.year + 1) if upcoming else today.replace(month=12, day=31)
+
+        if groups['iso_year']:
+            return date(int(groups['iso_year']), int(groups['iso_month']), int(groups['iso_day']))
+
+        if groups['numeric_month']:
+            year = groups['numeric_year']
+            if year and len(year) == 2:
+                year = '20' + year
+            return self._upcoming(today, int(groups['numeric_month']), int(groups['numeric_day']), year)
+
+        if groups['month']:
+            return self._upcoming(today, MONTHS[groups['month'].lower()], int(groups['month_day']),
+                                  groups['month_year'])
+
+        return self._upcoming(today, MONTHS[groups['day_month_name'].lower()], int(groups['day_month']),
+                              groups['day_month_year'])
+
+    @staticmethod
+    def _upcoming(today: date, month: int, day: int, year: Optional[str]) -> date:
+        """A month and day in the given year, or the next time it comes around."""
+        if year:
+            return date(int(year), month, day)
+        resolved = date(today.year, month, day)
+        return resolved if resolved >= today else date(today.year + 1, month, day)
+
+    @staticmethod
+    def _add_months(day: date, months: int) -> date:
+        month_index = day.month - 1 + months
+        year, month = day.year + month_index // 12, month_index % 12 + 1
+        return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+    @staticmethod
+    def _clock(hour: str, minute: Optional[str], meridiem: Optional[str]) -> time:
+        hour, minute = int(hour), int(minute or 0)
+        if meridiem:
+            if not 1 <= hour <= 12:
+                raise ValueError(f'invalid hour: {hour}')
+            hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+        return time(hour, minute)
+
+    def _resolve_times(self, match: re.Match) -> Tuple[time, time]:
+        groups = match.groupdict()
+
+        if groups['range_hour']:
+            end_time = self._clock(groups['end_hour'], groups['end_minute'], groups['end_meridiem'])
+            meridiem = groups['range_meridiem'] or groups['end_meridiem']
+            start_time = self._clock(groups['range_hour'], groups['range_minute'], meridiem)
+            if not groups['range_meridiem'] and start_time > end_time:
+                # "11-1pm" starts in the morning
+                start_time = self._clock(groups['range_hour'], groups['range_minute'], 'a')
+            return start_time, end_time
+
+        if groups['hour']:
+            clock = self._clock(groups['hour'], groups['minute'], groups['meridiem'])
+        elif groups['clock_hour']:
+            clock = self._clock(groups['clock_hour'], groups['clock_minute'], None)
+        else:
+            clock = PARTS_OF_DAY[groups['part'].lower()]
+        return clock, clock
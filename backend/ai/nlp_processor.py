@@ -1,8 +1,19 @@
-import spacy
-from datetime import datetime, timedelta
+from __future__ import annotations
+
+from datetime import datetime, date, timedelta
 import re
+import threading
 from enum import Enum
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Callable, NamedTuple, TYPE_CHECKING
+
+# spaCy (and the torch/thinc stack behind it) is only imported when a model is
+# first needed, so processes that never parse natural language never pay for it
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens import Doc
+
+from .date_resolver import DateResolver
+from .parse_cache import ParseCache
 
 class TaskCategory(Enum):
     WORK = 'Work'
@@ -11,10 +22,88 @@ class TaskCategory(Enum):
     HEALTH = 'Health'
     OTHER = 'Other'
 
+class ExtractorStage:
+    """
+    One step of the task parsing pipeline.
+    
+    `extract(text, doc, task_data)` returns the value for `field`. Stages that
+    read named entities set `needs_entities`; when no selected stage needs
+    them the text is only tokenized, not run through the statistical model.
+    """
+    
+    def __init__(self, field: str, extract: Callable[[str, Doc, Dict[str, Any]], Any], needs_entities: bool = False):
+        self.field = field
+        self.extract = extract
+        self.needs_entities = needs_entities
+    
+    def __repr__(self) -> str:
+        return f"ExtractorStage({self.field})"
+
+class KeywordMatcher:
+    """
+    Finds every known indicator phrase in a text in a single regex pass.
+    
+    All phrases are compiled once into one word-bounded alternation, longest
+    phrase first so that e.g. "not urgent" wins over "urgent". Each phrase
+    maps to the (kind, value) tags it stands for.
+    """
+    
+    def __init__(self, tags_by_phrase: Dict[str, List[Tuple[str, Any]]]):
+        self.tags_by_phrase = {phrase.lower(): tags for phrase, tags in tags_by_phrase.items()}
+        alternation = '|'.join(
+            re.escape(phrase) for phrase in sorted(self.tags_by_phrase, key=len, reverse=True)
+        )
+        self.pattern = re.compile(r'\b(?:' + alternation + r')\b', re.IGNORECASE)
+    
+    def find(self, text: str) -> List[Tuple[str, Any]]:
+        """Return the (kind, value) tags of every phrase found, in text order."""
+        return [
+            tag
+            for match in self.pattern.finditer(text)
+            for tag in self.tags_by_phrase[match.group(0).lower()]
+        ]
+    
+    def remove(self, text: str) -> str:
+        """Strip every known phrase from the text."""
+        return self.pattern.sub('', text)
+
+class RuleToken(NamedTuple):
+    text: str
+    lower_: str
+
+class RuleDoc:
+    """
+    Stand-in for a spaCy Doc when parsing without the model.
+    
+    Tokens are split with a regex and there are no named entities, which is
+    all the rule-based extractors read.
+    """
+    
+    TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)?|[^\w\s]")
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = [RuleToken(match.group(0), match.group(0).lower()) for match in self.TOKEN_PATTERN.finditer(text)]
+        self.ents = ()
+        self.user_data = {}
+    
+    def __iter__(self):
+        return iter(self.tokens)
+    
+    def __len__(self) -> int:
+        return len(self.tokens)
+
 class NLPProcessor:
-    def __init__(self):
-        # Load the English language model
-        self.nlp = spacy.load("en_core_web_sm")
+    # Pipeline components none of the extractors use
+    DISABLED_COMPONENTS = ['tagger', 'parser', 'attribute_ruler', 'lemmatizer']
+    
+    MODEL_NAME = "en_core_web_sm"
+    
+    def __init__(self, cache: Optional[ParseCache] = None):
+        # The language model is loaded lazily, see the `nlp` property
+        self._nlp = None
+        self._load_lock = threading.Lock()
+        self.cache = cache
         
         # Keywords for task categories
         self.category_keywords = {
@@ -42,22 +131,245 @@ class NLPProcessor:
         
         # Duration patterns (in minutes)
         self.duration_patterns = [
-            (r'(\d+)\s*(minute|min)\b', 1),  # 30 min, 30minute
-            (r'(\d+)\s*(hour|hr)\b', 60),    # 1 hour, 2hr
-            (r'(\d+)\s*(day|days)\b', 1440)  # 1 day (in minutes)
+            (r'(?<!in )(\d+)\s*(minute|min)s?\b', 1),  # 30 min, 30minutes
+            (r'(?<!in )(\d+)\s*(hour|hr)s?\b', 60),    # 1 hour, 2hrs
+            (r'(?<!in )(\d+)\s*(day|days)\b', 1440)    # 1 day (in minutes); "in 3 days" is a due date
+        ]
+        
+        # Matchers compiled once so each parse is a single pass over the text
+        priority_values = {'high': 3, 'medium': 2, 'low': 1}
+        tags_by_phrase = {}
+        for priority, indicators in self.priority_indicators.items():
+            for indicator in indicators:
+                tags_by_phrase.setdefault(indicator, []).append(('priority', priority_values[priority]))
+        for level, indicators in self.energy_indicators.items():
+            for indicator in indicators:
+                tags_by_phrase.setdefault(indicator, []).append(('energy', level))
+        self.indicator_matcher = KeywordMatcher(tags_by_phrase)
+        
+        self.category_by_keyword = {
+            keyword: category
+            for category, keywords in self.category_keywords.items()
+            for keyword in keywords
+        }
+        
+        self.duration_regexes = [
+            (re.compile(pattern, re.IGNORECASE), multiplier)
+            for pattern, multiplier in self.duration_patterns
         ]
+        self.duration_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern, _ in self.duration_patterns), re.IGNORECASE
+        )
+        
+        # Compiled date grammar shared by both tiers
+        self.date_resolver = DateResolver()
+        
+        # Date-like words; only texts containing one of these that the date
+        # grammar couldn't resolve are sent through the statistical model
+        self.date_hint_regex = re.compile(
+            r'\b(?:'
+            r'mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?'
+            r'|jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+            r'|sep(?:t|tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?'
+            r'|weekend|tonight|noon|midnight|morning|afternoon|evening'
+            r'|(?:next|this|coming) (?:month|year)|end of (?:the )?(?:day|week|month)'
+            r'|in \d+ (?:days?|weeks?|months?)'
+            r'|\d{1,2}(?:st|nd|rd|th)|\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?|\d{1,2}(?::\d{2})?\s*[ap]\.?m\b'
+            r')\b',
+            re.IGNORECASE
+        )
+        
+        # Extractors run in order on a single Doc; the title is cleaned last
+        self.stages = [
+            ExtractorStage('due_date', self._extract_due_date, needs_entities=True),
+            ExtractorStage('estimated_duration', self._extract_duration),
+            ExtractorStage('priority', self._extract_priority),
+            ExtractorStage('energy_level', self._extract_energy_level),
+            ExtractorStage('category', self._determine_category),
+            ExtractorStage('title', self._clean_title)
+        ]
+        
+        # Replaces the entity-based date stage in the rule tier
+        self.rule_date_stage = ExtractorStage('due_date', self._extract_due_date_rules)
+    
+    @property
+    def nlp(self) -> Language:
+        """The spaCy pipeline, loaded on first use."""
+        if self._nlp is None:
+            self.load()
+        return self._nlp
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._nlp is not None
     
-    def parse_task(self, text: str) -> Dict[str, Any]:
+    def load(self) -> None:
+        """Load the English language model now (only the tokenizer and NER are needed)."""
+        with self._load_lock:
+            if self._nlp is None:
+                import spacy
+                self._nlp = spacy.load(self.MODEL_NAME, disable=self.DISABLED_COMPONENTS)
+    
+    def add_stage(self, stage: ExtractorStage, before: Optional[str] = None) -> None:
+        """Add an extractor stage, at the end or before the stage for the given field."""
+        if before is None:
+            self.stages.append(stage)
+            return
+        
+        position = next(i for i, existing in enumerate(self.stages) if existing.field == before)
+        self.stages.insert(position, stage)
+    
+    def parse(self, text: str, fields: Optional[List[str]] = None,
+              reference_date: Optional[date] = None) -> Tuple[Dict[str, Any], str]:
         """
-        Parse natural language text into a structured task.
+        Parse natural language text into a structured task, using the model only when needed.
+        
+        The compiled rules run first. The text only goes through spaCy when it
+        contains date-like words the rules could not resolve.
         
         Args:
             text: Natural language task description (e.g., "Study for math exam tomorrow, high priority, 2 hours")
+            fields: Only run the extractors for these fields (defaults to all)
+            reference_date: Day relative dates are resolved against (defaults to today)
             
         Returns:
-            Dict containing structured task information
+            The task dict and the tier that produced it: "cache", "rules" or "model"
+        """
+        reference_date = reference_date or date.today()
+        key = ParseCache.make_key(text, reference_date, fields) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, 'cache'
+        
+        task_data, needs_model = self.parse_rule_tier(text, fields, reference_date)
+        tier = 'rules'
+        if needs_model:
+            task_data = self.parse_task_model(text, fields, reference_date)
+            tier = 'model'
+        
+        if key:
+            self.cache.set(key, task_data)
+        return task_data, tier
+    
+    def parse_task(self, text: str, fields: Optional[List[str]] = None,
+                   reference_date: Optional[date] = None) -> Dict[str, Any]:
+        """Parse natural language text into a structured task (see `parse`)."""
+        return self.parse(text, fields, reference_date)[0]
+    
+    def parse_rule_tier(self, text: str, fields: Optional[List[str]] = None,
+                        reference_date: Optional[date] = None) -> Tuple[Dict[str, Any], bool]:
         """
-        doc = self.nlp(text.lower())
+        Parse with the compiled rules only, without loading the model.
+        
+        Returns:
+            The task dict, and whether the model is still needed: the text has
+            date-like words the rules couldn't resolve, or a custom stage reads
+            named entities
+        """
+        reference_date = reference_date or date.today()
+        selected = [stage for stage in self.stages if fields is None or stage.field in fields]
+        stages = [
+            self.rule_date_stage if stage.field == 'due_date' else stage
+            for stage in selected
+            if stage.field == 'due_date' or not stage.needs_entities
+        ]
+        task_data = self._run_stages(text, RuleDoc(text), stages, reference_date)
+        
+        needs_model = any(stage.needs_entities and stage.field != 'due_date' for stage in selected)
+        if any(stage.field == 'due_date' for stage in selected) and task_data['due_date'] is None:
+            needs_model = needs_model or bool(self.date_hint_regex.search(text))
+        
+        return task_data, needs_model
+    
+    def parse_task_rules(self, text: str, fields: Optional[List[str]] = None,
+                         reference_date: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Parse with the rule tier only, whatever the text contains.
+        
+        Used as the fallback when model parsing is unavailable or busy;
+        results are not cached so the full parse can replace them later.
+        """
+        return self.parse_rule_tier(text, fields, reference_date)[0]
+    
+    def parse_task_model(self, text: str, fields: Optional[List[str]] = None,
+                         reference_date: Optional[date] = None) -> Dict[str, Any]:
+        """Parse with every extractor on a spaCy Doc, bypassing the rule tier and the cache."""
+        stages = [stage for stage in self.stages if fields is None or stage.field in fields]
+        
+        # Process the text once; skip the statistical model if no stage reads entities
+        if any(stage.needs_entities for stage in stages):
+            doc = self.nlp(text)
+        else:
+            doc = self.nlp.make_doc(text)
+        
+        return self._run_stages(text, doc, stages, reference_date or date.today())
+    
+    def parse_many(self, texts: List[str], batch_size: int = 64, n_process: int = 1,
+                   fields: Optional[List[str]] = None,
+                   reference_date: Optional[date] = None) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Parse many task descriptions at once.
+        
+        Each text goes through the rule tier first. The ones that still need
+        the model are streamed through `nlp.pipe`, which batches them through
+        the model (optionally across `n_process` worker processes) instead of
+        running the pipeline once per text.
+        
+        Returns:
+            One (task dict, tier) pair per text, in input order
+        """
+        reference_date = reference_date or date.today()
+        results = [None] * len(texts)
+        keys = [None] * len(texts)
+        pending = []
+        
+        for i, text in enumerate(texts):
+            if self.cache:
+                keys[i] = ParseCache.make_key(text, reference_date, fields)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    results[i] = (cached, 'cache')
+                    continue
+            
+            task_data, needs_model = self.parse_rule_tier(text, fields, reference_date)
+            if needs_model:
+                pending.append(i)
+                continue
+            
+            results[i] = (task_data, 'rules')
+            if self.cache:
+                self.cache.set(keys[i], task_data)
+        
+        if not pending:
+            return results
+        
+        parsed = self.parse_tasks_model([texts[i] for i in pending], fields, reference_date, batch_size, n_process)
+        for i, task_data in zip(pending, parsed):
+            results[i] = (task_data, 'model')
+            if self.cache:
+                self.cache.set(keys[i], task_data)
+        
+        return results
+    
+    def parse_tasks(self, texts: List[str], batch_size: int = 64, n_process: int = 1,
+                    fields: Optional[List[str]] = None,
+                    reference_date: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Parse many task descriptions at once (see `parse_many`)."""
+        return [task_data for task_data, _ in self.parse_many(texts, batch_size, n_process, fields, reference_date)]
+    
+    def parse_tasks_model(self, texts: List[str], fields: Optional[List[str]] = None,
+                          reference_date: Optional[date] = None, batch_size: int = 64,
+                          n_process: int = 1) -> List[Dict[str, Any]]:
+        """Parse many texts with one `nlp.pipe` call, bypassing the rule tier and the cache."""
+        reference_date = reference_date or date.today()
+        stages = [stage for stage in self.stages if fields is None or stage.field in fields]
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        return [self._run_stages(text, doc, stages, reference_date) for text, doc in zip(texts, docs)]
+    
+    def _run_stages(self, text: str, doc: Doc, stages: List[ExtractorStage],
+                    reference_date: date) -> Dict[str, Any]:
+        doc.user_data['reference_date'] = reference_date
         
         # Initialize task with defaults
         task_data = {
@@ -70,121 +382,77 @@ class NLPProcessor:
             'due_date': None
         }
         
-        # Extract due date
-        task_data['due_date'] = self._extract_due_date(text)
-        
-        # Extract duration
-        task_data['estimated_duration'] = self._extract_duration(text)
-        
-        # Extract priority
-        task_data['priority'] = self._extract_priority(text)
-        
-        # Extract energy level
-        task_data['energy_level'] = self._extract_energy_level(text)
-        
-        # Determine category
-        task_data['category'] = self._determine_category(text).value
-        
-        # Clean up title (remove extracted metadata)
-        task_data['title'] = self._clean_title(text, task_data)
+        for stage in stages:
+            task_data[stage.field] = stage.extract(text, doc, task_data)
         
         return task_data
     
-    def _extract_due_date(self, text: str) -> Optional[str]:
-        """Extract due date from text using NLP."""
-        doc = self.nlp(text)
-        today = datetime.now()
-        
-        for ent in doc.ents:
-            if ent.label_ == "DATE" or ent.label_ == "TIME":
-                try:
-                    # Try to parse the date
-                    if "tomorrow" in ent.text.lower():
-                        return (today + timedelta(days=1)).strftime('%Y-%m-%d')
-                    elif "today" in ent.text.lower():
-                        return today.strftime('%Y-%m-%d')
-                    elif "next week" in ent.text.lower():
-                        return (today + timedelta(weeks=1)).strftime('%Y-%m-%d')
-                    # Add more date patterns as needed
-                except:
-                    continue
+    def _extract_due_date(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> Optional[str]:
+        """Extract due date from the named entities of the parsed text."""
+        phrases = [ent.text for ent in doc.ents if ent.label_ in ('DATE', 'TIME')]
+        if not phrases:
+            return None
         
-        return None
+        resolved = self.date_resolver.resolve(' '.join(phrases).lower(), doc.user_data['reference_date'])
+        return resolved.due() if resolved else None
+    
+    def _extract_due_date_rules(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> Optional[str]:
+        """Extract due date with the date grammar alone, without the model."""
+        resolved = self.date_resolver.find(text, doc.user_data['reference_date'])
+        return resolved.due() if resolved else None
     
-    def _extract_duration(self, text: str) -> int:
+    def _extract_duration(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> int:
         """Extract estimated duration in minutes."""
-        for pattern, multiplier in self.duration_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    value = int(match.group(1))
-                    return value * multiplier
-                except (ValueError, IndexError):
-                    continue
+        for regex, multiplier in self.duration_regexes:
+            match = regex.search(text)
+            if match:
+                return int(match.group(1)) * multiplier
         
         return 30  # Default to 30 minutes if no duration found
     
-    def _extract_priority(self, text: str) -> int:
+    def _indicators(self, text: str, doc: Doc) -> List[Tuple[str, Any]]:
+        """Priority and energy indicators in the text, found once per Doc and shared by the extractors."""
+        if 'indicators' not in doc.user_data:
+            doc.user_data['indicators'] = self.indicator_matcher.find(text)
+        return doc.user_data['indicators']
+    
+    def _extract_priority(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> int:
         """Extract task priority (1-3)."""
-        text_lower = text.lower()
-        
-        # Check for high priority indicators
-        for indicator in self.priority_indicators['high']:
-            if indicator in text_lower:
-                return 3
-        
-        # Check for low priority indicators
-        for indicator in self.priority_indicators['low']:
-            if indicator in text_lower:
-                return 1
+        priorities = {value for kind, value in self._indicators(text, doc) if kind == 'priority'}
         
-        # Default to medium priority
+        # High priority indicators win over low ones; default to medium priority
+        if 3 in priorities:
+            return 3
+        if 1 in priorities:
+            return 1
         return 2
     
-    def _extract_energy_level(self, text: str) -> int:
+    def _extract_energy_level(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> int:
         """Extract energy level (1-5)."""
-        text_lower = text.lower()
+        levels = [value for kind, value in self._indicators(text, doc) if kind == 'energy']
         
-        # Check energy level indicators
-        for level, indicators in self.energy_indicators.items():
-            for indicator in indicators:
-                if indicator in text_lower:
-                    return level
-        
-        # Default to medium energy
-        return 3
+        # The lightest level mentioned wins; default to medium energy
+        return min(levels) if levels else 3
     
-    def _determine_category(self, text: str) -> TaskCategory:
+    def _determine_category(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> str:
         """Determine the most likely task category."""
-        doc = self.nlp(text.lower())
         category_scores = {cat: 0 for cat in TaskCategory}
         
         # Score each category based on keyword matches
         for token in doc:
-            for category, keywords in self.category_keywords.items():
-                if token.text in keywords:
-                    category_scores[category] += 1
+            category = self.category_by_keyword.get(token.lower_)
+            if category:
+                category_scores[category] += 1
         
         # Return the category with the highest score, default to OTHER
-        return max(category_scores.items(), key=lambda x: x[1])[0] if max(category_scores.values()) > 0 else TaskCategory.OTHER
+        category = max(category_scores.items(), key=lambda x: x[1])[0] if max(category_scores.values()) > 0 else TaskCategory.OTHER
+        return category.value
     
-    def _clean_title(self, text: str, task_data: Dict[str, Any]) -> str:
+    def _clean_title(self, text: str, doc: Doc, task_data: Dict[str, Any]) -> str:
         """Remove extracted metadata from the title."""
-        title = text.strip()
-        
-        # Remove priority indicators
-        for priority, indicators in self.priority_indicators.items():
-            for indicator in indicators:
-                title = re.sub(r'\b' + re.escape(indicator) + r'\b', '', title, flags=re.IGNORECASE)
-        
-        # Remove energy level indicators
-        for level, indicators in self.energy_indicators.items():
-            for indicator in indicators:
-                title = re.sub(r'\b' + re.escape(indicator) + r'\b', '', title, flags=re.IGNORECASE)
-        
-        # Remove duration patterns
-        for pattern, _ in self.duration_patterns:
-            title = re.sub(pattern, '', title, flags=re.IGNORECASE)
+        # Remove priority and energy level indicators, then duration patterns
+        title = self.indicator_matcher.remove(text.strip())
+        title = self.duration_regex.sub('', title)
         
         # Remove extra whitespace and punctuation
         title = re.sub(r'[\s,;]+', ' ', title).strip()
@@ -192,6 +460,18 @@ class NLPProcessor:
         
         return title if title else text.strip()
 
+_processor = None
+_processor_lock = threading.Lock()
+
+def get_nlp_processor() -> NLPProcessor:
+    """Process-wide NLPProcessor; the model inside it is still loaded on first parse."""
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                _processor = NLPProcessor()
+    return _processor
+
 # Example usage
 if __name__ == "__main__":
     nlp_processor = NLPProcessor()
@@ -0,0 +1,359 @@
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_right
+import math
+import random
+import time as clock
+
+from .scheduler import Scheduler, TimeBlock
+
+# Default energy available at each hour of the day (1-5 scale):
+# a morning peak, a post-lunch dip and a smaller late-afternoon peak.
+DEFAULT_ENERGY_CURVE = {
+    6: 2, 7: 3, 8: 4, 9: 4, 10: 5, 11: 5, 12: 4, 13: 3, 14: 2, 15: 3,
+    16: 4, 17: 4, 18: 3, 19: 3, 20: 2, 21: 2, 22: 1, 23: 1
+}
+
+class ScheduleOptimizer:
+    """
+    Anytime local-search scheduler that respects deadlines and energy levels.
+
+    The greedy placement from `Scheduler` is used as a warm start. Tasks are
+    then relocated and swapped between work blocks for as long as the time
+    budget allows, keeping the best schedule found so far. The cost of a
+    schedule is the sum of per-task penalties for missing the due date,
+    working against the user's energy curve, being scheduled late in the
+    horizon and not being scheduled at all.
+    """
+
+    LATE_WEIGHT = 10.0          # per priority point and hour past the due date
+    ENERGY_WEIGHT = 2.0         # per point of energy mismatch
+    DELAY_WEIGHT = 0.5          # per priority point and day from the start of the horizon
+    UNSCHEDULED_WEIGHT = 500.0  # per priority point for a task left out
+    CHECK_EVERY = 64            # iterations between wall-clock checks
+    FINISH_RESERVE = 0.1        # share of the budget kept for building the result
+
+    def __init__(self, scheduler: Scheduler, time_budget_ms: int = 200,
+                 energy_curve: Optional[Dict[int, int]] = None, seed: Optional[int] = None):
+        self.scheduler = scheduler
+        self.time_budget_ms = time_budget_ms
+        self.energy_curve = energy_curve or DEFAULT_ENERGY_CURVE
+        self.random = random.Random(seed)
+
+    def optimize(self, tasks: List[Dict[str, Any]],
+                 start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """
+        Create an optimized schedule for the given tasks within the date range.
+
+        Args:
+            tasks: List of task dictionaries
+            start_date: Start datetime for scheduling
+            end_date: End datetime for scheduling
+
+        Returns:
+            Dict with the schedule (same entries as `Scheduler.create_schedule`)
+            and statistics: final cost, lower bound, optimality gap, number of
+            iterations and elapsed time
+        """
+        started = clock.perf_counter()
+        deadline = started + self.time_budget_ms / 1000 * (1 - self.FINISH_RESERVE)
+
+        slots = self.scheduler._create_free_slots(start_date.date(), end_date.date())
+        self._blocks = [(block.start_time, block.duration) for block in slots.blocks]
+        self._block_starts = [start for start, _ in self._blocks]
+        self._horizon_start = self._block_starts[0] if self._blocks else start_date
+        self._tasks = tasks
+        self._durations = [task.get('estimated_duration', 30) for task in tasks]
+        self._due_dates = [self._parse_due_date(task) for task in tasks]
+
+        # Warm start from the greedy schedule
+        sorted_tasks = self.scheduler._order_tasks(tasks, start_date)
+        placements = self.scheduler._place_tasks(slots, sorted_tasks)
+        index_of = {id(task): i for i, task in enumerate(tasks)}
+
+        assignment = [[] for _ in self._blocks]
+        for placement in placements:
+            block_index = bisect_right(self._block_starts, placement.start_time) - 1
+            assignment[block_index].append(index_of[id(placement.task)])
+
+        block_costs = [self._block_cost(b, assignment[b]) for b in range(len(assignment))]
+        unscheduled = set(range(len(tasks))) - {i for block in assignment for i in block}
+        cost = sum(block_costs) + sum(self._unscheduled_cost(i) for i in unscheduled)
+
+        best_cost = cost
+        best_assignment = [list(block) for block in assignment]
+        iterations = 0
+
+        # The bound doesn't depend on the search, so it is charged to the budget
+        # up front and only the final pack falls in FINISH_RESERVE
+        lower_bound = self._lower_bound()
+
+        # Local search until the time budget runs out
+        if assignment and tasks and clock.perf_counter() < deadline:
+            while True:
+                iterations += 1
+                if iterations % self.CHECK_EVERY == 0 and clock.perf_counter() >= deadline:
+                    break
+
+                if self.random.random() < 0.5:
+                    delta = self._try_relocate(assignment, block_costs, unscheduled, deadline, started)
+                else:
+                    delta = self._try_swap(assignment, block_costs, deadline, started)
+                if delta is None:
+                    continue
+
+                cost += delta
+                if cost < best_cost - 1e-9:
+                    best_cost = cost
+                    best_assignment = [list(block) for block in assignment]
+
+        schedule = []
+        for block_index, task_indexes in enumerate(best_assignment):
+            for task_index, start, end in self._pack(block_index, task_indexes):
+                schedule.append(self.scheduler._to_schedule_entry(TimeBlock(start, end, tasks[task_index])))
+
+        scheduled_ids = {entry['task_id'] for entry in schedule}
+
+        return {
+            'schedule': schedule,
+            'cost': round(best_cost, 2),
+            'lower_bound': round(lower_bound, 2),
+            'gap': round((best_cost - lower_bound) / best_cost, 4) if best_cost > 0 else 0.0,
+            'iterations': iterations,
+            'elapsed_ms': round((clock.perf_counter() - started) * 1000, 1),
+            'unscheduled': [task['id'] for task in tasks if task['id'] not in scheduled_ids]
+        }
+
+    def _try_relocate(self, assignment, block_costs, unscheduled, deadline, started) -> Optional[float]:
+        """Move one task (possibly an unscheduled one) into another block; return the accepted cost delta."""
+        if unscheduled and self.random.random() < 0.3:
+            task_index = self.random.choice(tuple(unscheduled))
+            source = None
+        else:
+            source = self.random.randrange(len(assignment))
+            if not assignment[source]:
+                return None
+            task_index = self.random.choice(assignment[source])
+
+        target = self._pick_block(task_index)
+        if target == source:
+            return None
+
+        target_tasks = list(assignment[target])
+        target_tasks.insert(self.random.randint(0, len(target_tasks)), task_index)
+        displaced = None
+        if not self._fits(target, target_tasks):
+            if source is not None or not assignment[target]:
+                return None
+            # Make room for an unscheduled task by pushing another one out
+            displaced = self.random.choice(assignment[target])
+            target_tasks.remove(displaced)
+            if not self._fits(target, target_tasks):
+                return None
+
+        delta = self._block_cost(target, target_tasks) - block_costs[target]
+        if displaced is not None:
+            delta += self._unscheduled_cost(displaced)
+        if source is None:
+            delta -= self._unscheduled_cost(task_index)
+        else:
+            source_tasks = [i for i in assignment[source] if i != task_index]
+            source_cost = self._block_cost(source, source_tasks)
+            delta += source_cost - block_costs[source]
+
+        if not self._accept(delta, deadline, started):
+            return None
+
+        assignment[target] = target_tasks
+        block_costs[target] = self._block_cost(target, target_tasks)
+        if displaced is not None:
+            unscheduled.add(displaced)
+        if source is None:
+            unscheduled.discard(task_index)
+        else:
+            assignment[source] = source_tasks
+            block_costs[source] = source_cost
+
+        return delta
+
+    def _try_swap(self, assignment, block_costs, deadline, started) -> Optional[float]:
+        """Swap two tasks between blocks; return the accepted cost delta."""
+        first = self.random.randrange(len(assignment))
+        second = self.random.randrange(len(assignment))
+        if first == second or not assignment[first] or not assignment[second]:
+            return None
+
+        i = self.random.randrange(len(assignment[first]))
+        j = self.random.randrange(len(assignment[second]))
+        first_tasks = list(assignment[first])
+        second_tasks = list(assignment[second])
+        first_tasks[i], second_tasks[j] = second_tasks[j], first_tasks[i]
+
+        if not self._fits(first, first_tasks) or not self._fits(second, second_tasks):
+            return None
+
+        first_cost = self._block_cost(first, first_tasks)
+        second_cost = self._block_cost(second, second_tasks)
+        delta = first_cost + second_cost - block_costs[first] - block_costs[second]
+
+        if not self._accept(delta, deadline, started):
+            return None
+
+        assignment[first], assignment[second] = first_tasks, second_tasks
+        block_costs[first], block_costs[second] = first_cost, second_cost
+
+        return delta
+
+    def _pick_block(self, task_index: int) -> int:
+        """Pick a target block, favouring blocks that start before the task is due."""
+        due_date = self._due_dates[task_index]
+        if due_date is not None and self.random.random() < 0.5:
+            last = bisect_right(self._block_starts, due_date)
+            if last > 0:
+                return self.random.randrange(last)
+        return self.random.randrange(len(self._blocks))
+
+    def _accept(self, delta: float, deadline: float, started: float) -> bool:
+        """Simulated-annealing acceptance with a temperature that cools over the time budget."""
+        if delta <= 0:
+            return True
+        budget = deadline - started
+        remaining = max(0.0, deadline - clock.perf_counter()) / budget if budget > 0 else 0.0
+        temperature = 5.0 * remaining
+        return temperature > 0 and self.random.random() < math.exp(-delta / temperature)
+
+    def _fits(self, block_index: int, task_indexes: List[int]) -> bool:
+        """Check that tasks packed back to back fit the block (80% rule, as in the greedy pass)."""
+        remaining = self._blocks[block_index][1]
+        for task_index in task_indexes:
+            duration = self._durations[task_index]
+            if remaining < duration * 0.8:
+                return False
+            remaining = max(0.0, remaining - duration)
+        return True
+
+    def _pack(self, block_index: int, task_indexes: List[int]) -> List[Tuple[int, datetime, datetime]]:
+        current = self._blocks[block_index][0]
+        packed = []
+        for task_index in task_indexes:
+            end = current + timedelta(minutes=self._durations[task_index])
+            packed.append((task_index, current, end))
+            current = end
+        return packed
+
+    def _block_cost(self, block_index: int, task_indexes: List[int]) -> float:
+        return sum(self._task_cost(i, start, end) for i, start, end in self._pack(block_index, task_indexes))
+
+    def _task_cost(self, task_index: int, start: datetime, end: datetime) -> float:
+        task = self._tasks[task_index]
+        priority = task.get('priority', 2)
+        cost = 0.0
+
+        due_date = self._due_dates[task_index]
+        if due_date is not None and end > due_date:
+            cost += self.LATE_WEIGHT * priority * (end - due_date).total_seconds() / 3600
+
+        energy = task.get('energy_level', 3) or 3
+        cost += self.ENERGY_WEIGHT * abs(energy - self.energy_curve.get(start.hour, 3))
+        cost += self.DELAY_WEIGHT * priority * (start - self._horizon_start).total_seconds() / 86400
+
+        return cost
+
+    def _unscheduled_cost(self, task_index: int) -> float:
+        return self.UNSCHEDULED_WEIGHT * self._tasks[task_index].get('priority', 2)
+
+    def _lower_bound(self) -> float:
+        """
+        Cost no schedule can beat, used to report the optimality gap.
+
+        Each placed task pays at least its smallest energy mismatch and the
+        lateness of finishing as early as the horizon allows. The k-th placed
+        task starts no earlier than the k-1 shortest tasks packed back to back
+        from the start of the horizon, and pairing the highest priorities with
+        the earliest of those starts gives the smallest delay. Tasks beyond
+        the horizon's free minutes have to be left out.
+        """
+        unscheduled = [self._unscheduled_cost(i) for i in range(len(self._tasks))]
+        if not self._blocks:
+            return sum(unscheduled)
+
+        work_start = self.scheduler.work_hours['start'].hour
+        work_end = self.scheduler.work_hours['end'].hour
+        hours = [self.energy_curve.get(hour, 3) for hour in range(work_start, max(work_end, work_start + 1))]
+
+        savings = []
+        for task_index, task in enumerate(self._tasks):
+            priority = task.get('priority', 2)
+            energy = task.get('energy_level', 3) or 3
+            placed = self.ENERGY_WEIGHT * min(abs(energy - level) for level in hours)
+
+            due_date = self._due_dates[task_index]
+            earliest_end = self._horizon_start + timedelta(minutes=self._durations[task_index])
+            if due_date is not None and earliest_end > due_date:
+                placed += self.LATE_WEIGHT * priority * (earliest_end - due_date).total_seconds() / 3600
+
+            savings.append(placed - unscheduled[task_index])
+        savings.sort()
+
+        # Prefix sums of the earliest start (in days) of each placed position
+        delays = [0.0]
+        for start in self._earliest_starts(sorted(self._durations)):
+            delays.append(delays[-1] + (start - self._horizon_start).total_seconds() / 86400)
+
+        # Runs of equal priority, lowest first: (priority, first index, end index)
+        priorities = sorted(task.get('priority', 2) for task in self._tasks)
+        levels = []
+        for index, priority in enumerate(priorities):
+            if levels and levels[-1][0] == priority:
+                levels[-1][2] = index + 1
+            else:
+                levels.append([priority, index, index + 1])
+
+        bound = total = sum(unscheduled)
+        for placed_count in range(1, len(delays)):
+            total += savings[placed_count - 1]
+            # Any placed set has priorities at least the placed_count lowest ones
+            delay = 0.0
+            for priority, first, end in levels:
+                if first >= placed_count:
+                    break
+                end = min(end, placed_count)
+                delay += priority * (delays[placed_count - first] - delays[placed_count - end])
+            bound = min(bound, total + self.DELAY_WEIGHT * delay)
+
+        return bound
+
+    def _earliest_starts(self, durations: List[float]) -> List[datetime]:
+        """
+        Earliest start of each task when the given durations are packed in order.
+
+        A block can take up to 1.25 times its length under the 80% rule, so
+        this never starts a task later than any real packing would. The list
+        stops at the first task that cannot start inside the horizon.
+        """
+        starts = []
+        block_index, offset, capacity_before = 0, 0.0, 0.0
+        for duration in durations:
+            while block_index < len(self._blocks):
+                block_start, length = self._blocks[block_index]
+                if offset < capacity_before + length:
+                    starts.append(block_start + timedelta(minutes=offset - capacity_before))
+                    break
+                if offset < capacity_before + length * 1.25 and block_index + 1 < len(self._blocks):
+                    starts.append(self._blocks[block_index + 1][0])
+                    break
+                capacity_before += length * 1.25
+                block_index += 1
+            else:
+                break
+            offset += duration
+        return starts
+
+    @staticmethod
+    def _parse_due_date(task: Dict[str, Any]) -> Optional[datetime]:
+        due_date = task.get('due_date')
+        if not due_date:
+            return None
+        if isinstance(due_date, datetime):
+            return due_date
+        return datetime.fromisoformat(due_date)
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Any, Optional, List
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class SQLiteParseCacheBackend:
+    """
+    Parse results shared by every worker process on the host through a local SQLite file.
+
+    Each process and thread opens its own connection; WAL mode lets readers
+    and the writer proceed without blocking each other.
+    """
+
+    PRUNE_EVERY = 500  # writes between removals of expired rows
+
+    def __init__(self, path: str, max_rows: int = 100000):
+        self.path = path
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS parse_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            'SELECT value FROM parse_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO parse_cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + ttl_seconds)
+        )
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired rows, then the rows closest to expiry beyond `max_rows`."""
+        connection = self._connection()
+        connection.execute('DELETE FROM parse_cache WHERE expires_at <= ?', (time.time(),))
+        connection.execute(
+            'DELETE FROM parse_cache WHERE key IN ('
+            'SELECT key FROM parse_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_rows,)
+        )
+
+class ParseCache:
+    """
+    Bounded LRU cache of parse results with a time-to-live.
+
+    Keys combine the whitespace-normalized text, the reference date relative
+    words like "tomorrow" are resolved against, and the requested fields. An
+    optional shared backend is consulted on local misses so workers benefit
+    from each other's parses.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 86400,
+                 backend: Optional[SQLiteParseCacheBackend] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text: str, reference_date: date, fields: Optional[List[str]] = None) -> str:
+        normalized = ' '.join(text.split())
+        scope = ','.join(sorted(fields)) if fields else '*'
+        return f'{reference_date.isoformat()}|{scope}|{normalized}'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(value)
+                del self._entries[key]
+
+        value = None
+        if self.backend:
+            try:
+                value = self.backend.get(key)
+            except sqlite3.Error:
+                pass  # The shared cache is best effort; fall back to parsing
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._store(key, value, now)
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._store(key, dict(value), time.monotonic())
+        if self.backend:
+            try:
+                self.backend.set(key, value, self.ttl_seconds)
+            except sqlite3.Error:
+                pass
+
+    def _store(self, key: str, value: Dict[str, Any], now: float) -> None:
+        self._entries[key] = (value, now + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'shared': self.backend is not None,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,288 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple
+import multiprocessing
+import os
+import threading
+
+from .nlp_processor import NLPProcessor
+from .parse_cache import ParseCache
+
+# The processor owned by each pool process (set by _init_worker)
+_worker_processor = None
+
+def _init_worker():
+    global _worker_processor
+    _worker_processor = NLPProcessor()
+    _worker_processor.load()
+
+def _parse_in_worker(text: str, reference_date: date) -> Dict[str, Any]:
+    return _worker_processor.parse_task_model(text, reference_date=reference_date)
+
+def _parse_many_in_worker(texts: List[str], reference_date: date, batch_size: int) -> List[Dict[str, Any]]:
+    return _worker_processor.parse_tasks_model(texts, reference_date=reference_date, batch_size=batch_size)
+
+def _worker_ready() -> bool:
+    # Runs after _init_worker, so the worker's model is loaded by then
+    return True
+
+class ParseService:
+    """
+    Runs model parsing off the request threads, in a bounded pool.
+
+    Texts the rule tier resolves on its own never leave the request thread.
+    The rest are handed to the pool and waited on for at most `timeout_ms`. At
+    most `max_pending` parses may be queued or running; beyond that, and on
+    timeouts or worker failures, the rule tier result is used as is, so a
+    burst of natural language requests never ties up the web workers. With
+    `workers=0` model parsing runs inline on the caller's thread.
+
+    If the processor's model is already loaded in this process (NLP_PRELOAD),
+    the pool is `workers` threads sharing it; otherwise it is `workers`
+    processes that each load their own, so the model is never held twice.
+    The pool is started by warm() or on first use, in the process that uses
+    it; until its first worker has loaded the model, parses use the rule tier
+    instead of waiting out the timeout.
+    """
+
+    def __init__(self, processor: NLPProcessor, workers: int = 1, max_pending: int = 32,
+                 timeout_ms: int = 2000, start_method: str = 'spawn'):
+        self.processor = processor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_ms = timeout_ms
+        self.start_method = start_method
+        self._executor = None
+        self._executor_pid = None
+        self._in_process = False
+        self._executor_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'cache': 0,
+            'rules': 0,
+            'model': 0,
+            'fallback_saturated': 0,
+            'fallback_warming': 0,
+            'fallback_timeout': 0,
+            'fallback_error': 0
+        }
+
+    def _count(self, outcome: str, count: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[outcome] += count
+
+    def warm(self) -> None:
+        """Start the pool now so its workers load the model before the first parse; doesn't wait for them."""
+        if self.workers > 0:
+            self._get_executor()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            # Not started yet, or inherited through a fork without its workers
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor_pid = os.getpid()
+                self._ready.clear()
+                self._in_process = self.processor.is_loaded
+                if self._in_process:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='nlp-parse')
+                    self._ready.set()
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=_init_worker
+                    )
+                    # One call per worker starts them all; the first answer means a model is loaded
+                    for _ in range(self.workers):
+                        self._executor.submit(_worker_ready).add_done_callback(lambda _: self._ready.set())
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Drop a pool whose worker died so the next parse starts a fresh one."""
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def parse(self, text: str, reference_date: Optional[date] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Parse a task description.
+
+        Returns:
+            The task dict and the tier that produced it: "cache", "rules" or "model"
+        """
+        reference_date = reference_date or date.today()
+        cache = self.processor.cache
+        key = ParseCache.make_key(text, reference_date) if cache else None
+        if key:
+            cached = cache.get(key)
+            if cached is not None:
+                self._count('cache')
+                return cached, 'cache'
+
+        task_data, needs_model = self.processor.parse_rule_tier(text, reference_date=reference_date)
+        if not needs_model:
+            if key:
+                cache.set(key, task_data)
+            self._count('rules')
+            return task_data, 'rules'
+
+        if self.workers <= 0:
+            model_data = self.processor.parse_task_model(text, reference_date=reference_date)
+        else:
+            model_data = self._parse_in_pool(text, reference_date)
+            if model_data is None:
+                return task_data, 'rules'
+
+        if key:
+            cache.set(key, model_data)
+        self._count('model')
+        return model_data, 'model'
+
+    def parse_many(self, texts: List[str], reference_date: Optional[date] = None,
+                   batch_size: int = 64) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Parse many task descriptions, sending the ones that need the model to the pool.
+
+        Those texts go in batches of `batch_size`, each one pool job parsed
+        with a single `nlp.pipe` call that holds one pending slot. A batch
+        that is shed, times out or fails keeps its rule tier results.
+
+        Returns:
+            One (task dict, tier) pair per text, in input order
+        """
+        reference_date = reference_date or date.today()
+        cache = self.processor.cache
+        results = [None] * len(texts)
+        keys = [None] * len(texts)
+        pending = []
+
+        for i, text in enumerate(texts):
+            keys[i] = ParseCache.make_key(text, reference_date) if cache else None
+            if keys[i]:
+                cached = cache.get(keys[i])
+                if cached is not None:
+                    self._count('cache')
+                    results[i] = (cached, 'cache')
+                    continue
+
+            task_data, needs_model = self.processor.parse_rule_tier(text, reference_date=reference_date)
+            results[i] = (task_data, 'rules')
+            if needs_model:
+                pending.append(i)
+                continue
+            if keys[i]:
+                cache.set(keys[i], task_data)
+            self._count('rules')
+
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        if self.workers <= 0:
+            parsed = [
+                self.processor.parse_tasks_model([texts[i] for i in batch], reference_date=reference_date,
+                                                 batch_size=batch_size)
+                for batch in batches
+            ]
+        else:
+            # Submit every batch before waiting so they spread over the workers
+            submitted = []
+            for batch in batches:
+                batch_texts = [texts[i] for i in batch]
+                submitted.append(self._submit(
+                    partial(_parse_many_in_worker, batch_texts, reference_date, batch_size),
+                    partial(self.processor.parse_tasks_model, batch_texts,
+                            reference_date=reference_date, batch_size=batch_size),
+                    count=len(batch)
+                ))
+            parsed = [
+                self._wait(job, count=len(batch)) if job else None
+                for batch, job in zip(batches, submitted)
+            ]
+
+        for batch, batch_data in zip(batches, parsed):
+            if batch_data is None:
+                continue
+            for i, task_data in zip(batch, batch_data):
+                results[i] = (task_data, 'model')
+                if keys[i]:
+                    cache.set(keys[i], task_data)
+            self._count('model', len(batch))
+
+        return results
+
+    def _parse_in_pool(self, text: str, reference_date: date) -> Optional[Dict[str, Any]]:
+        """Model parse in the pool, or None if the pool is saturated, slow or broken."""
+        job = self._submit(partial(_parse_in_worker, text, reference_date),
+                           partial(self.processor.parse_task_model, text, reference_date=reference_date))
+        return self._wait(job) if job else None
+
+    def _submit(self, worker_call, thread_call, count: int = 1):
+        """
+        Queue a call in the pool: `worker_call` in a worker process, or
+        `thread_call` on a thread sharing the preloaded model. Returns the
+        (future, executor), or None when it can't be queued.
+        """
+        # Shed load instead of queueing without bound
+        if not self._slots.acquire(blocking=False):
+            self._count('fallback_saturated', count)
+            return None
+
+        executor = None
+        try:
+            executor = self._get_executor()
+            if not self._ready.is_set():
+                self._slots.release()
+                self._count('fallback_warming', count)
+                return None
+
+            if self._in_process:
+                future = executor.submit(thread_call)
+            else:
+                future = executor.submit(worker_call)
+        except Exception:
+            self._slots.release()
+            if executor is not None:
+                self._reset_executor(executor)
+            self._count('fallback_error', count)
+            return None
+
+        # The slot is held until the worker is done, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        return future, executor
+
+    def _wait(self, job, count: int = 1):
+        """Result of a submitted call, or None after `timeout_ms` or a worker failure."""
+        future, executor = job
+        try:
+            return future.result(timeout=self.timeout_ms / 1000)
+        except FutureTimeoutError:
+            future.cancel()
+            self._count('fallback_timeout', count)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            self._count('fallback_error', count)
+        except Exception:
+            self._count('fallback_error', count)
+        return None
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'timeout_ms': self.timeout_ms,
+            'started': self._executor is not None,
+            'ready': self._ready.is_set(),
+            'pool': 'threads' if self._in_process else 'processes'
+        })
+        return stats
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from bisect import bisect_left, bisect_right
+
+class ScheduleItem:
+    """Plain schedule entry for callers that do not work with persisted blocks."""
+
+    def __init__(self, task_id: str, start_time: datetime, end_time: datetime, data: Optional[Dict[str, Any]] = None):
+        self.task_id = task_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.data = data or {}
+
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> 'ScheduleItem':
+        return cls(
+            entry['task_id'],
+            datetime.fromisoformat(entry['start_time']),
+            datetime.fromisoformat(entry['end_time']),
+            entry
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.data,
+            'task_id': self.task_id,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat()
+        }
+
+class ScheduleRepairer:
+    """
+    Incrementally edit a schedule and repair overlaps around the edit.
+
+    Items are any objects with `task_id`, `start_time` and `end_time`
+    attributes (persisted `ScheduledBlock` rows or `ScheduleItem`s). They are
+    kept sorted by start time, so locating an edit is a binary search and only
+    the k items it pushes later are rewritten. Adding or removing an item
+    still shifts the tail of the sorted lists, so an edit is O(n) element
+    moves in the worst case (a memmove, cheap next to loading the items).
+
+    With a `scheduler`, pushed items are kept inside its working hours on
+    weekdays, as generated schedules are; an item that no longer fits the day
+    moves to the start of the next working day.
+
+    Every operation returns a diff: the items whose times changed (or that
+    were added) and the items that were removed.
+    """
+
+    def __init__(self, items: List[Any], scheduler: Optional[Any] = None):
+        self.items = sorted(items, key=lambda item: item.start_time)
+        self.scheduler = scheduler
+        self._starts = [item.start_time for item in self.items]
+        self._by_task = {item.task_id: item for item in self.items}
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._by_task
+
+    def get(self, task_id: str) -> Optional[Any]:
+        return self._by_task.get(task_id)
+
+    def move(self, task_id: str, new_start: datetime) -> Dict[str, List[Any]]:
+        """
+        Move an item to a new start time, keeping its duration.
+
+        If the new time falls inside the previous item, the moved item snaps
+        to the end of it; items after it are pushed later as needed.
+        """
+        item = self._by_task[task_id]
+        duration = item.end_time - item.start_time
+        self._detach(item)
+
+        item.start_time = new_start
+        item.end_time = new_start + duration
+        updated = [item] + self._attach(item)
+
+        return {'updated': updated, 'removed': []}
+
+    def insert(self, item: Any) -> Dict[str, List[Any]]:
+        """Add a new item at its start time and push later items out of its way."""
+        if item.task_id in self._by_task:
+            raise ValueError(f'Task {item.task_id} is already scheduled')
+
+        self._by_task[item.task_id] = item
+        updated = [item] + self._attach(item)
+
+        return {'updated': updated, 'removed': []}
+
+    def remove(self, task_id: str) -> Dict[str, List[Any]]:
+        """Take an item out of the schedule; the gap it leaves stays free."""
+        item = self._by_task.pop(task_id)
+        self._detach(item)
+
+        return {'updated': [], 'removed': [item]}
+
+    def extend(self, task_id: str, minutes: int) -> Dict[str, List[Any]]:
+        """Record that an item ran `minutes` longer than planned and push later items."""
+        if minutes <= 0:
+            raise ValueError('minutes must be positive')
+        item = self._by_task[task_id]
+        item.end_time = item.end_time + timedelta(minutes=minutes)
+        position = self._position(item)
+
+        return {'updated': [item] + self._push_after(position), 'removed': []}
+
+    def _position(self, item: Any) -> int:
+        position = bisect_left(self._starts, item.start_time)
+        while self.items[position] is not item:
+            position += 1
+        return position
+
+    def _detach(self, item: Any) -> None:
+        position = self._position(item)
+        del self.items[position]
+        del self._starts[position]
+
+    def _attach(self, item: Any) -> List[Any]:
+        """Insert an item in start order, snapping it after an overlapping predecessor."""
+        position = bisect_right(self._starts, item.start_time)
+
+        if position > 0 and self.items[position - 1].end_time > item.start_time:
+            shift = self.items[position - 1].end_time - item.start_time
+            item.start_time += shift
+            item.end_time += shift
+
+        self.items.insert(position, item)
+        self._starts.insert(position, item.start_time)
+
+        return self._push_after(position)
+
+    def _push_after(self, position: int) -> List[Any]:
+        """Push items after `position` later until there is no overlap; return the moved ones."""
+        pushed = []
+        previous_end = self.items[position].end_time
+
+        for i in range(position + 1, len(self.items)):
+            item = self.items[i]
+            if item.start_time >= previous_end:
+                break
+
+            duration = item.end_time - item.start_time
+            item.start_time = previous_end
+            if self.scheduler is not None:
+                item.start_time = self.scheduler.next_work_start(previous_end, duration)
+            item.end_time = item.start_time + duration
+            self._starts[i] = item.start_time
+            previous_end = item.end_time
+            pushed.append(item)
+
+        return pushed
@@ -3,6 +3,9 @@ from typing import List, Dict, Any, Optional
 from enum import Enum
 import random
 
+from .scoring import TaskColumns, rank
+from .rescheduler import ScheduleRepairer, ScheduleItem
+
 class TimeBlock:
     def __init__(self, start_time: datetime, end_time: datetime, task=None):
         self.start_time = start_time
@@ -18,6 +21,72 @@ class TimeBlock:
         return f"TimeBlock({self.start_time.strftime('%Y-%m-%d %H:%M')} - {self.end_time.strftime('%H:%M')}, " \
                f"Task: {self.task['title'] if self.task else 'Available'})"
 
+class FreeSlotIndex:
+    """
+    Index of free time blocks answering "first slot that fits" queries.
+    
+    Blocks are kept in start-time order at the leaves of a segment tree whose
+    inner nodes hold the largest free capacity (in minutes) below them, so
+    finding the earliest block with enough room and shrinking a partially
+    used block are both O(log n).
+    """
+    
+    def __init__(self, blocks: List[TimeBlock]):
+        self.blocks = blocks
+        self._size = 1
+        while self._size < len(blocks):
+            self._size *= 2
+        
+        self._capacity = [0.0] * (2 * self._size)
+        for i, block in enumerate(blocks):
+            self._capacity[self._size + i] = block.duration
+        for node in range(self._size - 1, 0, -1):
+            self._capacity[node] = max(self._capacity[2 * node], self._capacity[2 * node + 1])
+    
+    def __len__(self) -> int:
+        return len(self.blocks)
+    
+    @property
+    def max_capacity(self) -> float:
+        """Largest free capacity (in minutes) of any block."""
+        return self._capacity[1] if self.blocks else 0.0
+    
+    def find_first_fit(self, minutes: float) -> Optional[int]:
+        """Return the index of the earliest block with at least `minutes` free, or None."""
+        if not self.blocks or self._capacity[1] < minutes:
+            return None
+        
+        node = 1
+        while node < self._size:
+            node = 2 * node if self._capacity[2 * node] >= minutes else 2 * node + 1
+        
+        return node - self._size
+    
+    def allocate(self, index: int, minutes: float, task: Dict[str, Any]) -> TimeBlock:
+        """
+        Place a task at the start of a free block.
+        
+        The block is split: the used part is returned as a new occupied
+        TimeBlock and the free block shrinks to whatever is left after it.
+        """
+        block = self.blocks[index]
+        start_time = block.start_time
+        end_time = start_time + timedelta(minutes=minutes)
+        
+        block.start_time = min(end_time, block.end_time)
+        block.duration = (block.end_time - block.start_time).total_seconds() / 60
+        self._update(index, block.duration)
+        
+        return TimeBlock(start_time, end_time, task)
+    
+    def _update(self, index: int, capacity: float) -> None:
+        node = self._size + index
+        self._capacity[node] = capacity
+        node //= 2
+        while node:
+            self._capacity[node] = max(self._capacity[2 * node], self._capacity[2 * node + 1])
+            node //= 2
+
 class Scheduler:
     def __init__(self, user_id: str, timezone: str = 'UTC'):
         self.user_id = user_id
@@ -41,30 +110,71 @@ class Scheduler:
             end_date: End datetime for scheduling
             
         Returns:
-            List of scheduled tasks with time blocks
+            List of scheduled tasks ordered by start time; each task appears
+            at most once and tasks that do not fit are left out
         """
-        # Sort tasks by priority (descending) and duration (ascending)
-        sorted_tasks = sorted(
-            tasks,
-            key=lambda x: (-x.get('priority', 2), x.get('estimated_duration', 30))
-        )
+        sorted_tasks = self._order_tasks(tasks, start_date)
         
-        # Initialize time blocks for each day
-        schedule = []
-        current_date = start_date.date()
-        end_date = end_date.date()
+        # Place every task once across the whole date range
+        slots = self._create_free_slots(start_date.date(), end_date.date())
+        placements = self._place_tasks(slots, sorted_tasks)
+        placements.sort(key=lambda block: block.start_time)
+        
+        return [self._to_schedule_entry(block) for block in placements]
+    
+    def _order_tasks(self, tasks: List[Dict[str, Any]], reference_time: datetime) -> List[Dict[str, Any]]:
+        """Order tasks by composite urgency (priority and due date), shorter tasks first on ties."""
+        order = rank(TaskColumns.from_dicts(tasks), reference_time)
+        return [tasks[i] for i in order]
+    
+    def _create_free_slots(self, start_date: datetime.date, end_date: datetime.date) -> FreeSlotIndex:
+        """Build one free-slot index covering the work blocks of every weekday in the range."""
+        time_blocks = []
+        current_date = start_date
         
         while current_date <= end_date:
             if current_date.weekday() < 5:  # Only weekdays
-                day_schedule = self._create_daily_schedule(current_date, sorted_tasks)
-                schedule.extend(day_schedule)
+                time_blocks.extend(self._create_time_blocks(current_date))
             current_date += timedelta(days=1)
         
-        return schedule
+        return FreeSlotIndex(time_blocks)
+    
+    def next_work_start(self, start: datetime, duration: timedelta) -> datetime:
+        """
+        Earliest time at or after `start` when a block of `duration` fits in
+        the working hours of a weekday. A block longer than the working day
+        starts when a day begins.
+        """
+        day = start.date()
+        while True:
+            if day.weekday() < 5:  # Only weekdays
+                day_start = datetime.combine(day, self.work_hours['start'])
+                day_end = datetime.combine(day, self.work_hours['end'])
+                candidate = max(start, day_start)
+                if candidate + duration <= day_end or candidate == day_start:
+                    return candidate
+            day += timedelta(days=1)
+    
+    def _place_tasks(self, slots: FreeSlotIndex, tasks: List[Dict[str, Any]]) -> List[TimeBlock]:
+        """Greedily place each task in the earliest free slot that can hold it."""
+        placements = []
+        
+        for task in tasks:
+            if not slots.max_capacity:  # Every block is full
+                break
+            
+            task_duration = task.get('estimated_duration', 30)
+            index = slots.find_first_fit(task_duration * 0.8)  # Allow 80% of time to be used
+            
+            if index is None:
+                continue
+            
+            placements.append(slots.allocate(index, task_duration, task))
+        
+        return placements
     
-    def _create_daily_schedule(self, date: datetime.date, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Create a schedule for a single day."""
-        # Initialize time blocks for the day
+    def _create_time_blocks(self, date: datetime.date) -> List[TimeBlock]:
+        """Split the working hours of a day into work blocks separated by breaks."""
         day_start = datetime.combine(date, self.work_hours['start'])
         day_end = datetime.combine(date, self.work_hours['end'])
         
@@ -80,34 +190,20 @@ class Scheduler:
             time_blocks.append(TimeBlock(current_time, block_end))
             current_time = block_end + timedelta(minutes=self.break_duration)
         
-        # Assign tasks to time blocks
-        scheduled_tasks = []
-        remaining_tasks = tasks.copy()
-        
-        for task in tasks:
-            if task in remaining_tasks:  # Skip already scheduled tasks
-                task_duration = task.get('estimated_duration', 30)
-                
-                # Find a suitable time block
-                for i, block in enumerate(time_blocks):
-                    if block.is_available and block.duration >= task_duration * 0.8:  # Allow 80% of time to be used
-                        # Assign task to this block
-                        block.task = task
-                        scheduled_tasks.append({
-                            'task_id': task['id'],
-                            'title': task['title'],
-                            'start_time': block.start_time.isoformat(),
-                            'end_time': (block.start_time + timedelta(minutes=task_duration)).isoformat(),
-                            'priority': task.get('priority', 2),
-                            'energy_level': task.get('energy_level', 3),
-                            'category': task.get('category', 'OTHER')
-                        })
-                        
-                        # Remove task from remaining tasks
-                        remaining_tasks.remove(task)
-                        break
-        
-        return scheduled_tasks
+        return time_blocks
+    
+    def _to_schedule_entry(self, block: TimeBlock) -> Dict[str, Any]:
+        """Convert an occupied time block into a schedule entry."""
+        task = block.task
+        return {
+            'task_id': task['id'],
+            'title': task['title'],
+            'start_time': block.start_time.isoformat(),
+            'end_time': block.end_time.isoformat(),
+            'priority': task.get('priority', 2),
+            'energy_level': task.get('energy_level', 3),
+            'category': task.get('category', 'OTHER')
+        }
     
     def reschedule_task(self, task_id: str, current_schedule: List[Dict[str, Any]], 
                        new_time: datetime) -> List[Dict[str, Any]]:
@@ -120,35 +216,17 @@ class Scheduler:
             new_time: New start time for the task
             
         Returns:
-            Updated schedule
+            Updated schedule, sorted by start time and free of overlaps
         """
-        # Find the task in the current schedule
-        task_to_move = None
-        updated_schedule = []
-        
-        for scheduled_task in current_schedule:
-            if scheduled_task['task_id'] == task_id:
-                task_to_move = scheduled_task
-            else:
-                updated_schedule.append(scheduled_task)
+        repairer = ScheduleRepairer([ScheduleItem.from_entry(entry) for entry in current_schedule], scheduler=self)
         
-        if not task_to_move:
+        if task_id not in repairer:
             return current_schedule  # Task not found in schedule
         
-        # Update task time
-        task_duration = (datetime.fromisoformat(task_to_move['end_time']) - 
-                        datetime.fromisoformat(task_to_move['start_time'])).total_seconds() / 60
-        
-        task_to_move['start_time'] = new_time.isoformat()
-        task_to_move['end_time'] = (new_time + timedelta(minutes=task_duration)).isoformat()
-        
-        # Add the rescheduled task back to the schedule
-        updated_schedule.append(task_to_move)
-        
-        # Sort the schedule by start time
-        updated_schedule.sort(key=lambda x: x['start_time'])
+        # Move the task and push any overlapping tasks after it
+        repairer.move(task_id, new_time)
         
-        return updated_schedule
+        return [item.to_dict() for item in repairer.items]
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+
+PRIORITY_WEIGHT = 1.0   # per priority point (1-3)
+DUE_WEIGHT = 2.0        # for a task that is due now; decays as the due date moves away
+OVERDUE_WEIGHT = 1.0    # extra urgency for a task a week or more overdue
+ENERGY_WEIGHT = 0.5     # penalty per energy point above what the user has available
+DURATION_WEIGHT = 0.05  # tie-breaker favouring short tasks
+
+class TaskColumns:
+    """Open tasks stored as parallel column arrays for vectorized scoring."""
+
+    def __init__(self, ids: Sequence[str], priority: Sequence[float], due_epoch: Sequence[float],
+                 energy: Sequence[float], duration: Sequence[float]):
+        self.ids = list(ids)
+        self.priority = np.asarray(priority, dtype=np.float64)
+        self.due_epoch = np.asarray(due_epoch, dtype=np.float64)  # NaN when there is no due date
+        self.energy = np.asarray(energy, dtype=np.float64)
+        self.duration = np.asarray(duration, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple]) -> 'TaskColumns':
+        """Build columns from (id, priority, due_date, energy_level, estimated_duration) rows."""
+        if not rows:
+            return cls([], [], [], [], [])
+
+        ids, priority, due_dates, energy, duration = zip(*rows)
+        return cls(
+            ids,
+            [p if p is not None else 2 for p in priority],
+            [_to_epoch(d) for d in due_dates],
+            [e if e is not None else 3 for e in energy],
+            [d if d is not None else 30 for d in duration]
+        )
+
+    @classmethod
+    def from_dicts(cls, tasks: List[Dict[str, Any]]) -> 'TaskColumns':
+        """Build columns from scheduler task dictionaries."""
+        return cls.from_rows([
+            (task['id'], task.get('priority'), task.get('due_date'),
+             task.get('energy_level'), task.get('estimated_duration'))
+            for task in tasks
+        ])
+
+def urgency_scores(columns: TaskColumns, now: datetime,
+                   available_energy: Optional[int] = None) -> np.ndarray:
+    """
+    Compute a composite urgency score for every task in one vectorized pass.
+
+    Higher is more urgent. The score adds the task priority, a due-date term
+    that grows as the due date approaches (and keeps growing once overdue),
+    an optional penalty for tasks needing more energy than is available and
+    a small preference for short tasks.
+    """
+    scores = PRIORITY_WEIGHT * columns.priority
+
+    hours_left = (columns.due_epoch - now.timestamp()) / 3600
+    has_due = ~np.isnan(hours_left)
+    hours_left = np.where(has_due, hours_left, 0.0)
+
+    due_term = DUE_WEIGHT / (1 + np.maximum(hours_left, 0) / 24)
+    overdue_term = OVERDUE_WEIGHT * np.minimum(np.maximum(-hours_left, 0) / (24 * 7), 1)
+    scores = scores + np.where(has_due, due_term + overdue_term, 0.0)
+
+    if available_energy is not None:
+        scores = scores - ENERGY_WEIGHT * np.maximum(columns.energy - available_energy, 0)
+
+    return scores - DURATION_WEIGHT * np.log1p(columns.duration)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k highest scores, best first, without sorting the whole array."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def rank(columns: TaskColumns, now: datetime) -> np.ndarray:
+    """Indexes of all tasks ordered by descending urgency, shorter tasks first on ties."""
+    scores = urgency_scores(columns, now)
+    return np.lexsort((columns.duration, -scores))
+
+def _to_epoch(value) -> float:
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
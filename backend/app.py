@@ -2,6 +2,7 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
@@ -12,20 +13,55 @@ load_dotenv()
 # Initialize extensions
 db = SQLAlchemy()
 jwt = JWTManager()
+migrate = Migrate()
 
 def create_app():
     app = Flask(__name__)
     
+    # Encode responses with orjson, including datetimes and enums from plain column rows
+    from routes.serialization import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['SCHEDULER_TIME_BUDGET_MS'] = int(os.getenv('SCHEDULER_TIME_BUDGET_MS', 200))
+    app.config['NLP_BATCH_SIZE'] = int(os.getenv('NLP_BATCH_SIZE', 64))
+    app.config['NLP_BATCH_MAX_LINES'] = int(os.getenv('NLP_BATCH_MAX_LINES', 1000))
+    app.config['NLP_PRELOAD'] = os.getenv('NLP_PRELOAD', 'false').lower() == 'true'
+    app.config['NLP_CACHE_SIZE'] = int(os.getenv('NLP_CACHE_SIZE', 10000))  # 0 disables the parse cache
+    app.config['NLP_CACHE_TTL'] = int(os.getenv('NLP_CACHE_TTL', 86400))  # seconds
+    app.config['NLP_CACHE_PATH'] = os.getenv('NLP_CACHE_PATH')  # SQLite file shared by all workers
+    app.config['NLP_WORKERS'] = int(os.getenv('NLP_WORKERS', 1))  # parser processes per web worker, 0 parses inline
+    app.config['NLP_QUEUE_DEPTH'] = int(os.getenv('NLP_QUEUE_DEPTH', 32))  # pending parses before falling back to rules
+    app.config['NLP_PARSE_TIMEOUT_MS'] = int(os.getenv('NLP_PARSE_TIMEOUT_MS', 2000))
+    app.config['TASKS_PAGE_SIZE'] = int(os.getenv('TASKS_PAGE_SIZE', 100))
+    app.config['TASKS_MAX_PAGE_SIZE'] = int(os.getenv('TASKS_MAX_PAGE_SIZE', 500))
+    app.config['TASK_TOMBSTONE_DAYS'] = int(os.getenv('TASK_TOMBSTONE_DAYS', 90))
+    app.config['BULK_MAX_OPERATIONS'] = int(os.getenv('BULK_MAX_OPERATIONS', 1000))
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))  # 0 disables the analytics cache
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 60))  # seconds
+    app.config['RESPONSE_CACHE_PATH'] = os.getenv('RESPONSE_CACHE_PATH')  # SQLite file shared by all workers
+    app.config['ANALYTICS_EVENT_QUEUE'] = int(os.getenv('ANALYTICS_EVENT_QUEUE', 10000))  # buffered events per worker, 0 writes them inline
+    app.config['ANALYTICS_EVENT_BATCH'] = int(os.getenv('ANALYTICS_EVENT_BATCH', 500))
+    app.config['ANALYTICS_EVENT_FLUSH_MS'] = int(os.getenv('ANALYTICS_EVENT_FLUSH_MS', 1000))
+    app.config['EVENTS_PATH'] = os.getenv('EVENTS_PATH', os.path.join(app.instance_path, 'events.db'))  # event log shared by all workers, empty for in-process only
+    app.config['EVENTS_HISTORY'] = int(os.getenv('EVENTS_HISTORY', 1000))  # events kept for resuming streams
+    app.config['EVENTS_POLL_INTERVAL_MS'] = int(os.getenv('EVENTS_POLL_INTERVAL_MS', 250))
+    app.config['EVENTS_HEARTBEAT_SECONDS'] = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    app.config['EVENTS_MAX_STREAM_SECONDS'] = int(os.getenv('EVENTS_MAX_STREAM_SECONDS', 300))
+    app.config['EVENTS_MAX_STREAMS_PER_USER'] = int(os.getenv('EVENTS_MAX_STREAMS_PER_USER', 3))  # per worker process
+    # Each open stream holds one gunicorn thread; by default leave half of them for other requests
+    app.config['EVENTS_MAX_STREAMS'] = int(os.getenv('EVENTS_MAX_STREAMS', int(os.getenv('GUNICORN_THREADS', 16)) // 2))  # per worker process, 0 for no limit
+    app.config['EVENTS_RETRY_MS'] = int(os.getenv('EVENTS_RETRY_MS', 3000))  # client reconnect delay
     
     # Initialize extensions
     db.init_app(app)
     jwt.init_app(app)
+    migrate.init_app(app, db)
     CORS(app)
     
     # Import and register blueprints
@@ -36,6 +72,22 @@ def create_app():
     with app.app_context():
         db.create_all()
     
+    # Cache analytics responses per user until their tasks change
+    from routes.cache import init_response_cache
+    init_response_cache(app)
+    
+    # Write analytics events in background batches
+    from routes.event_writer import init_event_writer
+    init_event_writer(app)
+    
+    # Push task, schedule and analytics changes to open event streams
+    from routes.pubsub import init_event_bus
+    init_event_bus(app)
+    
+    # Set up natural language parsing (cache, optional model preload)
+    from routes.tasks import init_nlp
+    init_nlp(app)
+    
     return app
 
 if __name__ == '__main__':
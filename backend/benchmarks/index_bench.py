@@ -0,0 +1,187 @@
+"""
+Show query plans and latency of the hot per-user task queries with and without the composite indexes.
+
+Fills a database with synthetic users and tasks (once; reruns reuse the data),
+then runs each query with the indexes dropped and again with them in place.
+Run from the backend directory:
+
+    python benchmarks/index_bench.py                                   # SQLite file, 1M tasks
+    python benchmarks/index_bench.py --url postgresql://localhost/bench
+    python benchmarks/index_bench.py --tasks 100000 --repeat 50
+
+Use a scratch database: the benchmark drops and recreates indexes on it.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INDEX_NAMES = [
+    'ix_tasks_user_completed_due',
+    'ix_tasks_user_due',
+    'ix_tasks_user_completed_at',
+    'ix_tasks_user_updated',
+    'ix_task_completions_task_completed',
+]
+
+CHUNK = 10000
+
+def populate(db, User, Task, TaskCompletion, TaskCategory, task_count, user_count):
+    """Insert synthetic users, tasks and completions unless the tasks are already there."""
+    existing = db.session.query(Task.id).count()
+    if existing >= task_count:
+        print(f'Reusing {existing} existing tasks')
+        return
+
+    print(f'Inserting {user_count} users and {task_count} tasks...')
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    categories = list(TaskCategory)
+
+    user_ids = [str(uuid.uuid4()) for _ in range(user_count)]
+    db.session.execute(User.__table__.insert(), [
+        {'id': user_id, 'username': f'bench-{user_id}', 'email': f'{user_id}@bench.local', 'password_hash': '-'}
+        for user_id in user_ids
+    ])
+
+    for offset in range(0, task_count, CHUNK):
+        tasks = []
+        completions = []
+        for _ in range(min(CHUNK, task_count - offset)):
+            task_id = str(uuid.uuid4())
+            created_at = now - timedelta(days=rng.uniform(0, 180))
+            is_completed = rng.random() < 0.6
+            completed_at = created_at + timedelta(hours=rng.uniform(1, 240)) if is_completed else None
+            tasks.append({
+                'id': task_id,
+                'user_id': rng.choice(user_ids),
+                'title': f'Task {offset}',
+                'category': rng.choice(categories),
+                'priority': rng.randint(1, 3),
+                'energy_level': rng.randint(1, 5),
+                'estimated_duration': rng.choice([15, 30, 60, 120]),
+                'due_date': created_at + timedelta(days=rng.uniform(0, 30)) if rng.random() < 0.8 else None,
+                'created_at': created_at,
+                'updated_at': completed_at or created_at,
+                'is_completed': is_completed,
+                'completed_at': completed_at,
+                'xp_value': 10
+            })
+            if is_completed:
+                completions.append({
+                    'id': str(uuid.uuid4()), 'task_id': task_id, 'completed_at': completed_at, 'xp_earned': 10
+                })
+        db.session.execute(Task.__table__.insert(), tasks)
+        db.session.execute(TaskCompletion.__table__.insert(), completions)
+        db.session.commit()
+
+def hot_queries(db, Task, TaskCompletion, user_id, task_id):
+    """The per-user queries issued by the task, scheduler and analytics routes."""
+    now = datetime.utcnow()
+    today = datetime.combine(now.date(), datetime.min.time())
+    return {
+        'task list page': db.select(Task).where(Task.user_id == user_id).order_by(
+            Task.updated_at.desc(), Task.id.desc()).limit(100),
+        'suggest (open tasks)': db.select(Task.id, Task.priority, Task.due_date).where(
+            Task.user_id == user_id, Task.is_completed == False),
+        'upcoming deadlines': db.select(Task).where(
+            Task.user_id == user_id, Task.is_completed == False,
+            Task.due_date >= now, Task.due_date <= now + timedelta(days=3)
+        ).order_by(Task.due_date).limit(5),
+        "today's tasks": db.select(Task).where(
+            Task.user_id == user_id, Task.due_date >= today, Task.due_date < today + timedelta(days=1)
+        ).order_by(Task.priority.desc(), Task.due_date),
+        'completions (30 days)': db.select(Task.completed_at, Task.category).where(
+            Task.user_id == user_id, Task.is_completed == True,
+            Task.completed_at >= today - timedelta(days=29), Task.completed_at < today + timedelta(days=1)),
+        'task completion history': db.select(TaskCompletion).where(
+            TaskCompletion.task_id == task_id).order_by(TaskCompletion.completed_at),
+    }
+
+def explain(connection, statement):
+    compiled = statement.compile(connection)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql('EXPLAIN ANALYZE ' + compiled.string, params).all()
+    return [row[0] for row in rows]
+
+def time_query(connection, statement, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(statement).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def run(db, queries, repeat):
+    results = {}
+    with db.engine.connect() as connection:
+        for name, statement in queries.items():
+            results[name] = (time_query(connection, statement, repeat), explain(connection, statement))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='sqlite:///index_bench.db', help='SQLAlchemy database URL (scratch database)')
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per query')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    from app import create_app, db
+    from models import User, Task, TaskCompletion, TaskCategory
+
+    app = create_app()
+    with app.app_context():
+        populate(db, User, Task, TaskCompletion, TaskCategory, args.tasks, args.users)
+
+        # Pick the busiest user and one of their completed tasks
+        user_id = db.session.query(Task.user_id).group_by(Task.user_id).order_by(db.func.count().desc()).first()[0]
+        task_id = db.session.query(TaskCompletion.task_id).join(Task).filter(Task.user_id == user_id).first()[0]
+        queries = hot_queries(db, Task, TaskCompletion, user_id, task_id)
+
+        indexes = [
+            index for table in (Task.__table__, TaskCompletion.__table__)
+            for index in table.indexes if index.name in INDEX_NAMES
+        ]
+
+        results = {}
+        for scenario in ('without indexes', 'with indexes'):
+            with db.engine.begin() as connection:
+                for index in indexes:
+                    if scenario == 'without indexes':
+                        index.drop(connection, checkfirst=True)
+                    else:
+                        index.create(connection, checkfirst=True)
+                connection.exec_driver_sql('ANALYZE')
+            results[scenario] = run(db, queries, args.repeat)
+
+    print(f'\n{db.engine.dialect.name}, {args.tasks} tasks, median of {args.repeat} runs\n')
+    print(f"{'query':<26}{'without (ms)':>14}{'with (ms)':>12}{'speedup':>10}")
+    for name in queries:
+        without, _ = results['without indexes'][name]
+        with_index, _ = results['with indexes'][name]
+        print(f'{name:<26}{without:>14.2f}{with_index:>12.2f}{without / with_index:>9.1f}x')
+
+    for scenario, scenario_results in results.items():
+        print(f'\n== Plans {scenario}')
+        for name, (_, plan) in scenario_results.items():
+            print(f'-- {name}')
+            for line in plan:
+                print(f'   {line}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare accuracy and latency of the rule tier, the spaCy model and the tiered parser.
+
+Each text in the fixture corpus is labelled with the fields a person would
+extract from it, resolved against a fixed reference date. Run from the backend
+directory:
+
+    python benchmarks/nlp_tiers.py
+    python benchmarks/nlp_tiers.py --repeat 200 --corpus my_corpus.jsonl
+
+The model columns are skipped when the spaCy model isn't installed
+(`python -m spacy download en_core_web_sm`).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.nlp_processor import NLPProcessor
+
+FIELDS = ['category', 'priority', 'energy_level', 'estimated_duration', 'due_date']
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'nlp_corpus.jsonl')
+
+def load_corpus(path):
+    with open(path) as corpus:
+        return [json.loads(line) for line in corpus if line.strip()]
+
+def measure(parse, corpus, repeat):
+    """Per-field accuracy and per-text latency (microseconds) of one parse function."""
+    correct = {field: 0 for field in FIELDS}
+    latencies = []
+    tiers = {}
+
+    for case in corpus:
+        result = parse(case['text'])
+        if isinstance(result, tuple):
+            result, tier = result
+            tiers[tier] = tiers.get(tier, 0) + 1
+        for field in FIELDS:
+            value = result[field]
+            if field == 'due_date' and value:
+                value = value[:10]  # the labels are days; ignore any time of day
+            correct[field] += value == case['expected'][field]
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parse(case['text'])
+        latencies.append((time.perf_counter() - started) / repeat * 1e6)
+
+    latencies.sort()
+    return {
+        'accuracy': {field: correct[field] / len(corpus) for field in FIELDS},
+        'p50_us': statistics.median(latencies),
+        'p95_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'tiers': tiers
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='JSON lines with "text" and "expected" fields')
+    parser.add_argument('--repeat', type=int, default=50, help='timed parses per text')
+    parser.add_argument('--reference-date', default='2024-01-10', help='day the corpus labels are resolved against')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    reference_date = date.fromisoformat(args.reference_date)
+    processor = NLPProcessor()  # no cache, so every parse does the work
+
+    parsers = {
+        'rules': lambda text: processor.parse_task_rules(text, reference_date=reference_date),
+        'tiered': lambda text: processor.parse(text, reference_date=reference_date)
+    }
+    try:
+        processor.load()
+        parsers['model'] = lambda text: processor.parse_task_model(text, reference_date=reference_date)
+    except OSError as e:
+        print(f'spaCy model not available, skipping model tier: {e}\n')
+        del parsers['tiered']  # would fail on the texts that need the model
+
+    print(f'{len(corpus)} texts, reference date {reference_date}, {args.repeat} timed parses each\n')
+    print(f"{'parser':<8}" + ''.join(f'{field:>20}' for field in FIELDS) + f"{'p50 us':>10}{'p95 us':>10}")
+
+    for name, parse in parsers.items():
+        result = measure(parse, corpus, args.repeat)
+        accuracy = ''.join(f"{result['accuracy'][field]:>20.0%}" for field in FIELDS)
+        print(f"{name:<8}{accuracy}{result['p50_us']:>10.1f}{result['p95_us']:>10.1f}")
+        if result['tiers']:
+            served = ', '.join(f'{tier}: {count}' for tier, count in sorted(result['tiers'].items()))
+            print(f'{"":<8}served by {served}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Measure rows per second of a task list response: ORM objects + to_dict + stdlib JSON versus column rows + orjson.
+
+Fills a database with one user's tasks (once; reruns reuse the data), then
+times query plus encoding for each path, and encoding alone for the same
+payload. Run from the backend directory:
+
+    python benchmarks/serialization_bench.py                    # in-memory SQLite, 10k tasks
+    python benchmarks/serialization_bench.py --tasks 50000 --repeat 20
+    python benchmarks/serialization_bench.py --url postgresql://localhost/bench
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def populate(db, User, Task, TaskCategory, task_count):
+    """Insert one user with `task_count` synthetic tasks unless they are already there; returns the user id."""
+    user = db.session.query(User.id).filter(User.username == 'serialization-bench').first()
+    if user and db.session.query(Task.id).filter(Task.user_id == user.id).count() >= task_count:
+        print(f'Reusing the existing {task_count}+ tasks')
+        return user.id
+
+    print(f'Inserting {task_count} tasks...')
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    user_id = user.id if user else str(uuid.uuid4())
+    if not user:
+        db.session.execute(User.__table__.insert(), [{
+            'id': user_id, 'username': 'serialization-bench', 'email': 'bench@serialization.local', 'password_hash': '-'
+        }])
+
+    tasks = []
+    for number in range(task_count):
+        created_at = now - timedelta(days=rng.uniform(0, 365))
+        is_completed = rng.random() < 0.6
+        completed_at = created_at + timedelta(hours=rng.uniform(1, 240)) if is_completed else None
+        tasks.append({
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'title': f'Task {number}',
+            'description': 'Synthetic task for the serialization benchmark',
+            'category': rng.choice(list(TaskCategory)),
+            'priority': rng.randint(1, 3),
+            'energy_level': rng.randint(1, 5),
+            'estimated_duration': rng.choice([15, 30, 60, 120]),
+            'due_date': created_at + timedelta(days=rng.uniform(0, 30)),
+            'created_at': created_at,
+            'updated_at': completed_at or created_at,
+            'is_completed': is_completed,
+            'completed_at': completed_at,
+            'xp_value': 10
+        })
+    db.session.execute(Task.__table__.insert(), tasks)
+    db.session.commit()
+    return user_id
+
+def median_seconds(function, repeat, reset):
+    timings = []
+    for _ in range(repeat):
+        reset()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='sqlite://', help='SQLAlchemy database URL (scratch database)')
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per path')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.url
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app, db
+    from models import User, Task, TaskCategory
+    from routes.serialization import FastJSONProvider, column_dicts, orjson
+
+    if orjson is None:
+        sys.exit('orjson is not installed; pip install -r requirements.txt')
+
+    app = create_app()
+    stdlib_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app)
+    columns = [getattr(Task, field) for field in Task.FIELDS]
+
+    with app.app_context():
+        user_id = populate(db, User, Task, TaskCategory, args.tasks)
+        query = Task.query.filter(Task.user_id == user_id).limit(args.tasks)
+
+        def before():
+            return stdlib_json.response({'tasks': [task.to_dict() for task in query.all()]})
+
+        def after():
+            return fast_json.response({'tasks': column_dicts(query, columns)})
+
+        # The paths must produce the same document
+        assert stdlib_json.loads(before().get_data()) == fast_json.loads(after().get_data())
+
+        # Start each run with an empty identity map, as a request does
+        reset = db.session.expunge_all
+        results = {
+            'query + encode, before (ORM + to_dict + json)': median_seconds(before, args.repeat, reset),
+            'query + encode, after (column rows + orjson)': median_seconds(after, args.repeat, reset),
+        }
+
+        objects = query.all()
+        rows = column_dicts(query, columns)
+        results['encode only, before'] = median_seconds(
+            lambda: stdlib_json.response({'tasks': [task.to_dict() for task in objects]}), args.repeat, lambda: None
+        )
+        results['encode only, after'] = median_seconds(
+            lambda: fast_json.response({'tasks': rows}), args.repeat, lambda: None
+        )
+        dialect = db.engine.dialect.name
+
+    count = len(rows)
+    print(f'\n{dialect}, {count} tasks per response, median of {args.repeat} runs\n')
+    print(f"{'path':<48}{'ms':>10}{'rows/s':>12}")
+    for name, seconds in results.items():
+        print(f'{name:<48}{seconds * 1000:>10.1f}{count / seconds:>12,.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Report the import time and memory cost of create_app().
+
+Each scenario runs in a fresh interpreter so module caches don't leak between
+them. Run from the backend directory:
+
+    python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --parse   # also time the first NL parse
+
+For a per-module breakdown use `python -X importtime -c "from app import create_app; create_app()"`.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ['spacy', 'thinc', 'torch', 'numpy', 'pandas', 'sklearn']
+
+PROBE = r'''
+import json, os, sys, time
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+result = {'rss_before_mb': rss_mb()}
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+result['create_app_s'] = time.perf_counter() - started
+result['rss_after_mb'] = rss_mb()
+result['heavy_modules'] = [name for name in HEAVY if name in sys.modules]
+
+if PARSE:
+    from routes.tasks import get_nlp_processor
+    started = time.perf_counter()
+    get_nlp_processor().parse_task('Finish the quarterly report tomorrow, urgent, 2 hours')
+    result['first_parse_s'] = time.perf_counter() - started
+    result['rss_after_parse_mb'] = rss_mb()
+
+print(json.dumps(result))
+'''
+
+def run_scenario(preload, parse):
+    env = dict(os.environ, NLP_PRELOAD='true' if preload else 'false',
+               DATABASE_URL=os.getenv('DATABASE_URL', 'sqlite:///:memory:'))
+    code = f'HEAVY = {HEAVY_MODULES!r}\nPARSE = {parse!r}\n' + PROBE
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--parse', action='store_true', help='also time the first natural language parse')
+    args = parser.parse_args()
+
+    for name, preload in (('lazy (default)', False), ('preloaded (NLP_PRELOAD=true)', True)):
+        result = run_scenario(preload, args.parse)
+        print(f'== {name}')
+        print(f"  create_app():     {result['create_app_s'] * 1000:8.1f} ms")
+        print(f"  RSS after:        {result['rss_after_mb']:8.1f} MB "
+              f"(+{result['rss_after_mb'] - result['rss_before_mb']:.1f} MB)")
+        print(f"  heavy modules:    {', '.join(result['heavy_modules']) or 'none'}")
+        if args.parse:
+            print(f"  first NL parse:   {result['first_parse_s'] * 1000:8.1f} ms")
+            print(f"  RSS after parse:  {result['rss_after_parse_mb']:8.1f} MB")
+
+if __name__ == '__main__':
+    main()
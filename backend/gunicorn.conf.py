@@ -0,0 +1,28 @@
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+# Threads let a worker hold open event streams (/api/events) while serving other
+# requests. A stream keeps its thread for up to EVENTS_MAX_STREAM_SECONDS, so each
+# worker accepts at most EVENTS_MAX_STREAMS of them (half the threads by default)
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = 600
+
+# With NLP_PRELOAD=true the app (and the spaCy model) is loaded once in the
+# master before forking, so workers share those pages copy-on-write
+preload_app = os.getenv('NLP_PRELOAD', 'false').lower() == 'true'
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach; otherwise the
+    # collector touches those objects in each worker and un-shares the pages
+    if preload_app:
+        gc.freeze()
+
+def post_worker_init(worker):
+    # Start the NLP parse pool as each worker boots, so its model is loaded
+    # before the first natural language request instead of during it
+    service = getattr(worker.wsgi, 'extensions', {}).get('parse_service')
+    if service is not None:
+        service.warm()
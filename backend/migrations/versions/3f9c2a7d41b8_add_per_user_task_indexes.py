@@ -0,0 +1,41 @@
+"""Add per-user composite indexes on tasks and task completions
+
+Revision ID: 3f9c2a7d41b8
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d41b8'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_tasks_user_completed_due', 'tasks', ['user_id', 'is_completed', 'due_date']),
+    ('ix_tasks_user_due', 'tasks', ['user_id', 'due_date']),
+    ('ix_tasks_user_completed_at', 'tasks', ['user_id', 'completed_at']),
+    ('ix_task_completions_task_completed', 'task_completions', ['task_id', 'completed_at']),
+]
+
+
+def existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Tables are created by db.create_all(), which also creates these indexes
+    # on fresh databases; only add the ones an older database is missing
+    for name, table, columns in INDEXES:
+        if name not in existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        if name in existing_indexes(table):
+            op.drop_index(name, table_name=table)
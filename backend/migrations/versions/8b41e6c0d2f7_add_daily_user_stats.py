@@ -0,0 +1,46 @@
+"""Add the daily_user_stats rollup table
+
+Revision ID: 8b41e6c0d2f7
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-17 11:00:00.000000
+
+Fill it for existing completions with `flask analytics backfill-daily-stats`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e6c0d2f7'
+down_revision = '3f9c2a7d41b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already creates the table on fresh databases
+    if sa.inspect(op.get_bind()).has_table('daily_user_stats'):
+        return
+
+    op.create_table(
+        'daily_user_stats',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('completions', sa.Integer(), nullable=False),
+        sa.Column('xp', sa.Integer(), nullable=False),
+        sa.Column('minutes', sa.Integer(), nullable=False),
+        sa.Column('work_count', sa.Integer(), nullable=False),
+        sa.Column('study_count', sa.Integer(), nullable=False),
+        sa.Column('personal_count', sa.Integer(), nullable=False),
+        sa.Column('health_count', sa.Integer(), nullable=False),
+        sa.Column('other_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'day', name='uq_daily_user_stats_user_day')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_user_stats')
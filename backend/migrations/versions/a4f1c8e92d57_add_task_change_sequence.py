@@ -0,0 +1,49 @@
+"""Number task changes per user for /api/tasks/changes
+
+Revision ID: a4f1c8e92d57
+Revises: e7d3b8a51c09
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f1c8e92d57'
+down_revision = 'e7d3b8a51c09'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['users', 'tasks', 'task_tombstones']
+
+
+def existing_columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Existing rows get 0, so clients holding an old cursor re-sync from scratch
+    for table in COLUMNS:
+        if 'change_seq' not in existing_columns(table):
+            op.add_column(table, sa.Column('change_seq', sa.Integer(), nullable=False, server_default='0'))
+
+    if 'ix_tasks_user_change_seq' not in existing_indexes('tasks'):
+        op.create_index('ix_tasks_user_change_seq', 'tasks', ['user_id', 'change_seq', 'id'])
+    if 'ix_task_tombstones_user_deleted' in existing_indexes('task_tombstones'):
+        op.drop_index('ix_task_tombstones_user_deleted', table_name='task_tombstones')
+    if 'ix_task_tombstones_user_change_seq' not in existing_indexes('task_tombstones'):
+        op.create_index('ix_task_tombstones_user_change_seq', 'task_tombstones', ['user_id', 'change_seq', 'task_id'])
+
+
+def downgrade():
+    op.drop_index('ix_task_tombstones_user_change_seq', table_name='task_tombstones')
+    op.create_index('ix_task_tombstones_user_deleted', 'task_tombstones', ['user_id', 'deleted_at', 'task_id'])
+    op.drop_index('ix_tasks_user_change_seq', table_name='tasks')
+    for table in reversed(COLUMNS):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('change_seq')
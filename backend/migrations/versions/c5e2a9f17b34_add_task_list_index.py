@@ -0,0 +1,31 @@
+"""Add the per-user (updated_at, id) index used by task list pages
+
+Revision ID: c5e2a9f17b34
+Revises: 8b41e6c0d2f7
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a9f17b34'
+down_revision = '8b41e6c0d2f7'
+branch_labels = None
+depends_on = None
+
+
+def existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # db.create_all() already creates the index on fresh databases
+    if 'ix_tasks_user_updated' not in existing_indexes('tasks'):
+        op.create_index('ix_tasks_user_updated', 'tasks', ['user_id', 'updated_at', 'id'])
+
+
+def downgrade():
+    if 'ix_tasks_user_updated' in existing_indexes('tasks'):
+        op.drop_index('ix_tasks_user_updated', table_name='tasks')
@@ -0,0 +1,38 @@
+"""Add the task_tombstones deletion log
+
+Revision ID: e7d3b8a51c09
+Revises: c5e2a9f17b34
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7d3b8a51c09'
+down_revision = 'c5e2a9f17b34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already creates the table on fresh databases
+    if sa.inspect(op.get_bind()).has_table('task_tombstones'):
+        return
+
+    op.create_table(
+        'task_tombstones',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('task_id', sa.String(length=36), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_tombstones_user_deleted', 'task_tombstones', ['user_id', 'deleted_at', 'task_id'])
+
+
+def downgrade():
+    op.drop_index('ix_task_tombstones_user_deleted', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
@@ -1,4 +1,8 @@
 from .user import User
-from .task import Task, TaskCompletion, TaskCategory
+from .task import Task, TaskCompletion, TaskCategory, TaskTombstone, complete_tasks, uncount_completions, record_task_changes
+from .schedule import Schedule, ScheduledBlock
+from .analytics import AnalyticsEvent, AnalyticsEventType, UserAnalytics, DailyUserStats
 
-__all__ = ['User', 'Task', 'TaskCompletion', 'TaskCategory']
+__all__ = ['User', 'Task', 'TaskCompletion', 'TaskCategory', 'TaskTombstone', 'complete_tasks', 'uncount_completions',
+           'record_task_changes', 'Schedule', 'ScheduledBlock',
+           'AnalyticsEvent', 'AnalyticsEventType', 'UserAnalytics', 'DailyUserStats']
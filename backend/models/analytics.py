@@ -1,8 +1,31 @@
 from .. import db
-from datetime import datetime, date
+from flask import current_app, has_app_context
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
 import uuid
 from enum import Enum
 
+def increment_or_create(model, filters, increments, create):
+    """
+    Apply an atomic UPDATE ... SET x = x + n to the row matching `filters`, or
+    insert it with `create()` if it doesn't exist yet.
+    
+    Runs in the caller's transaction. The insert is attempted in a savepoint;
+    if a concurrent transaction inserted the row first, the update is retried.
+    """
+    if model.query.filter_by(**filters).update(increments, synchronize_session=False):
+        return
+    
+    try:
+        with db.session.begin_nested():
+            db.session.add(create())
+    except IntegrityError:
+        model.query.filter_by(**filters).update(increments, synchronize_session=False)
+
+# Event rows to hand to the buffered writer once the current transaction commits
+PENDING_EVENTS_KEY = 'analytics_pending_events'
+
 class AnalyticsEventType(Enum):
     TASK_COMPLETED = 'task_completed'
     TASK_CREATED = 'task_created'
@@ -25,6 +48,28 @@ class AnalyticsEvent(db.Model):
         self.event_type = event_type
         self.event_data = event_data
     
+    @classmethod
+    def record(cls, user_id, event_type, event_data=None):
+        """
+        Log an event for the user.
+        
+        With the buffered writer installed (see routes.event_writer) the row is
+        queued when the caller's transaction commits and inserted in a later
+        batch; otherwise it is added to the caller's transaction.
+        """
+        writer = current_app.extensions.get('analytics_event_writer') if has_app_context() else None
+        if writer is None:
+            db.session.add(cls(user_id=user_id, event_type=event_type, event_data=event_data or {}))
+            return
+        
+        db.session.info.setdefault(PENDING_EVENTS_KEY, []).append({
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'event_type': event_type,
+            'event_data': event_data or {},
+            'created_at': datetime.utcnow()
+        })
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -54,6 +99,57 @@ class UserAnalytics(db.Model):
         self.user_id = user_id
         self.week_start_date = date.today() - timedelta(days=date.today().weekday())
     
+    @classmethod
+    def blank(cls, user_id):
+        """Zeroed analytics for a user without a row yet; not added to the session"""
+        analytics = cls(user_id=user_id)
+        analytics.total_tasks_completed = analytics.tasks_completed_this_week = 0
+        analytics.current_streak = analytics.best_streak = analytics.total_xp = 0
+        analytics.total_scheduled_time = 0
+        analytics.last_active = date.today()
+        return analytics
+    
+    @classmethod
+    def record_completions(cls, user_id, today, count, xp):
+        """
+        Count completed tasks, their XP and the user's activity streak with one
+        atomic UPDATE (committed with the caller's transaction).
+        
+        The streak grows on the first completion of a day after an active
+        yesterday, and restarts at 1 after a gap. All SET expressions read the
+        row's previous values.
+        """
+        yesterday = today - timedelta(days=1)
+        week_start = today - timedelta(days=today.weekday())
+        
+        streak = case(
+            (cls.last_active == today, cls.current_streak),
+            (cls.last_active == yesterday, cls.current_streak + 1),
+            else_=1
+        )
+        same_week = cls.week_start_date == week_start
+        increments = {
+            'total_tasks_completed': cls.total_tasks_completed + count,
+            'total_xp': cls.total_xp + xp,
+            'current_streak': streak,
+            'best_streak': case((streak > cls.best_streak, streak), else_=cls.best_streak),
+            'last_active': today,
+            'tasks_completed_this_week': case((same_week, cls.tasks_completed_this_week + count), else_=count),
+            'total_scheduled_time': case((same_week, cls.total_scheduled_time), else_=0),
+            'week_start_date': week_start
+        }
+        
+        def create():
+            analytics = cls.blank(user_id)
+            analytics.total_tasks_completed = analytics.tasks_completed_this_week = count
+            analytics.total_xp = xp
+            analytics.current_streak = analytics.best_streak = 1
+            analytics.last_active = today
+            analytics.week_start_date = week_start
+            return analytics
+        
+        increment_or_create(cls, {'user_id': user_id}, increments, create)
+    
     def to_dict(self):
         return {
             'user_id': self.user_id,
@@ -67,49 +163,115 @@ class UserAnalytics(db.Model):
             'total_scheduled_time': self.total_scheduled_time
         }
 
-def update_user_analytics(user_id, event_type, event_data=None):
-    """Update user analytics based on an event"""
-    analytics = UserAnalytics.query.filter_by(user_id=user_id).first()
-    today = date.today()
-    
-    if not analytics:
-        analytics = UserAnalytics(user_id=user_id)
-        db.session.add(analytics)
-    
-    # Update last active date and check streak
-    if analytics.last_active < today - timedelta(days=1):
-        # Reset streak if more than one day has passed
-        analytics.current_streak = 1
-    elif analytics.last_active < today:
-        # Increment streak if user was active yesterday
-        analytics.current_streak += 1
-        if analytics.current_streak > analytics.best_streak:
-            analytics.best_streak = analytics.current_streak
-    
-    analytics.last_active = today
-    
-    # Update weekly metrics
-    week_start = today - timedelta(days=today.weekday())
-    if analytics.week_start_date < week_start:
-        # New week, reset weekly metrics
-        analytics.week_start_date = week_start
-        analytics.tasks_completed_this_week = 0
-        analytics.total_scheduled_time = 0
+class DailyUserStats(db.Model):
+    """
+    Completions per user and day, kept up to date as tasks are completed.
     
-    # Handle specific event types
-    if event_type == AnalyticsEventType.TASK_COMPLETED:
-        analytics.total_tasks_completed += 1
-        analytics.tasks_completed_this_week += 1
-        if event_data and 'xp' in event_data:
-            analytics.total_xp += event_data['xp']
-    
-    # Create analytics event
-    event = AnalyticsEvent(
-        user_id=user_id,
-        event_type=event_type,
-        event_data=event_data or {}
+    Analytics endpoints read these small rows instead of scanning tasks. Like
+    those endpoints did, a row counts the tasks that are completed now, by
+    the day of their completed_at: tasks that are deleted or reopened are
+    taken out again (see uncount_completions), and `rebuild` recomputes the
+    rows from the tasks themselves.
+    """
+    __tablename__ = 'daily_user_stats'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_daily_user_stats_user_day'),
     )
-    db.session.add(event)
-    db.session.commit()
     
-    return analytics
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # UTC day of completion
+    completions = db.Column(db.Integer, default=0, nullable=False)
+    xp = db.Column(db.Integer, default=0, nullable=False)
+    minutes = db.Column(db.Integer, default=0, nullable=False)  # estimated duration of the completed tasks
+    
+    # Completions per task category
+    work_count = db.Column(db.Integer, default=0, nullable=False)
+    study_count = db.Column(db.Integer, default=0, nullable=False)
+    personal_count = db.Column(db.Integer, default=0, nullable=False)
+    health_count = db.Column(db.Integer, default=0, nullable=False)
+    other_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    CATEGORY_COLUMNS = ['work_count', 'study_count', 'personal_count', 'health_count', 'other_count']
+    
+    @staticmethod
+    def category_column(category):
+        """Name of the counter column for a TaskCategory"""
+        return f"{category.name.lower() if category else 'other'}_count"
+    
+    @classmethod
+    def completion_totals(cls, tasks):
+        """Counter values the tasks contribute to a day's row"""
+        totals = {
+            'completions': len(tasks),
+            'xp': sum(task.xp_value or 0 for task in tasks),
+            'minutes': sum(task.estimated_duration or 0 for task in tasks),
+            **{column: 0 for column in cls.CATEGORY_COLUMNS}
+        }
+        for task in tasks:
+            totals[cls.category_column(task.category)] += 1
+        return totals
+    
+    @classmethod
+    def record_completions(cls, user_id, day, tasks):
+        """Add completed tasks to the user's row for the day (committed with the caller's transaction)"""
+        totals = cls.completion_totals(tasks)
+        increments = {column: getattr(cls, column) + value for column, value in totals.items() if value}
+        increment_or_create(
+            cls, {'user_id': user_id, 'day': day}, increments,
+            lambda: cls(user_id=user_id, day=day, **totals)
+        )
+    
+    @classmethod
+    def remove_completions(cls, user_id, day, tasks):
+        """Take tasks completed on `day` back out of the user's row (committed with the caller's transaction)"""
+        totals = cls.completion_totals(tasks)
+        decrements = {column: getattr(cls, column) - value for column, value in totals.items() if value}
+        cls.query.filter_by(user_id=user_id, day=day).update(decrements, synchronize_session=False)
+    
+    @classmethod
+    def rebuild(cls, user_id):
+        """Recompute a user's rows from their completed tasks; returns the number of rows written"""
+        from .task import Task
+        
+        completed_day = func.date(Task.completed_at)
+        groups = db.session.query(
+            completed_day,
+            Task.category,
+            func.count(Task.id),
+            func.sum(func.coalesce(Task.xp_value, 0)),
+            func.sum(func.coalesce(Task.estimated_duration, 0))
+        ).filter(
+            Task.user_id == user_id,
+            Task.is_completed == True,
+            Task.completed_at.isnot(None)
+        ).group_by(completed_day, Task.category).all()
+        
+        rows = {}
+        for day, category, completions, xp, minutes in groups:
+            day = day if isinstance(day, date) else date.fromisoformat(day)
+            row = rows.get(day)
+            if row is None:
+                row = rows[day] = cls(user_id=user_id, day=day, completions=0, xp=0, minutes=0,
+                                      **{column: 0 for column in cls.CATEGORY_COLUMNS})
+            row.completions += completions
+            row.xp += xp or 0
+            row.minutes += minutes or 0
+            column = cls.category_column(category)
+            setattr(row, column, getattr(row, column) + completions)
+        
+        cls.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        db.session.add_all(rows.values())
+        return len(rows)
+    
+    def category_counts(self):
+        return {column[:-len('_count')].capitalize(): getattr(self, column) for column in self.CATEGORY_COLUMNS}
+    
+    def to_dict(self):
+        return {
+            'date': self.day.isoformat(),
+            'completions': self.completions,
+            'xp': self.xp,
+            'minutes': self.minutes,
+            'categories': self.category_counts()
+        }
@@ -0,0 +1,123 @@
+from .. import db
+from datetime import datetime
+import uuid
+
+class Schedule(db.Model):
+    __tablename__ = 'schedules'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), unique=True, nullable=False)
+    version = db.Column(db.Integer, default=0, nullable=False)  # bumped whenever the blocks change
+    params_key = db.Column(db.String(40))  # hash of the generate parameters that produced the blocks
+    is_stale = db.Column(db.Boolean, default=True, nullable=False)  # set when the user's tasks change
+    optimization = db.Column(db.JSON)  # optimizer statistics, if generated in "optimize" mode
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    blocks = db.relationship('ScheduledBlock', backref='schedule', lazy=True,
+                             cascade='all, delete-orphan', order_by='ScheduledBlock.start_time')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    @property
+    def etag(self):
+        return f'{self.id}-{self.version}'
+    
+    def is_fresh_for(self, params_key):
+        """Whether the stored blocks can be served for a generate call with these parameters"""
+        return not self.is_stale and self.params_key == params_key
+    
+    @classmethod
+    def invalidate(cls, user_id):
+        """Mark the user's schedule stale without loading it (committed with the caller's transaction)"""
+        cls.query.filter_by(user_id=user_id).update({'is_stale': True}, synchronize_session=False)
+    
+    @classmethod
+    def for_user(cls, user_id):
+        """Get the user's schedule, creating an empty one if needed"""
+        schedule = cls.query.filter_by(user_id=user_id).first()
+        if not schedule:
+            schedule = cls(user_id=user_id)
+            db.session.add(schedule)
+        return schedule
+
+    def replace_blocks(self, entries, params_key=None, optimization=None):
+        """Replace all scheduled blocks with freshly generated schedule entries"""
+        if self.id:
+            ScheduledBlock.query.filter_by(schedule_id=self.id).delete(synchronize_session=False)
+            db.session.expire(self, ['blocks'])
+        else:
+            db.session.flush()
+
+        blocks = [ScheduledBlock.from_entry(self.id, entry) for entry in entries]
+        db.session.add_all(blocks)
+
+        self.params_key = params_key
+        self.optimization = optimization
+        self.is_stale = False
+        self.touch()
+
+        return blocks
+
+    def touch(self):
+        """Record that the blocks changed"""
+        self.version = (self.version or 0) + 1
+        self.updated_at = datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'version': self.version,
+            'is_stale': self.is_stale,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'blocks': [block.to_dict() for block in self.blocks]
+        }
+
+class ScheduledBlock(db.Model):
+    __tablename__ = 'scheduled_blocks'
+    __table_args__ = (
+        db.Index('ix_scheduled_blocks_schedule_start', 'schedule_id', 'start_time'),
+        db.Index('ix_scheduled_blocks_schedule_task', 'schedule_id', 'task_id'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    schedule_id = db.Column(db.String(36), db.ForeignKey('schedules.id'), nullable=False)
+    task_id = db.Column(db.String(36), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    priority = db.Column(db.Integer, default=2)
+    energy_level = db.Column(db.Integer, default=3)
+    category = db.Column(db.String(20))
+
+    @classmethod
+    def from_entry(cls, schedule_id, entry):
+        """Create a block from a scheduler entry (ISO strings or datetimes)"""
+        start_time = entry['start_time']
+        end_time = entry['end_time']
+        return cls(
+            id=str(uuid.uuid4()),
+            schedule_id=schedule_id,
+            task_id=entry['task_id'],
+            title=entry['title'],
+            start_time=datetime.fromisoformat(start_time) if isinstance(start_time, str) else start_time,
+            end_time=datetime.fromisoformat(end_time) if isinstance(end_time, str) else end_time,
+            priority=entry.get('priority', 2),
+            energy_level=entry.get('energy_level', 3),
+            category=entry.get('category')
+        )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'task_id': self.task_id,
+            'title': self.title,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+            'priority': self.priority,
+            'energy_level': self.energy_level,
+            'category': self.category
+        }
@@ -1,4 +1,7 @@
 from .. import db
+from .analytics import DailyUserStats, UserAnalytics, AnalyticsEvent, AnalyticsEventType
+from sqlalchemy import event, func
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime, timedelta
 import uuid
 from enum import Enum
@@ -12,6 +15,18 @@ class TaskCategory(Enum):
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Per-user lookups by status and deadline (task lists, suggestions, upcoming deadlines)
+        db.Index('ix_tasks_user_completed_due', 'user_id', 'is_completed', 'due_date'),
+        # Per-user deadline ranges regardless of status (today's tasks, insights)
+        db.Index('ix_tasks_user_due', 'user_id', 'due_date'),
+        # Per-user completion history (dashboard, heatmap, productivity)
+        db.Index('ix_tasks_user_completed_at', 'user_id', 'completed_at'),
+        # Per-user task list pages, newest change first (keyset pagination)
+        db.Index('ix_tasks_user_updated', 'user_id', 'updated_at', 'id'),
+        # Per-user changes since a sync cursor (/api/tasks/changes)
+        db.Index('ix_tasks_user_change_seq', 'user_id', 'change_seq', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
@@ -24,6 +39,7 @@ class Task(db.Model):
     due_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0)  # see number_task_changes
     is_completed = db.Column(db.Boolean, default=False)
     completed_at = db.Column(db.DateTime)
     xp_value = db.Column(db.Integer, default=10)  # XP points for completing this task
@@ -59,25 +75,22 @@ class Task(db.Model):
             
         return max(5, min(xp, 100))  # Cap XP between 5 and 100
     
-    def mark_complete(self):
-        self.is_completed = True
-        self.completed_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
-        
-        # Create a completion record
-        completion = TaskCompletion(
-            task_id=self.id,
-            completed_at=self.completed_at,
-            xp_earned=self.xp_value
-        )
-        db.session.add(completion)
-        
-        # Add XP to user
-        user = self.user
-        user.add_xp(self.xp_value)
-        user.update_streak()
-        
-        db.session.commit()
+    def mark_complete(self, commit=True):
+        """Complete the task and credit the user (see complete_tasks)"""
+        complete_tasks(self.user_id, [self], commit=commit)
+    
+    def mark_incomplete(self):
+        """Reopen the task and take it out of the daily rollup (committed with the caller's transaction)"""
+        uncount_completions(self.user_id, [self])
+        self.is_completed = False
+        self.completed_at = None
+    
+    # Columns serialized by to_dict, in order; list endpoints select them as plain rows
+    FIELDS = [
+        'id', 'user_id', 'title', 'description', 'category', 'priority', 'energy_level',
+        'estimated_duration', 'due_date', 'created_at', 'updated_at', 'is_completed',
+        'completed_at', 'xp_value'
+    ]
     
     def to_dict(self):
         return {
@@ -97,8 +110,88 @@ class Task(db.Model):
             'xp_value': self.xp_value
         }
 
+def complete_tasks(user_id, tasks, commit=True):
+    """
+    Complete a user's tasks in one unit of work.
+    
+    Writes the completion rows, the user's XP and streak, the UserAnalytics
+    counters and the daily rollup, and logs one AnalyticsEvent per task (see
+    AnalyticsEvent.record). Counters are changed by atomic
+    UPDATE ... SET x = x + n so concurrent completions never lose increments.
+    Tasks a concurrent request completed first are skipped.
+    
+    Returns:
+        The completed tasks and the XP they earned
+    """
+    from .user import User
+    
+    now = datetime.utcnow()
+    tasks = [task for task in tasks if not task.is_completed]
+    if not tasks:
+        return [], 0
+    
+    # Claim the tasks; only the ones still open get credited
+    ids = [task.id for task in tasks]
+    claimed = Task.query.filter(Task.id.in_(ids), Task.is_completed == False).update(
+        {'is_completed': True, 'completed_at': now, 'updated_at': now}, synchronize_session=False
+    )
+    if claimed < len(tasks):
+        ours = {row.id for row in db.session.query(Task.id).filter(Task.id.in_(ids), Task.completed_at == now)}
+        tasks = [task for task in tasks if task.id in ours]
+        if not tasks:
+            return [], 0
+    
+    for task in tasks:
+        # Reflect the UPDATE on the loaded objects without flushing it again
+        set_committed_value(task, 'is_completed', True)
+        set_committed_value(task, 'completed_at', now)
+        set_committed_value(task, 'updated_at', now)
+    
+    xp = sum(task.xp_value or 0 for task in tasks)
+    db.session.add_all([
+        TaskCompletion(task_id=task.id, completed_at=now, xp_earned=task.xp_value) for task in tasks
+    ])
+    for task in tasks:
+        AnalyticsEvent.record(user_id, AnalyticsEventType.TASK_COMPLETED, {
+            'task_id': task.id,
+            'xp': task.xp_value,
+            'category': task.category.value if task.category else None
+        })
+    
+    UserAnalytics.record_completions(user_id, now.date(), len(tasks), xp)
+    DailyUserStats.record_completions(user_id, now.date(), tasks)
+    
+    # The user's streak mirrors the activity streak counted above
+    streaks = db.session.query(UserAnalytics).filter(UserAnalytics.user_id == User.id)
+    User.query.filter_by(id=user_id).update({
+        'xp_points': func.coalesce(User.xp_points, 0) + xp,
+        'current_streak': streaks.with_entities(UserAnalytics.current_streak).scalar_subquery(),
+        'best_streak': streaks.with_entities(UserAnalytics.best_streak).scalar_subquery()
+    }, synchronize_session=False)
+    
+    if commit:
+        db.session.commit()
+    
+    return tasks, xp
+
+def uncount_completions(user_id, tasks):
+    """
+    Take the completed ones among `tasks` out of the daily rollup, before they
+    are deleted, reopened or edited (committed with the caller's transaction).
+    """
+    by_day = {}
+    for task in tasks:
+        if task.is_completed and task.completed_at:
+            by_day.setdefault(task.completed_at.date(), []).append(task)
+    
+    for day, day_tasks in by_day.items():
+        DailyUserStats.remove_completions(user_id, day, day_tasks)
+
 class TaskCompletion(db.Model):
     __tablename__ = 'task_completions'
+    __table_args__ = (
+        db.Index('ix_task_completions_task_completed', 'task_id', 'completed_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'), nullable=False)
@@ -112,3 +205,89 @@ class TaskCompletion(db.Model):
             'completed_at': self.completed_at.isoformat(),
             'xp_earned': self.xp_earned
         }
+
+class TaskTombstone(db.Model):
+    """
+    A deleted task, kept so clients syncing from /api/tasks/changes learn
+    about the deletion. Tombstones older than the sync retention are pruned.
+    """
+    __tablename__ = 'task_tombstones'
+    __table_args__ = (
+        # Per-user deletions since a sync cursor
+        db.Index('ix_task_tombstones_user_change_seq', 'user_id', 'change_seq', 'task_id'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    task_id = db.Column(db.String(36), nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def record(cls, user_id, task_ids):
+        """Add tombstones for deleted tasks (committed with the caller's transaction)"""
+        now = datetime.utcnow()
+        db.session.bulk_insert_mappings(cls, [
+            {'id': str(uuid.uuid4()), 'user_id': user_id, 'task_id': task_id, 'deleted_at': now}
+            for task_id in task_ids
+        ])
+    
+    @classmethod
+    def prune(cls, before):
+        """Delete tombstones older than `before`; returns how many were removed"""
+        return cls.query.filter(cls.deleted_at < before).delete(synchronize_session=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.task_id,
+            'deleted_at': self.deleted_at.isoformat()
+        }
+
+# Task ids changed and deleted per user in the current transaction, numbered when it commits
+PENDING_SYNC_KEY = 'task_sync_pending'
+
+def record_task_changes(user_id, changed=(), deleted=()):
+    """Number the user's changed and deleted tasks for /api/tasks/changes once the current transaction commits"""
+    pending = db.session.info.setdefault(PENDING_SYNC_KEY, {})
+    changed_ids, deleted_ids = pending.setdefault(user_id, (set(), set()))
+    changed_ids.update(changed)
+    deleted_ids.update(deleted)
+
+@event.listens_for(db.session, 'before_commit')
+def number_task_changes(session):
+    """
+    Stamp each user's task changes in the committing transaction with the
+    user's next change sequence number.
+    
+    Bumping users.change_seq locks the user's row until the commit, so one
+    user's transactions become visible in sequence order and a sync cursor
+    never skips a change that commits late, as an updated_at cursor would.
+    """
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop(PENDING_SYNC_KEY, None)
+    if not pending:
+        return
+    
+    from .user import User
+    
+    for user_id, (changed, deleted) in pending.items():
+        User.query.filter_by(id=user_id).update(
+            {'change_seq': func.coalesce(User.change_seq, 0) + 1}, synchronize_session=False
+        )
+        change_seq = session.query(User.change_seq).filter_by(id=user_id).scalar()
+        if changed:
+            # Keep updated_at; numbering isn't an edit
+            Task.query.filter(Task.user_id == user_id, Task.id.in_(changed)).update(
+                {'change_seq': change_seq, 'updated_at': Task.updated_at}, synchronize_session=False
+            )
+        if deleted:
+            TaskTombstone.query.filter(TaskTombstone.user_id == user_id, TaskTombstone.task_id.in_(deleted)).update(
+                {'change_seq': change_seq}, synchronize_session=False
+            )
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_task_changes(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop(PENDING_SYNC_KEY, None)
@@ -15,6 +15,7 @@ class User(db.Model):
     xp_points = db.Column(db.Integer, default=0)
     current_streak = db.Column(db.Integer, default=0)
     best_streak = db.Column(db.Integer, default=0)
+    change_seq = db.Column(db.Integer, nullable=False, default=0)  # last sync number given to the user's task changes
     
     # Relationships
     tasks = db.relationship('Task', backref='user', lazy=True, cascade='all, delete-orphan')
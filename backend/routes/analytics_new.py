@@ -1,17 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta, date
 from sqlalchemy import func, extract, and_
-from ..models import db, Task, UserAnalytics, AnalyticsEvent, AnalyticsEventType
+from ..models import db, User, Task, UserAnalytics, AnalyticsEvent, AnalyticsEventType, DailyUserStats
+from .cache import cached_response
+from .serialization import column_dicts
+import click
 import numpy as np
 
 bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
 @bp.route('/dashboard', methods=['GET'])
 @jwt_required()
+@cached_response
 def get_dashboard_metrics():
     """
-    Get all metrics needed for the dashboard
+    Get all metrics needed for the dashboard (served from the response cache until the user's tasks change)
     Returns:
         - User stats (streak, xp, level)
         - Today's tasks
@@ -24,19 +28,15 @@ def get_dashboard_metrics():
     week_start = today - timedelta(days=today.weekday())
     week_end = week_start + timedelta(days=6)
     
-    # Get user analytics
-    user_analytics = UserAnalytics.query.filter_by(user_id=user_id).first()
-    if not user_analytics:
-        user_analytics = UserAnalytics(user_id=user_id)
-        db.session.add(user_analytics)
-        db.session.commit()
+    # Get user analytics (zeroed for users with no activity yet; nothing is written on a GET)
+    user_analytics = UserAnalytics.query.filter_by(user_id=user_id).first() or UserAnalytics.blank(user_id)
     
     # Get today's tasks
-    today_tasks = Task.query.filter(
+    today_tasks = column_dicts(Task.query.filter(
         Task.user_id == user_id,
         Task.due_date >= datetime.combine(today, datetime.min.time()),
         Task.due_date < datetime.combine(today + timedelta(days=1), datetime.min.time())
-    ).order_by(Task.priority.desc(), Task.due_date).all()
+    ).order_by(Task.priority.desc(), Task.due_date), [Task.id, Task.title, Task.priority, Task.due_date, Task.is_completed])
     
     # Calculate weekly completion
     week_completed = Task.query.filter(
@@ -63,7 +63,7 @@ def get_dashboard_metrics():
         Task.is_completed == False,
         Task.due_date >= datetime.utcnow(),
         Task.due_date <= datetime.utcnow() + timedelta(days=3)
-    ).order_by(Task.due_date).limit(5).all()
+    ).order_by(Task.due_date).limit(5).with_entities(Task.id, Task.title, Task.due_date, Task.priority).all()
     
     # Calculate level based on XP (simplified)
     level = int((user_analytics.total_xp // 1000) + 1)
@@ -80,27 +80,35 @@ def get_dashboard_metrics():
                 'xp_to_next_level': xp_to_next_level,
                 'level_progress': int((xp_to_next_level / 1000) * 100)
             },
-            'today_tasks': [{
-                'id': task.id,
-                'title': task.title,
-                'priority': task.priority,
-                'due_date': task.due_date.isoformat() if task.due_date else None,
-                'is_completed': task.is_completed
-            } for task in today_tasks],
+            'today_tasks': today_tasks,
             'weekly_completion': round(weekly_completion, 1),
             'productivity_score': productivity_score,
             'upcoming_deadlines': [{
                 'id': task.id,
                 'title': task.title,
-                'due_date': task.due_date.isoformat(),
+                'due_date': task.due_date,
                 'priority': task.priority,
                 'days_until_due': (task.due_date.date() - today).days
             } for task in upcoming_deadlines]
         }
     }), 200
 
+def daily_stats(user_id, start_date, end_date):
+    """The user's rollup rows from start_date to end_date (inclusive), keyed by day"""
+    rows = DailyUserStats.query.filter(
+        DailyUserStats.user_id == user_id,
+        DailyUserStats.day >= start_date,
+        DailyUserStats.day <= end_date
+    ).all()
+    return {row.day: row for row in rows}
+
+def window_param(name, default, maximum):
+    """Integer query parameter clamped to 1..maximum; raises ValueError if not an integer"""
+    return max(1, min(int(request.args.get(name, default)), maximum))
+
 @bp.route('/heatmap', methods=['GET'])
 @jwt_required()
+@cached_response
 def get_heatmap_data():
     """
     Get data for the activity heatmap
@@ -110,27 +118,19 @@ def get_heatmap_data():
     end_date = date.today()
     start_date = end_date - timedelta(weeks=11)  # 12 weeks total
     
-    # Get completed tasks in this period
-    completed_tasks = Task.query.filter(
-        Task.user_id == user_id,
-        Task.is_completed == True,
-        Task.completed_at >= start_date,
-        Task.completed_at <= end_date + timedelta(days=1)
-    ).all()
+    # One small rollup row per active day
+    stats = daily_stats(user_id, start_date, end_date)
     
     # Initialize heatmap data
     heatmap_data = []
     current_date = start_date
     
     while current_date <= end_date:
-        # Count tasks completed on this day
-        count = sum(1 for task in completed_tasks 
-                   if task.completed_at and 
-                   task.completed_at.date() == current_date)
+        row = stats.get(current_date)
         
         heatmap_data.append({
             'date': current_date.isoformat(),
-            'count': count,
+            'count': row.completions if row else 0,
             'weekday': current_date.weekday(),  # 0 = Monday, 6 = Sunday
             'week_number': int(current_date.strftime('%W'))  # ISO week number
         })
@@ -142,57 +142,165 @@ def get_heatmap_data():
         'data': heatmap_data
     }), 200
 
+@bp.route('/trend', methods=['GET'])
+@jwt_required()
+@cached_response
+def get_trend_data():
+    """
+    Get daily completions, XP and minutes with per-category counts
+    
+    Query parameters (optional):
+        days: Length of the window ending today (defaults to 30, at most 365)
+    """
+    user_id = get_jwt_identity()
+    today = date.today()
+    
+    try:
+        days = window_param('days', 30, 365)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'days must be an integer'
+        }), 400
+    
+    start_date = today - timedelta(days=days - 1)
+    stats = daily_stats(user_id, start_date, today)
+    
+    trend = []
+    for i in range(days):
+        day = start_date + timedelta(days=i)
+        row = stats.get(day) or DailyUserStats(day=day, completions=0, xp=0, minutes=0,
+                                               **{column: 0 for column in DailyUserStats.CATEGORY_COLUMNS})
+        trend.append(row.to_dict())
+    
+    return jsonify({
+        'status': 'success',
+        'data': trend
+    }), 200
+
+@bp.route('/weekday', methods=['GET'])
+@jwt_required()
+@cached_response
+def get_weekday_data():
+    """
+    Get completions, XP and minutes by day of the week
+    
+    Query parameters (optional):
+        weeks: Number of weeks ending today to include (defaults to 12, at most 52)
+    """
+    user_id = get_jwt_identity()
+    today = date.today()
+    
+    try:
+        weeks = window_param('weeks', 12, 52)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'weeks must be an integer'
+        }), 400
+    
+    stats = daily_stats(user_id, today - timedelta(weeks=weeks) + timedelta(days=1), today)
+    
+    weekdays = [{'weekday': i, 'completions': 0, 'xp': 0, 'minutes': 0} for i in range(7)]  # 0 = Monday
+    for day, row in stats.items():
+        totals = weekdays[day.weekday()]
+        totals['completions'] += row.completions
+        totals['xp'] += row.xp
+        totals['minutes'] += row.minutes
+    
+    for totals in weekdays:
+        totals['average_completions'] = round(totals['completions'] / weeks, 2)
+    
+    return jsonify({
+        'status': 'success',
+        'weeks': weeks,
+        'data': weekdays
+    }), 200
+
+@bp.cli.command('backfill-daily-stats')
+@click.option('--user-id', help='Only rebuild this user\'s rows')
+def backfill_daily_stats(user_id):
+    """Rebuild the daily_user_stats rollup from the completed tasks."""
+    user_ids = [user_id] if user_id else [row.id for row in db.session.query(User.id)]
+    
+    rows = 0
+    for current_user_id in user_ids:
+        # One transaction per user keeps memory and lock time bounded
+        rows += DailyUserStats.rebuild(current_user_id)
+        db.session.commit()
+    
+    click.echo(f'Rebuilt {rows} daily rows for {len(user_ids)} users')
+
+@bp.route('/events/stats', methods=['GET'])
+@jwt_required()
+def get_event_writer_stats():
+    """Queue depth and batch, drop and failure counters of this worker's analytics event writer"""
+    writer = current_app.extensions.get('analytics_event_writer')
+    return jsonify(writer.stats() if writer else {'enabled': False}), 200
+
 @bp.route('/productivity', methods=['GET'])
 @jwt_required()
+@cached_response
 def get_productivity_metrics():
     """
     Get productivity metrics and trends
+    
+    Query parameters (optional):
+        days: Length of the window ending today (defaults to 30, at most 365)
+    
+    Everything is computed from one grouped query over the window, so the
+    cost doesn't grow with its length.
     """
     user_id = get_jwt_identity()
     today = date.today()
     
-    # Get completion data for the last 30 days
-    completion_data = []
-    for i in range(30):
-        day = today - timedelta(days=29-i)
-        completed = Task.query.filter(
-            Task.user_id == user_id,
-            Task.is_completed == True,
-            func.date(Task.completed_at) == day
-        ).count()
-        
-        completion_data.append({
-            'date': day.isoformat(),
-            'completed': completed
-        })
+    try:
+        days = window_param('days', 30, 365)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'days must be an integer'
+        }), 400
     
-    # Calculate average tasks per day
-    avg_tasks = sum(d['completed'] for d in completion_data) / 30
+    # Half-open range on the raw column so the index on completed_at can be used
+    first_day = today - timedelta(days=days - 1)
+    window_start = datetime.combine(first_day, datetime.min.time())
+    window_end = datetime.combine(today + timedelta(days=1), datetime.min.time())
     
-    # Get task distribution by time of day
-    time_distribution = db.session.query(
-        extract('hour', Task.completed_at).label('hour'),
+    completed_day = func.date(Task.completed_at).label('day')
+    completed_hour = extract('hour', Task.completed_at).label('hour')
+    rows = db.session.query(
+        completed_day,
+        completed_hour,
+        Task.category,
         func.count(Task.id).label('count')
     ).filter(
         Task.user_id == user_id,
         Task.is_completed == True,
-        Task.completed_at >= today - timedelta(days=30)
-    ).group_by('hour').order_by('hour').all()
+        Task.completed_at >= window_start,
+        Task.completed_at < window_end
+    ).group_by(completed_day, completed_hour, Task.category).all()
     
-    # Format time distribution
+    # Fold the (day, hour, category) counts into the three series
+    by_day = {}
     time_data = [0] * 24
-    for hour, count in time_distribution:
-        time_data[int(hour)] = count
+    by_category = {}
+    for day, hour, category, count in rows:
+        day = day if isinstance(day, date) else date.fromisoformat(day)
+        by_day[day] = by_day.get(day, 0) + count
+        time_data[int(hour)] += count
+        by_category[category] = by_category.get(category, 0) + count
     
-    # Get category distribution
-    category_distribution = db.session.query(
-        Task.category,
-        func.count(Task.id).label('count')
-    ).filter(
-        Task.user_id == user_id,
-        Task.is_completed == True,
-        Task.completed_at >= today - timedelta(days=30)
-    ).group_by(Task.category).all()
+    completion_data = []
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        completion_data.append({
+            'date': day.isoformat(),
+            'completed': by_day.get(day, 0)
+        })
+    
+    # Calculate average tasks per day
+    avg_tasks = sum(by_day.values()) / days
     
     return jsonify({
         'status': 'success',
@@ -202,13 +310,14 @@ def get_productivity_metrics():
             'time_distribution': time_data,
             'category_distribution': [
                 {'category': str(cat), 'count': count} 
-                for cat, count in category_distribution
+                for cat, count in by_category.items()
             ]
         }
     }), 200
 
 @bp.route('/insights', methods=['GET'])
 @jwt_required()
+@cached_response
 def get_insights():
     """
     Generate AI-powered insights based on user's activity
@@ -0,0 +1,252 @@
+from flask import current_app, has_app_context, request
+from flask_jwt_extended import get_jwt_identity
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from sqlalchemy import event
+from ..models import db
+import os
+import sqlite3
+import threading
+import time
+
+# Users whose cached responses must be dropped once the current transaction commits
+PENDING_KEY = 'response_cache_changed_users'
+
+class SQLiteResponseCacheBackend:
+    """
+    Generation counters and cached responses shared by all worker processes through a local SQLite file.
+
+    Each process and thread opens its own connection; WAL mode lets readers
+    and the writer proceed without blocking each other.
+    """
+
+    PRUNE_EVERY = 500  # writes between removals of expired rows
+
+    def __init__(self, path, max_rows=20000):
+        self.path = path
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_generations ('
+                'user_id TEXT PRIMARY KEY, generation INTEGER NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cached_responses ('
+                'key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def generation(self, user_id):
+        row = self._connection().execute(
+            'SELECT generation FROM cache_generations WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, user_id):
+        self._connection().execute(
+            'INSERT INTO cache_generations (user_id, generation) VALUES (?, 1) '
+            'ON CONFLICT(user_id) DO UPDATE SET generation = generation + 1',
+            (user_id,)
+        )
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT body, etag FROM cached_responses WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def set(self, key, body, etag, ttl_seconds):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cached_responses (key, body, etag, expires_at) VALUES (?, ?, ?, ?)',
+            (key, body, etag, time.time() + ttl_seconds)
+        )
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then the rows closest to expiry beyond `max_rows`."""
+        connection = self._connection()
+        connection.execute('DELETE FROM cached_responses WHERE expires_at <= ?', (time.time(),))
+        connection.execute(
+            'DELETE FROM cached_responses WHERE key IN ('
+            'SELECT key FROM cached_responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_rows,)
+        )
+
+class ResponseCache:
+    """
+    LRU cache of serialized GET responses, per user and URL.
+
+    Keys include a per-user generation counter, so invalidating a user is a
+    counter bump: their old entries are never looked up again and age out of
+    the LRU. Keys also include today's date, since responses are relative to
+    it, and entries expire after `ttl_seconds` to bound staleness from the
+    clock. With a shared backend, the counters (and the responses) live in a
+    SQLite file so every worker sees an invalidation.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=60, backend=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, user_id):
+        if self.backend:
+            try:
+                return self.backend.generation(user_id)
+            except sqlite3.Error:
+                pass  # Fall back to this process's counters
+        return self._generations.get(user_id, 0)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        if self.backend:
+            try:
+                self.backend.bump(user_id)
+            except sqlite3.Error:
+                pass
+
+    def make_key(self, user_id, path):
+        return f'{user_id}|{self.generation(user_id)}|{date.today().isoformat()}|{path}'
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, etag, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body, etag
+                del self._entries[key]
+
+        shared = None
+        if self.backend:
+            try:
+                shared = self.backend.get(key)
+            except sqlite3.Error:
+                pass
+
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, shared[0], shared[1], now)
+        return shared
+
+    def set(self, key, body, etag):
+        with self._lock:
+            self._store(key, body, etag, time.monotonic())
+        if self.backend:
+            try:
+                self.backend.set(key, body, etag, self.ttl_seconds)
+            except sqlite3.Error:
+                pass
+
+    def _store(self, key, body, etag, now):
+        self._entries[key] = (body, etag, now + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'shared': self.backend is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def init_response_cache(app):
+    """Create the response cache from the app config"""
+    config = app.config
+    if config['RESPONSE_CACHE_SIZE'] <= 0:
+        return
+
+    backend = SQLiteResponseCacheBackend(config['RESPONSE_CACHE_PATH']) if config['RESPONSE_CACHE_PATH'] else None
+    cache = ResponseCache(
+        max_size=config['RESPONSE_CACHE_SIZE'],
+        ttl_seconds=config['RESPONSE_CACHE_TTL'],
+        backend=backend
+    )
+    app.extensions['response_cache'] = cache
+
+# Registered once for the shared session; each app's cache is looked up when its transaction ends
+@event.listens_for(db.session, 'after_commit')
+def invalidate_changed_users(session):
+    user_ids = session.info.pop(PENDING_KEY, ())
+    cache = current_app.extensions.get('response_cache') if has_app_context() else None
+    if cache is None:
+        return
+    for user_id in user_ids:
+        cache.invalidate(user_id)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_changed_users(session, previous_transaction):
+    # A savepoint rollback leaves the outer transaction's changes, and their invalidations, in place
+    if previous_transaction.nested:
+        return
+    session.info.pop(PENDING_KEY, None)
+
+def invalidate_user_responses(user_id):
+    """Drop the user's cached responses once the current transaction commits"""
+    db.session.info.setdefault(PENDING_KEY, set()).add(user_id)
+
+def cached_response(view):
+    """
+    Serve a GET view from the per-user response cache, with ETag/304 support.
+
+    Place below @jwt_required(); only 200 responses are cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        if cache is None:
+            return view(*args, **kwargs)
+
+        # The key is taken before running the view, so a response computed
+        # while the user's data changes is stored under the old generation
+        key = cache.make_key(get_jwt_identity(), request.full_path)
+        entry = cache.get(key)
+
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            response.add_etag()
+            cache.set(key, response.get_data(), response.get_etag()[0])
+        else:
+            body, etag = entry
+            response = current_app.response_class(body, mimetype='application/json')
+            response.set_etag(etag)
+
+        # Let browsers revalidate instead of refetching the body
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+
+    return wrapper
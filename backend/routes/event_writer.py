@@ -0,0 +1,137 @@
+from flask import current_app, has_app_context
+from collections import deque
+from sqlalchemy import event
+from ..models import db, AnalyticsEvent
+from ..models.analytics import PENDING_EVENTS_KEY
+import atexit
+import os
+import threading
+
+class AnalyticsEventWriter:
+    """
+    Buffers AnalyticsEvent rows in memory and inserts them in batches from a background thread.
+
+    A batch is written when `batch_size` rows are waiting or every
+    `flush_interval_ms`, whichever comes first, as one executemany INSERT
+    (sent as multi-row INSERT statements where the driver supports it) and
+    one commit. At most `max_queued` rows are held; further rows are dropped
+    and counted, as are rows whose batch failed to insert. Pending rows are
+    flushed on shutdown.
+    """
+
+    def __init__(self, app, max_queued=10000, batch_size=500, flush_interval_ms=1000):
+        self.app = app
+        self.max_queued = max_queued
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._thread_pid = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def enqueue(self, rows):
+        """Queue event rows for the next batch; never blocks on the database"""
+        with self._lock:
+            accepted = max(0, min(len(rows), self.max_queued - len(self._rows)))
+            self._rows.extend(rows[:accepted])
+            self.enqueued += accepted
+            self.dropped += len(rows) - accepted
+            full = len(self._rows) >= self.batch_size
+
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._stopping or (self._thread is not None and self._thread_pid == os.getpid()):
+                return
+            # Not started yet, or inherited through a fork without its thread
+            self._thread = threading.Thread(target=self._run, name='analytics-event-writer', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every queued row, one batch at a time"""
+        with self._flush_lock, self.app.app_context():
+            while True:
+                with self._lock:
+                    batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+                if not batch:
+                    return
+
+                try:
+                    db.session.execute(AnalyticsEvent.__table__.insert(), batch)
+                    db.session.commit()
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception:
+                    db.session.rollback()
+                    self.failed += len(batch)
+                    self.app.logger.exception('Dropped %d analytics events after a failed insert', len(batch))
+
+    def shutdown(self, timeout=5):
+        """Stop the background thread and write what is still queued"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            queued = len(self._rows)
+        return {
+            'queued': queued,
+            'max_queued': self.max_queued,
+            'batch_size': self.batch_size,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
+def init_event_writer(app):
+    """Create the buffered analytics event writer from the app config"""
+    config = app.config
+    if config['ANALYTICS_EVENT_QUEUE'] <= 0:
+        return
+
+    writer = AnalyticsEventWriter(
+        app,
+        max_queued=config['ANALYTICS_EVENT_QUEUE'],
+        batch_size=config['ANALYTICS_EVENT_BATCH'],
+        flush_interval_ms=config['ANALYTICS_EVENT_FLUSH_MS']
+    )
+    app.extensions['analytics_event_writer'] = writer
+    atexit.register(writer.shutdown)
+
+# Registered once for the shared session; each app's writer is looked up when its transaction ends
+@event.listens_for(db.session, 'after_commit')
+def enqueue_committed_events(session):
+    rows = session.info.pop(PENDING_EVENTS_KEY, None)
+    writer = current_app.extensions.get('analytics_event_writer') if has_app_context() else None
+    if rows and writer is not None:
+        writer.enqueue(rows)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_pending_events(session, previous_transaction):
+    # A savepoint rollback (see increment_or_create) keeps the outer transaction's events
+    if previous_transaction.nested:
+        return
+    session.info.pop(PENDING_EVENTS_KEY, None)
@@ -0,0 +1,82 @@
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .pubsub import StreamLimitReached
+import time
+
+bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+def format_event(event_id, event_type, data):
+    """One Server-Sent Events message"""
+    return f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
+
+@bp.route('', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    """
+    Stream the user's change events as Server-Sent Events
+
+    Browsers' EventSource can't send headers, so the access token may be
+    passed as ?jwt=<token>. Events:
+        tasks: {"changed": [task ids], "deleted": [task ids]}, fetch them from /api/tasks/changes
+        schedule: {"status": "stale" | "generated" | "updated"}
+        analytics: {"status": "stale"}, refetch the analytics being shown
+        reset: {}, events were missed, reload everything
+
+    A comment line is sent every EVENTS_HEARTBEAT_SECONDS to keep proxies from
+    closing an idle stream. Streams end after EVENTS_MAX_STREAM_SECONDS;
+    EventSource reconnects with Last-Event-ID and receives what it missed.
+    Waiting for events doesn't touch the database. Once the worker holds
+    EVENTS_MAX_STREAMS streams, new ones get 503 and EventSource retries later.
+    """
+    user_id = get_jwt_identity()
+    bus = current_app.extensions.get('event_bus')
+    if bus is None:
+        return jsonify({'error': 'Event streams are disabled'}), 404
+
+    config = current_app.config
+    heartbeat = config['EVENTS_HEARTBEAT_SECONDS']
+    deadline = time.monotonic() + config['EVENTS_MAX_STREAM_SECONDS']
+
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = -1  # unknown position, reload everything
+
+    try:
+        subscription, reset = bus.subscribe(user_id, last_event_id)
+    except StreamLimitReached:
+        response = jsonify({'error': 'Too many open event streams, retry later'})
+        response.headers['Retry-After'] = str(config['EVENTS_RETRY_MS'] // 1000 or 1)
+        return response, 503
+
+    def generate():
+        try:
+            yield f"retry: {config['EVENTS_RETRY_MS']}\n\n"
+            if reset:
+                yield format_event(subscription.last_id, 'reset', '{}')
+
+            while not subscription.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if event is not None:
+                    yield format_event(event.id, event.type, event.data)
+                elif not subscription.closed:
+                    yield ': ping\n\n'
+        finally:
+            bus.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # don't let nginx buffer the stream
+    })
+
+@bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_event_stats():
+    """Open streams and published events in this worker process"""
+    bus = current_app.extensions.get('event_bus')
+    return jsonify(bus.stats() if bus else {'enabled': False}), 200
@@ -0,0 +1,331 @@
+from collections import deque, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from ..models import db
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Events to publish once the current transaction commits
+PENDING_KEY = 'pubsub_pending_events'
+
+Event = namedtuple('Event', ['id', 'user_id', 'type', 'data'])
+
+class StreamLimitReached(Exception):
+    """The process already holds its maximum number of open streams"""
+
+class MemoryEventBackend:
+    """Recent events of this process only; enough for a single worker."""
+
+    shared = False
+
+    def __init__(self, max_rows=1000):
+        self._events = deque(maxlen=max_rows)
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def append(self, user_id, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            self._events.append(Event(self._last_id, user_id, event_type, data))
+            return self._events[-1]
+
+    def since(self, after_id, user_id=None):
+        with self._lock:
+            return [e for e in self._events if e.id > after_id and (user_id is None or e.user_id == user_id)]
+
+    def id_range(self):
+        """Oldest retained and latest event ids (0, 0 when empty)"""
+        with self._lock:
+            return (self._events[0].id, self._last_id) if self._events else (0, self._last_id)
+
+class SQLiteEventBackend:
+    """
+    Event log shared by all worker processes through a local SQLite file.
+
+    Every worker appends the events it publishes and tails the log for the
+    events of its subscribers, so ids are global and any worker can resume
+    a stream. Only the newest `max_rows` events are kept.
+    """
+
+    shared = True
+    PRUNE_EVERY = 200  # writes between removals of old rows
+
+    def __init__(self, path, max_rows=1000):
+        self.path = path
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, '
+                'type TEXT NOT NULL, data TEXT NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_events_user ON events (user_id, id)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def append(self, user_id, event_type, data):
+        cursor = self._connection().execute(
+            'INSERT INTO events (user_id, type, data) VALUES (?, ?, ?)', (user_id, event_type, data)
+        )
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._connection().execute('DELETE FROM events WHERE id <= ?', (cursor.lastrowid - self.max_rows,))
+        return Event(cursor.lastrowid, user_id, event_type, data)
+
+    def since(self, after_id, user_id=None):
+        if user_id is None:
+            rows = self._connection().execute(
+                'SELECT id, user_id, type, data FROM events WHERE id > ? ORDER BY id', (after_id,)
+            )
+        else:
+            rows = self._connection().execute(
+                'SELECT id, user_id, type, data FROM events WHERE user_id = ? AND id > ? ORDER BY id',
+                (user_id, after_id)
+            )
+        return [Event(*row) for row in rows]
+
+    def id_range(self):
+        """Oldest retained and latest event ids (0, 0 when empty)"""
+        oldest, latest = self._connection().execute('SELECT MIN(id), MAX(id) FROM events').fetchone()
+        if latest is None:
+            # An emptied log still continues its ids
+            row = self._connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+            return 0, row[0] if row else 0
+        return oldest, latest
+
+class Subscription:
+    """One open event stream: a bounded queue of the user's events."""
+
+    def __init__(self, user_id, last_id, max_queued):
+        self.user_id = user_id
+        self.last_id = last_id
+        self.closed = False
+        self._queue = queue.Queue(maxsize=max_queued)
+
+    def put(self, event):
+        """Queue an event unless already delivered; a client that falls too far behind is disconnected"""
+        if self.closed or event.id <= self.last_id:
+            return
+        try:
+            self._queue.put_nowait(event)
+            self.last_id = event.id
+        except queue.Full:
+            # It resumes from its Last-Event-ID when it reconnects
+            self.close()
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds or once closed"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)  # wake the stream
+        except queue.Full:
+            pass
+
+class EventBus:
+    """
+    Publish/subscribe of per-user change events for the event streams.
+
+    With a shared backend, published events go to the SQLite log and one
+    thread per process tails it (every `poll_interval` seconds, and only
+    while someone is subscribed) to fan them out to the local subscribers.
+    Otherwise events are delivered directly within the process.
+
+    Each user may hold `max_per_user` streams per process; a new stream
+    replaces their oldest one, which is usually a closed tab whose socket
+    hasn't timed out yet. Every open stream occupies a server thread, so at
+    most `max_streams` are open per process (0 for no limit); beyond that,
+    subscribe raises StreamLimitReached unless the stream replaces one of
+    the user's own.
+    """
+
+    def __init__(self, backend=None, max_per_user=3, max_queued=100, poll_interval=0.25, max_streams=0):
+        self.backend = backend or MemoryEventBackend()
+        self.max_per_user = max_per_user
+        self.max_streams = max_streams
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._poller = None
+        self._poller_pid = None
+        self.published = 0
+        self.publish_errors = 0
+        self.rejected = 0
+
+    def publish(self, user_id, event_type, data):
+        try:
+            event = self.backend.append(user_id, event_type, json.dumps(data, separators=(',', ':')))
+        except sqlite3.Error:
+            self.publish_errors += 1
+            return None
+
+        self.published += 1
+        if not self.backend.shared:
+            self._dispatch([event])
+        return event
+
+    def subscribe(self, user_id, last_event_id=None):
+        """
+        Open a stream for the user, resuming after `last_event_id` if given.
+
+        Returns the subscription and whether the client must reload its data
+        because the events since `last_event_id` are no longer available.
+        """
+        self._ensure_poller()
+        reset = False
+
+        with self._lock:
+            open_streams = sum(len(streams) for streams in self._subscribers.values())
+            replaces_own = len(self._subscribers.get(user_id, ())) >= self.max_per_user
+            if self.max_streams and open_streams >= self.max_streams and not replaces_own:
+                self.rejected += 1
+                raise StreamLimitReached()
+
+            try:
+                oldest, latest = self.backend.id_range()
+                missed = None
+                if last_event_id is not None and oldest - 1 <= last_event_id <= latest:
+                    missed = self.backend.since(last_event_id, user_id)
+            except sqlite3.Error:
+                oldest = latest = 0
+                missed = None
+
+            subscription = Subscription(user_id, latest, self.max_queued)
+            if last_event_id is not None:
+                if missed is None or len(missed) >= self.max_queued:
+                    reset = True
+                else:
+                    subscription.last_id = last_event_id
+                    for event in missed:
+                        subscription.put(event)
+                    subscription.last_id = max(subscription.last_id, latest)
+
+            streams = self._subscribers.setdefault(user_id, [])
+            streams.append(subscription)
+            while len(streams) > self.max_per_user:
+                streams.pop(0).close()
+
+        self._wakeup.set()
+        return subscription, reset
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id, [])
+            if subscription in streams:
+                streams.remove(subscription)
+            if not streams:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def _dispatch(self, events):
+        with self._lock:
+            for event in events:
+                for subscription in self._subscribers.get(event.user_id, ()):
+                    subscription.put(event)
+
+    def _ensure_poller(self):
+        if not self.backend.shared:
+            return
+        with self._lock:
+            if self._poller is not None and self._poller_pid == os.getpid():
+                return
+            # Not started yet, or inherited through a fork without its thread.
+            # Start from the current end of the log, read before anyone subscribes.
+            try:
+                last_id = self.backend.id_range()[1]
+            except sqlite3.Error:
+                last_id = 0
+            self._poller = threading.Thread(target=self._poll, args=(last_id,), name='event-bus-poller', daemon=True)
+            self._poller_pid = os.getpid()
+            self._poller.start()
+
+    def _poll(self, last_id):
+        while True:
+            if not self._subscribers:
+                # Sleep until someone subscribes
+                self._wakeup.clear()
+                if not self._subscribers:
+                    self._wakeup.wait()
+
+            time.sleep(self.poll_interval)
+            try:
+                events = self.backend.since(last_id)
+            except sqlite3.Error:
+                continue
+            if events:
+                last_id = events[-1].id
+                self._dispatch(events)
+
+    def stats(self):
+        with self._lock:
+            streams = sum(len(streams) for streams in self._subscribers.values())
+            users = len(self._subscribers)
+        return {
+            'streams': streams,
+            'users': users,
+            'shared': self.backend.shared,
+            'published': self.published,
+            'publish_errors': self.publish_errors,
+            'max_streams': self.max_streams,
+            'rejected': self.rejected
+        }
+
+def init_event_bus(app):
+    """Create the event bus from the app config"""
+    config = app.config
+    path = config['EVENTS_PATH']
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    backend = SQLiteEventBackend(path, config['EVENTS_HISTORY']) if path else MemoryEventBackend(config['EVENTS_HISTORY'])
+
+    bus = EventBus(
+        backend=backend,
+        max_per_user=config['EVENTS_MAX_STREAMS_PER_USER'],
+        poll_interval=config['EVENTS_POLL_INTERVAL_MS'] / 1000,
+        max_streams=config['EVENTS_MAX_STREAMS']
+    )
+    app.extensions['event_bus'] = bus
+
+# Registered once for the shared session; each app's bus is looked up when its transaction ends
+@event.listens_for(db.session, 'after_commit')
+def publish_pending(session):
+    pending = session.info.pop(PENDING_KEY, ())
+    bus = current_app.extensions.get('event_bus') if has_app_context() else None
+    if bus is None:
+        return
+    for user_id, event_type, data in pending:
+        bus.publish(user_id, event_type, data)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_pending(session, previous_transaction):
+    # A savepoint rollback leaves the outer transaction's changes, and their events, in place
+    if previous_transaction.nested:
+        return
+    session.info.pop(PENDING_KEY, None)
+
+def publish_after_commit(user_id, event_type, data):
+    """Publish an event to the user's streams once the current transaction commits"""
+    pending = db.session.info.setdefault(PENDING_KEY, [])
+    if (user_id, event_type, data) not in pending:
+        pending.append((user_id, event_type, data))
@@ -1,12 +1,30 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
-from ..models import db, Task
+from ..models import db, Task, Schedule, ScheduledBlock
 from ..ai.scheduler import Scheduler
+from ..ai.rescheduler import ScheduleRepairer
+from ..ai.optimizer import ScheduleOptimizer
+from ..ai.scoring import TaskColumns, urgency_scores, top_k
+from .pubsub import publish_after_commit
+from .serialization import column_dicts
+import hashlib
 import json
 
 bp = Blueprint('scheduler', __name__, url_prefix='/api/scheduler')
 
+# Task columns the scheduler reads; task_to_dict accepts these rows as well as Task objects
+SCHEDULER_COLUMNS = [
+    Task.id, Task.title, Task.description, Task.priority, Task.energy_level, Task.estimated_duration,
+    Task.due_date, Task.category, Task.is_completed, Task.created_at, Task.updated_at
+]
+
+# Columns of ScheduledBlock.to_dict
+BLOCK_COLUMNS = [
+    ScheduledBlock.id, ScheduledBlock.task_id, ScheduledBlock.title, ScheduledBlock.start_time,
+    ScheduledBlock.end_time, ScheduledBlock.priority, ScheduledBlock.energy_level, ScheduledBlock.category
+]
+
 def task_to_dict(task):
     """Convert Task model to dictionary"""
     return {
@@ -23,6 +41,17 @@ def task_to_dict(task):
         'updated_at': task.updated_at.isoformat()
     }
 
+def schedule_params_key(data, start_date, end_date, mode):
+    """Hash the generate parameters that affect the result (the scheduler works in whole days)"""
+    params = {
+        'start_date': start_date.date().isoformat(),
+        'end_date': end_date.date().isoformat(),
+        'mode': mode,
+        'include_completed': bool(data.get('include_completed', False)),
+        'work_hours': data.get('work_hours') or {}
+    }
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
 @bp.route('/generate', methods=['POST'])
 @jwt_required()
 def generate_schedule():
@@ -37,8 +66,14 @@ def generate_schedule():
             "start": "09:00",                 // Optional, defaults to 9:00
             "end": "21:00"                    // Optional, defaults to 21:00
         },
-        "include_completed": false            // Optional, defaults to false
+        "include_completed": false,           // Optional, defaults to false
+        "mode": "greedy",                     // Optional, "greedy" (default) or "optimize"
+        "time_budget_ms": 200                 // Optional, search budget for "optimize" mode
     }
+    
+    Repeat calls with the same parameters are served from the saved schedule
+    until one of the user's tasks changes. The response carries an ETag; send
+    it back in If-None-Match to get a 304 when nothing changed.
     """
     user_id = get_jwt_identity()
     
@@ -49,12 +84,70 @@ def generate_schedule():
     start_date = datetime.fromisoformat(data.get('start_date')) if 'start_date' in data else datetime.utcnow()
     end_date = datetime.fromisoformat(data.get('end_date')) if 'end_date' in data else start_date + timedelta(days=7)
     
+    mode = data.get('mode', 'greedy')
+    if mode not in ('greedy', 'optimize'):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid mode: expected "greedy" or "optimize"'
+        }), 400
+    
+    time_budget_ms = None
+    if mode == 'optimize':
+        # Clients may ask for a shorter search, never a longer one
+        max_budget = current_app.config['SCHEDULER_TIME_BUDGET_MS']
+        try:
+            time_budget_ms = int(data.get('time_budget_ms', max_budget))
+            if time_budget_ms < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({
+                'status': 'error',
+                'message': 'time_budget_ms must be a non-negative integer'
+            }), 400
+        time_budget_ms = min(time_budget_ms, max_budget)
+    
+    response = {
+        'status': 'success',
+        'message': 'Schedule generated successfully',
+        'mode': mode,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat()
+    }
+    
+    # Serve the saved schedule if it was generated with the same parameters
+    params_key = schedule_params_key(data, start_date, end_date, mode)
+    schedule = Schedule.query.filter_by(user_id=user_id).first()
+    
+    if schedule and schedule.is_fresh_for(params_key):
+        if request.if_none_match.contains(schedule.etag):
+            not_modified = current_app.response_class(status=304)
+            not_modified.set_etag(schedule.etag)
+            return not_modified
+        
+        blocks = column_dicts(
+            ScheduledBlock.query.filter_by(schedule_id=schedule.id).order_by(ScheduledBlock.start_time),
+            BLOCK_COLUMNS
+        )
+        response.update({
+            'message': 'Schedule loaded',
+            'schedule': blocks,
+            'tasks_scheduled': len(blocks),
+            'version': schedule.version,
+            'cached': True
+        })
+        if schedule.optimization:
+            response['optimization'] = schedule.optimization
+        
+        cached = jsonify(response)
+        cached.set_etag(schedule.etag)
+        return cached, 200
+    
     # Get tasks
     query = Task.query.filter_by(user_id=user_id)
     if not data.get('include_completed', False):
         query = query.filter_by(is_completed=False)
     
-    tasks = query.all()
+    tasks = query.with_entities(*SCHEDULER_COLUMNS).all()
     
     if not tasks:
         return jsonify({
@@ -71,18 +164,42 @@ def generate_schedule():
     
     # Generate schedule
     try:
-        schedule = scheduler.create_schedule(tasks_data, start_date, end_date)
+        work_hours = data.get('work_hours') or {}
+        for key in ('start', 'end'):
+            if work_hours.get(key):
+                scheduler.work_hours[key] = datetime.strptime(work_hours[key], '%H:%M').time()
         
-        return jsonify({
-            'status': 'success',
-            'message': 'Schedule generated successfully',
-            'schedule': schedule,
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat(),
-            'tasks_scheduled': len([t for day in schedule for t in day if t.get('task_id')])
-        }), 200
+        optimization = None
+        if mode == 'optimize':
+            optimization = ScheduleOptimizer(scheduler, time_budget_ms=time_budget_ms).optimize(
+                tasks_data, start_date, end_date
+            )
+            schedule_entries = optimization.pop('schedule')
+            response['optimization'] = optimization
+        else:
+            schedule_entries = scheduler.create_schedule(tasks_data, start_date, end_date)
+        
+        # Persist the schedule so it can be served again and edited incrementally
+        schedule = schedule or Schedule.for_user(user_id)
+        blocks = schedule.replace_blocks(schedule_entries, params_key=params_key, optimization=optimization)
+        publish_after_commit(user_id, 'schedule', {'status': 'generated'})
+        
+        # Serialize before the commit expires the blocks and the schedule,
+        # which would reload each of them with its own query
+        response['schedule'] = [block.to_dict() for block in blocks]
+        response['tasks_scheduled'] = len(blocks)
+        response['version'] = schedule.version
+        response['cached'] = False
+        etag = schedule.etag
+        
+        db.session.commit()
+        
+        generated = jsonify(response)
+        generated.set_etag(etag)
+        return generated, 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'status': 'error',
             'message': f'Error generating schedule: {str(e)}'
@@ -92,51 +209,139 @@ def generate_schedule():
 @jwt_required()
 def reschedule_task():
     """
-    Reschedule a specific task to a new time
+    Edit the user's saved schedule and repair overlaps around the change
     
     Request body:
     {
+        "operation": "move",                  // Optional, one of move (default), insert, remove, extend
         "task_id": "task-uuid-123",
-        "new_start_time": "2023-01-01T14:00:00",
-        "current_schedule": [...]  // The current schedule array
+        "new_start_time": "2023-01-01T14:00:00",  // Required for move and insert
+        "duration": 45,                       // Optional for insert, defaults to the task estimate
+        "minutes": 20                         // Required for extend: how much longer the task ran (positive)
     }
+    
+    Only the blocks that changed are returned.
     """
     user_id = get_jwt_identity()
-    data = request.get_json()
+    data = request.get_json() or {}
+    operation = data.get('operation', 'move')
+    
+    required = {
+        'move': ['task_id', 'new_start_time'],
+        'insert': ['task_id', 'new_start_time'],
+        'remove': ['task_id'],
+        'extend': ['task_id', 'minutes']
+    }
     
     # Validate request
-    if not all(key in data for key in ['task_id', 'new_start_time', 'current_schedule']):
+    if operation not in required:
         return jsonify({
             'status': 'error',
-            'message': 'Missing required fields: task_id, new_start_time, current_schedule'
+            'message': f'Invalid operation: {operation}'
         }), 400
     
+    if not all(key in data for key in required[operation]):
+        return jsonify({
+            'status': 'error',
+            'message': f'Missing required fields: {", ".join(required[operation])}'
+        }), 400
+    
+    minutes = None
+    if operation == 'extend':
+        try:
+            minutes = int(data['minutes'])
+            if minutes <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({
+                'status': 'error',
+                'message': 'minutes must be a positive integer'
+            }), 400
+    
+    schedule = Schedule.query.filter_by(user_id=user_id).first()
+    if not schedule:
+        return jsonify({
+            'status': 'error',
+            'message': 'No saved schedule, generate one first'
+        }), 404
+    
+    task_id = data['task_id']
+    block = ScheduledBlock.query.filter_by(schedule_id=schedule.id, task_id=task_id).first()
+    
+    if operation == 'insert':
+        if block:
+            return jsonify({
+                'status': 'error',
+                'message': 'Task is already scheduled'
+            }), 400
+    elif not block:
+        return jsonify({
+            'status': 'error',
+            'message': 'Task not found in schedule'
+        }), 404
+    
     try:
-        # Initialize scheduler
-        scheduler = Scheduler(user_id=user_id)
+        new_start_time = None
+        if 'new_start_time' in required[operation]:
+            new_start_time = datetime.fromisoformat(data['new_start_time'].replace('Z', '+00:00')).replace(tzinfo=None)
         
-        # Parse new start time
-        new_start_time = datetime.fromisoformat(data['new_start_time'].replace('Z', '+00:00'))
+        # Blocks that end before the edit can neither move nor overlap it
+        anchor = min(t for t in (new_start_time, block.start_time if block else None) if t is not None)
+        repairer = ScheduleRepairer(ScheduledBlock.query.filter(
+            ScheduledBlock.schedule_id == schedule.id,
+            ScheduledBlock.end_time > anchor
+        ).order_by(ScheduledBlock.start_time).all(), scheduler=Scheduler(user_id=user_id))
         
-        # Reschedule the task
-        updated_schedule = scheduler.reschedule_task(
-            task_id=data['task_id'],
-            current_schedule=data['current_schedule'],
-            new_time=new_start_time
-        )
+        if operation == 'move':
+            changes = repairer.move(task_id, new_start_time)
+        elif operation == 'insert':
+            task = Task.query.filter_by(id=task_id, user_id=user_id).first()
+            if not task:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Task not found'
+                }), 404
+            
+            duration = int(data.get('duration') or task.estimated_duration or 30)
+            block = ScheduledBlock.from_entry(schedule.id, {
+                **task_to_dict(task),
+                'task_id': task.id,
+                'start_time': new_start_time,
+                'end_time': new_start_time + timedelta(minutes=duration)
+            })
+            db.session.add(block)
+            changes = repairer.insert(block)
+        elif operation == 'remove':
+            changes = repairer.remove(task_id)
+            for block in changes['removed']:
+                db.session.delete(block)
+        else:
+            changes = repairer.extend(task_id, minutes)
         
-        return jsonify({
+        schedule.touch()
+        publish_after_commit(user_id, 'schedule', {'status': 'updated'})
+        
+        # Serialize before the commit expires the blocks, which would reload each of them
+        response = {
             'status': 'success',
             'message': 'Task rescheduled successfully',
-            'updated_schedule': updated_schedule
-        }), 200
+            'operation': operation,
+            'version': schedule.version,
+            'updated': [block.to_dict() for block in changes['updated']],
+            'removed': [block.task_id for block in changes['removed']]
+        }
+        db.session.commit()
+        
+        return jsonify(response), 200
         
     except ValueError as e:
+        db.session.rollback()
         return jsonify({
             'status': 'error',
-            'message': f'Invalid date format: {str(e)}'
+            'message': f'Invalid value: {str(e)}'
         }), 400
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'status': 'error',
             'message': f'Error rescheduling task: {str(e)}'
@@ -146,42 +351,56 @@ def reschedule_task():
 @jwt_required()
 def suggest_task():
     """
-    Suggest a task to work on now based on current time and energy levels
+    Suggest tasks to work on now based on priority, due dates and energy levels
+    
+    Query parameters (optional):
+        limit: Number of suggestions to return (defaults to 1, at most 50)
+        energy: Energy the user has available right now (1-5)
     """
     user_id = get_jwt_identity()
     current_time = datetime.utcnow()
     
-    # Get user's tasks
-    tasks = Task.query.filter_by(user_id=user_id, is_completed=False).all()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 1)), 50))
+        energy = int(request.args['energy']) if 'energy' in request.args else None
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'limit and energy must be integers'
+        }), 400
+    
+    # Load only the columns needed for scoring
+    rows = db.session.query(
+        Task.id, Task.priority, Task.due_date, Task.energy_level, Task.estimated_duration, Task.title
+    ).filter(Task.user_id == user_id, Task.is_completed == False).all()
     
-    if not tasks:
+    if not rows:
         return jsonify({
             'status': 'success',
             'message': 'No tasks to suggest',
-            'suggestion': None
+            'suggestion': None,
+            'suggestions': []
         }), 200
     
-    # Convert tasks to dict format
-    tasks_data = [task_to_dict(task) for task in tasks]
+    columns = TaskColumns.from_rows([row[:5] for row in rows])
+    scores = urgency_scores(columns, current_time, available_energy=energy)
     
-    # Sort tasks by priority and due date
-    suggested_task = sorted(
-        tasks_data,
-        key=lambda x: (
-            -x.get('priority', 2),
-            x.get('due_date', '9999-12-31')  # Tasks without due date go to the end
-        )
-    )[0]  # Get the highest priority task
+    suggestions = []
+    for i in top_k(scores, limit):
+        task_id, priority, due_date, energy_level, estimated_duration, title = rows[i]
+        suggestions.append({
+            'task_id': task_id,
+            'title': title,
+            'priority': priority,
+            'energy_level': energy_level,
+            'estimated_duration': estimated_duration,
+            'due_date': due_date.isoformat() if due_date else None,
+            'score': round(float(scores[i]), 3)
+        })
     
     return jsonify({
         'status': 'success',
         'message': 'Task suggestion generated',
-        'suggestion': {
-            'task_id': suggested_task['id'],
-            'title': suggested_task['title'],
-            'priority': suggested_task['priority'],
-            'energy_level': suggested_task['energy_level'],
-            'estimated_duration': suggested_task['estimated_duration'],
-            'due_date': suggested_task['due_date']
-        }
+        'suggestion': suggestions[0],
+        'suggestions': suggestions
     }), 200
@@ -1,20 +1,293 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-from ..models import db, Task, TaskCompletion, TaskCategory
-from ..ai.nlp_processor import NLPProcessor
+from sqlalchemy import tuple_
+from datetime import datetime, timedelta
+import atexit
+import base64
+import binascii
+import time
+import click
+import uuid
+from ..models import (
+    db, Task, TaskCompletion, TaskCategory, TaskTombstone, Schedule, DailyUserStats,
+    complete_tasks, uncount_completions, record_task_changes
+)
+from ..ai.nlp_processor import get_nlp_processor
+from ..ai.parse_cache import ParseCache, SQLiteParseCacheBackend
+from ..ai.parse_service import ParseService
+from .cache import invalidate_user_responses
+from .pubsub import publish_after_commit
+from .serialization import column_dicts
 
 bp = Blueprint('tasks', __name__, url_prefix='/api/tasks')
-nlp_processor = NLPProcessor()
+
+def init_nlp(app):
+    """Attach the parse cache to the shared NLP processor, start the parse service and optionally preload the model."""
+    config = app.config
+    processor = get_nlp_processor()
+    
+    if config['NLP_CACHE_SIZE'] > 0:
+        backend = SQLiteParseCacheBackend(config['NLP_CACHE_PATH']) if config['NLP_CACHE_PATH'] else None
+        processor.cache = ParseCache(
+            max_size=config['NLP_CACHE_SIZE'],
+            ttl_seconds=config['NLP_CACHE_TTL'],
+            backend=backend
+        )
+    
+    # Single natural language tasks are parsed off the request threads
+    service = ParseService(
+        processor,
+        workers=config['NLP_WORKERS'],
+        max_pending=config['NLP_QUEUE_DEPTH'],
+        timeout_ms=config['NLP_PARSE_TIMEOUT_MS']
+    )
+    app.extensions['parse_service'] = service
+    atexit.register(service.shutdown)
+    
+    # Load the spaCy model up front when running under gunicorn --preload, so
+    # workers forked from the master share its pages instead of each loading it.
+    # The parse service then parses on threads using this model (see ParseService);
+    # gunicorn's post_worker_init hook starts it in each worker.
+    if config['NLP_PRELOAD']:
+        processor.load()
+
+def tasks_changed(user_id, changed=(), deleted=()):
+    """Invalidate data derived from the user's tasks and notify their event streams; committed with the caller's transaction."""
+    Schedule.invalidate(user_id)
+    invalidate_user_responses(user_id)
+    record_task_changes(user_id, changed, deleted)
+    publish_after_commit(user_id, 'tasks', {'changed': list(changed), 'deleted': list(deleted)})
+    publish_after_commit(user_id, 'schedule', {'status': 'stale'})
+    publish_after_commit(user_id, 'analytics', {'status': 'stale'})
+
+def build_task(user_id, data):
+    """Create a Task from request or parsed data; raises on invalid values."""
+    return Task(
+        user_id=user_id,
+        title=data['title'],
+        description=data.get('description', ''),
+        category=parse_category(data.get('category', 'OTHER')),
+        priority=int(data.get('priority', 2)),
+        energy_level=int(data.get('energy_level', 3)),
+        estimated_duration=int(data.get('estimated_duration', 30)),
+        due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None
+    )
+
+def parse_category(value):
+    """TaskCategory from its name, case-insensitively; raises ValueError on unknown names."""
+    try:
+        return TaskCategory[value.upper()]
+    except (KeyError, AttributeError):
+        raise ValueError(f'Invalid category: {value}')
+
+def apply_task_changes(task, data):
+    """
+    Set the editable fields present in data on a task; raises on invalid values.
+    
+    Every value is converted before any is assigned, so a task is either fully
+    updated or left untouched.
+    """
+    converters = {
+        'title': lambda value: value,
+        'description': lambda value: value,
+        'category': parse_category,
+        'priority': int,
+        'energy_level': int,
+        'estimated_duration': int,
+        'due_date': lambda value: datetime.fromisoformat(value) if value else None
+    }
+    changes = {field: convert(data[field]) for field, convert in converters.items() if field in data}
+    
+    # A completed task is counted in the daily rollup under its category and duration
+    recount = task.is_completed and task.completed_at and ('category' in changes or 'estimated_duration' in changes)
+    if recount:
+        uncount_completions(task.user_id, [task])
+    
+    for field, value in changes.items():
+        setattr(task, field, value)
+    
+    if recount:
+        DailyUserStats.record_completions(task.user_id, task.completed_at.date(), [task])
+
+def encode_cursor(timestamp, task_id):
+    """Opaque cursor for a position in (timestamp, task id) order"""
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{task_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        timestamp, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(timestamp), task_id
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+def encode_sync_cursor(change_seq, task_id, synced_at):
+    """Opaque /changes cursor: a position in (change_seq, task id) order and when the sync it continues began"""
+    return base64.urlsafe_b64encode(f'{change_seq}|{task_id}|{synced_at.isoformat()}'.encode()).decode()
+
+def decode_sync_cursor(cursor):
+    """Inverse of encode_sync_cursor; raises ValueError on a malformed cursor"""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        if len(parts) == 2:
+            # A cursor from before change numbering; only a full sync can continue it
+            return 0, '', datetime.min
+        change_seq, task_id, synced_at = parts
+        return int(change_seq), task_id, datetime.fromisoformat(synced_at)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor')
 
 @bp.route('', methods=['GET'])
 @jwt_required()
 def get_tasks():
+    """
+    List the user's tasks, most recently changed first, one page at a time
+    
+    Query parameters (all optional):
+        limit: Page size (default TASKS_PAGE_SIZE, at most TASKS_MAX_PAGE_SIZE)
+        cursor: next_cursor from the previous page
+        completed: true or false
+        category: Task category name, e.g. work
+        due_after, due_before: ISO datetimes bounding due_date (after is inclusive)
+        fields: Comma separated task fields to return, e.g. id,title,due_date
+    
+    Pages are keyset paginated on (updated_at, id), so each page costs the
+    same however much history the user has. next_cursor is null on the last page.
+    """
     user_id = get_jwt_identity()
-    tasks = Task.query.filter_by(user_id=user_id).all()
+    config = current_app.config
+    args = request.args
+    
+    try:
+        limit = int(args.get('limit', config['TASKS_PAGE_SIZE']))
+        if not 1 <= limit <= config['TASKS_MAX_PAGE_SIZE']:
+            raise ValueError(f"limit must be between 1 and {config['TASKS_MAX_PAGE_SIZE']}")
+        
+        query = Task.query.filter(Task.user_id == user_id)
+        
+        if 'completed' in args:
+            if args['completed'].lower() not in ('true', 'false'):
+                raise ValueError('completed must be true or false')
+            query = query.filter(Task.is_completed == (args['completed'].lower() == 'true'))
+        if 'category' in args:
+            query = query.filter(Task.category == TaskCategory[args['category'].upper()])
+        if 'due_after' in args:
+            query = query.filter(Task.due_date >= datetime.fromisoformat(args['due_after']))
+        if 'due_before' in args:
+            query = query.filter(Task.due_date < datetime.fromisoformat(args['due_before']))
+        if 'cursor' in args:
+            query = query.filter(tuple_(Task.updated_at, Task.id) < decode_cursor(args['cursor']))
+        
+        fields = Task.FIELDS
+        if 'fields' in args:
+            fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+            unknown = [field for field in fields if field not in Task.FIELDS]
+            if not fields or unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}" if unknown else 'fields is empty')
+    except KeyError as e:
+        return jsonify({'error': f'Invalid category: {e.args[0]}'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Only the requested columns are selected; the cursor also needs id and updated_at
+    selected = [*fields, *(field for field in ('id', 'updated_at') if field not in fields)]
+    query = query.order_by(Task.updated_at.desc(), Task.id.desc()).limit(limit + 1)
+    tasks = column_dicts(query, [getattr(Task, field) for field in selected])
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+    next_cursor = encode_cursor(tasks[-1]['updated_at'], tasks[-1]['id']) if has_more else None
+    
+    if len(selected) > len(fields):
+        tasks = [{field: task[field] for field in fields} for task in tasks]
+    
+    return jsonify({
+        'tasks': tasks,
+        'next_cursor': next_cursor
+    }), 200
+
+@bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_task_changes():
+    """
+    Tasks created or updated, and tasks deleted, since a sync cursor
+    
+    Query parameters (all optional):
+        since: cursor from the previous response; omit for a full sync
+        limit: Changes per response (default TASKS_PAGE_SIZE, at most TASKS_MAX_PAGE_SIZE)
+    
+    Changes come oldest first, in the order their transactions committed:
+    each commit gives the user's changed tasks and deletions the user's next
+    change_seq (see number_task_changes), and both share one cursor on
+    (change_seq, task id). Keep calling with the returned cursor while
+    has_more is true. A cursor from a sync that began more than
+    TASK_TOMBSTONE_DAYS ago gets a 410, since the deletions it would need may
+    have been pruned; the client must then sync from scratch.
+    """
+    user_id = get_jwt_identity()
+    config = current_app.config
+    
+    try:
+        limit = int(request.args.get('limit', config['TASKS_PAGE_SIZE']))
+        if not 1 <= limit <= config['TASKS_MAX_PAGE_SIZE']:
+            raise ValueError(f"limit must be between 1 and {config['TASKS_MAX_PAGE_SIZE']}")
+        since = decode_sync_cursor(request.args['since']) if 'since' in request.args else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    now = datetime.utcnow()
+    if since and since[2] < now - timedelta(days=config['TASK_TOMBSTONE_DAYS']):
+        return jsonify({'error': 'Cursor expired, sync from scratch'}), 410
+    
+    tasks_query = Task.query.filter(Task.user_id == user_id)
+    if since:
+        tasks_query = tasks_query.filter(tuple_(Task.change_seq, Task.id) > since[:2])
+    tasks_query = tasks_query.order_by(Task.change_seq, Task.id).limit(limit + 1)
+    tasks = column_dicts(tasks_query, [*(getattr(Task, field) for field in Task.FIELDS), Task.change_seq])
+    changes = [(task.pop('change_seq'), task['id'], 'tasks', task) for task in tasks]
+    
+    # A full sync only needs the tasks that exist now
+    if since:
+        tombstones_query = TaskTombstone.query.filter(
+            TaskTombstone.user_id == user_id,
+            tuple_(TaskTombstone.change_seq, TaskTombstone.task_id) > since[:2]
+        ).order_by(TaskTombstone.change_seq, TaskTombstone.task_id).limit(limit + 1)
+        tombstones = column_dicts(tombstones_query, [
+            TaskTombstone.task_id.label('id'), TaskTombstone.deleted_at, TaskTombstone.change_seq
+        ])
+        changes += [(tombstone.pop('change_seq'), tombstone['id'], 'deleted', tombstone) for tombstone in tombstones]
+    
+    changes.sort(key=lambda change: change[:2])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    
+    # Pages of an unfinished sync keep the time it began
+    position = changes[-1][:2] if changes else (since[:2] if since else (0, ''))
+    synced_at = since[2] if since and has_more else now
+    
+    return jsonify({
+        'tasks': [item for _, _, kind, item in changes if kind == 'tasks'],
+        'deleted': [item for _, _, kind, item in changes if kind == 'deleted'],
+        'cursor': encode_sync_cursor(*position, synced_at),
+        'has_more': has_more
+    }), 200
+
+@bp.cli.command('prune-tombstones')
+def prune_tombstones():
+    """Delete task tombstones older than TASK_TOMBSTONE_DAYS."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['TASK_TOMBSTONE_DAYS'])
+    removed = TaskTombstone.prune(cutoff)
+    db.session.commit()
+    click.echo(f'Removed {removed} tombstones older than {cutoff.date().isoformat()}')
+
+@bp.route('/nlp/stats', methods=['GET'])
+@jwt_required()
+def get_nlp_stats():
+    processor = get_nlp_processor()
     
     return jsonify({
-        'tasks': [task.to_dict() for task in tasks]
+        'model_loaded': processor.is_loaded,
+        'cache': processor.cache.stats() if processor.cache else None,
+        'service': current_app.extensions['parse_service'].stats()
     }), 200
 
 @bp.route('/<task_id>', methods=['GET'])
@@ -37,8 +310,9 @@ def create_task():
     data = request.get_json()
     
     # If task is in natural language, parse it
+    parse_tier = None
     if 'natural_language' in data and data['natural_language']:
-        parsed_task = nlp_processor.parse_task(data.get('title', ''))
+        parsed_task, parse_tier = current_app.extensions['parse_service'].parse(data.get('title', ''))
         data = {**parsed_task, **data}
     
     # Validate required fields
@@ -47,29 +321,262 @@ def create_task():
     
     # Create new task
     try:
-        task = Task(
-            user_id=user_id,
-            title=data['title'],
-            description=data.get('description', ''),
-            category=TaskCategory[data.get('category', 'OTHER').upper()],
-            priority=int(data.get('priority', 2)),
-            energy_level=int(data.get('energy_level', 3)),
-            estimated_duration=int(data.get('estimated_duration', 30)),
-            due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None
-        )
+        task = build_task(user_id, data)
         
         db.session.add(task)
+        db.session.flush()
+        tasks_changed(user_id, changed=[task.id])
         db.session.commit()
         
-        return jsonify({
+        response = {
             'message': 'Task created successfully',
             'task': task.to_dict()
-        }), 201
+        }
+        if parse_tier:
+            response['parse_tier'] = parse_tier
+        
+        return jsonify(response), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@bp.route('/batch', methods=['POST'])
+@jwt_required()
+def create_tasks_batch():
+    """
+    Create many tasks from natural language lines in one request
+    
+    Request body:
+    {
+        "lines": ["Gym 1 hour", "Weekly report, urgent"],  // Or "text" with one task per line
+        "batch_size": 64                                    // Optional, spaCy batch size
+    }
+    
+    Lines the rule tier can't fully resolve are parsed in batches on the parse
+    service's pool, falling back to the rule tier when it is busy; all tasks
+    are inserted in a single transaction. Each line gets its own result;
+    invalid lines are reported and skipped.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    config = current_app.config
+    
+    lines = data.get('lines')
+    if lines is None:
+        lines = (data.get('text') or '').splitlines()
+    
+    if not isinstance(lines, list):
+        return jsonify({'error': 'lines must be a list of strings'}), 400
+    
+    lines = [str(line).strip() for line in lines]
+    if not any(lines):
+        return jsonify({'error': 'No task lines given'}), 400
+    
+    if len(lines) > config['NLP_BATCH_MAX_LINES']:
+        return jsonify({'error': f"At most {config['NLP_BATCH_MAX_LINES']} lines per batch"}), 400
+    
+    try:
+        batch_size = max(1, int(data.get('batch_size', config['NLP_BATCH_SIZE'])))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'batch_size must be an integer'}), 400
+    
+    started = time.perf_counter()
+    texts = [line for line in lines if line]
+    parsed_tasks = iter(current_app.extensions['parse_service'].parse_many(texts, batch_size=batch_size))
+    
+    results = []
+    tasks = []
+    for number, line in enumerate(lines, start=1):
+        if not line:
+            results.append({'line': number, 'status': 'skipped'})
+            continue
+        
+        parsed_task, parse_tier = next(parsed_tasks)
+        try:
+            task = build_task(user_id, parsed_task)
+        except Exception as e:
+            results.append({'line': number, 'status': 'error', 'error': str(e), 'parse_tier': parse_tier})
+            continue
+        
+        tasks.append(task)
+        results.append({'line': number, 'status': 'created', 'task': task, 'parse_tier': parse_tier})
+    
+    try:
+        db.session.add_all(tasks)
+        db.session.flush()
+        tasks_changed(user_id, changed=[task.id for task in tasks])
+        
+        # Serialize before the commit expires the freshly inserted rows
+        for result in results:
+            if 'task' in result:
+                result['task'] = result['task'].to_dict()
+        
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    elapsed = time.perf_counter() - started
+    return jsonify({
+        'message': f'{len(tasks)} tasks created',
+        'created': len(tasks),
+        'failed': sum(1 for result in results if result['status'] == 'error'),
+        'results': results,
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'tasks_per_second': round(len(tasks) / elapsed, 1) if elapsed > 0 else None
+    }), 201
+
+@bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_operations():
+    """
+    Create, update, complete and delete many tasks in one transaction
+    
+    Request body:
+    {
+        "operations": [
+            {"op": "create", "task": {"title": "Write report", "priority": 3}},
+            {"op": "update", "id": "task-uuid-1", "changes": {"due_date": "2023-01-05T17:00:00"}},
+            {"op": "complete", "id": "task-uuid-2"},
+            {"op": "delete", "id": "task-uuid-3"}
+        ],
+        "atomic": false    // Optional; if true, any failed operation rolls back all of them
+    }
+    
+    Each operation gets its own result; by default failed operations are
+    reported and skipped. Creates are inserted with one executemany, deletes
+    with one DELETE, and completions credit XP and analytics once for the
+    whole batch. Each task may appear in at most one operation.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    operations = data.get('operations')
+    atomic = bool(data.get('atomic', False))
+    max_operations = current_app.config['BULK_MAX_OPERATIONS']
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    
+    if len(operations) > max_operations:
+        return jsonify({'error': f'At most {max_operations} operations per request'}), 400
+    
+    # Load every referenced task with one query
+    referenced_ids = {op.get('id') for op in operations if isinstance(op, dict) and op.get('id')}
+    tasks_by_id = {
+        task.id: task
+        for task in Task.query.filter(Task.user_id == user_id, Task.id.in_(referenced_ids))
+    } if referenced_ids else {}
+    
+    now = datetime.utcnow()
+    results = []
+    seen_ids = set()
+    new_tasks = []
+    to_complete = []
+    to_delete = []
+    
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        result = {'index': index, 'op': op}
+        results.append(result)
+        
+        try:
+            if op == 'create':
+                task = build_task(user_id, operation.get('task') or {})
+                task.id = str(uuid.uuid4())
+                new_tasks.append(task)
+                result['id'] = task.id
+            elif op in ('update', 'complete', 'delete'):
+                task_id = operation.get('id')
+                result['id'] = task_id
+                task = tasks_by_id.get(task_id)
+                if not task:
+                    raise ValueError('Task not found')
+                if task_id in seen_ids:
+                    raise ValueError('Task already has an operation in this request')
+                seen_ids.add(task_id)
+                
+                if op == 'update':
+                    changes = operation.get('changes') or {}
+                    apply_task_changes(task, changes)
+                    if 'is_completed' in changes:
+                        if changes['is_completed'] and not task.is_completed:
+                            to_complete.append(task)
+                        elif not changes['is_completed'] and task.is_completed:
+                            task.mark_incomplete()
+                elif op == 'complete':
+                    if task.is_completed:
+                        raise ValueError('Task is already completed')
+                    to_complete.append(task)
+                else:
+                    to_delete.append(task_id)
+            else:
+                raise ValueError(f'Invalid op: {op}')
+        except Exception as e:
+            message = f'Missing field: {e.args[0]}' if isinstance(e, KeyError) else str(e)
+            result.update({'status': 'error', 'error': message})
+            if atomic:
+                db.session.rollback()
+                return jsonify({'error': f'Operation {index} failed: {message}', 'results': results}), 400
+            continue
+        
+        result['status'] = 'ok'
+    
+    try:
+        if new_tasks:
+            db.session.bulk_insert_mappings(Task, [{
+                'id': task.id,
+                'user_id': user_id,
+                'title': task.title,
+                'description': task.description,
+                'category': task.category,
+                'priority': task.priority,
+                'energy_level': task.energy_level,
+                'estimated_duration': task.estimated_duration,
+                'due_date': task.due_date,
+                'xp_value': task.xp_value,
+                'is_completed': False,
+                'created_at': now,
+                'updated_at': now
+            } for task in new_tasks])
+        
+        xp_earned = 0
+        if to_complete:
+            completed, xp_earned = complete_tasks(user_id, to_complete, commit=False)
+            completed_ids = {task.id for task in completed}
+            for result in results:
+                if result['status'] == 'ok' and result['op'] == 'complete' and result['id'] not in completed_ids:
+                    result.update({'status': 'error', 'error': 'Task is already completed'})
+        
+        if to_delete:
+            uncount_completions(user_id, [tasks_by_id[task_id] for task_id in to_delete])
+            TaskCompletion.query.filter(TaskCompletion.task_id.in_(to_delete)).delete(synchronize_session=False)
+            Task.query.filter(Task.user_id == user_id, Task.id.in_(to_delete)).delete(synchronize_session=False)
+            TaskTombstone.record(user_id, to_delete)
+        
+        tasks_changed(
+            user_id,
+            changed=[result['id'] for result in results if result['status'] == 'ok' and result['op'] != 'delete'],
+            deleted=to_delete
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    counts = {}
+    for result in results:
+        if result['status'] == 'ok':
+            counts[result['op']] = counts.get(result['op'], 0) + 1
+    
+    return jsonify({
+        'message': f"{sum(counts.values())} of {len(operations)} operations applied",
+        'applied': counts,
+        'failed': sum(1 for result in results if result['status'] == 'error'),
+        'xp_earned': xp_earned,
+        'results': results
+    }), 200
+
 @bp.route('/<task_id>', methods=['PUT'])
 @jwt_required()
 def update_task(task_id):
@@ -79,30 +586,18 @@ def update_task(task_id):
     if not task:
         return jsonify({'error': 'Task not found'}), 404
     
-    data = request.get_json()
-    
-    # Update task fields
-    if 'title' in data:
-        task.title = data['title']
-    if 'description' in data:
-        task.description = data['description']
-    if 'category' in data:
-        task.category = TaskCategory[data['category'].upper()]
-    if 'priority' in data:
-        task.priority = int(data['priority'])
-    if 'energy_level' in data:
-        task.energy_level = int(data['energy_level'])
-    if 'estimated_duration' in data:
-        task.estimated_duration = int(data['estimated_duration'])
-    if 'due_date' in data:
-        task.due_date = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
-    if 'is_completed' in data:
-        if data['is_completed'] and not task.is_completed:
-            task.mark_complete()
-        else:
-            task.is_completed = data['is_completed']
+    data = request.get_json() or {}
     
     try:
+        # Update task fields
+        apply_task_changes(task, data)
+        if 'is_completed' in data:
+            if data['is_completed'] and not task.is_completed:
+                task.mark_complete(commit=False)
+            elif not data['is_completed'] and task.is_completed:
+                task.mark_incomplete()
+        
+        tasks_changed(user_id, changed=[task.id])
         db.session.commit()
         return jsonify({
             'message': 'Task updated successfully',
@@ -122,7 +617,10 @@ def delete_task(task_id):
         return jsonify({'error': 'Task not found'}), 404
     
     try:
+        uncount_completions(user_id, [task])
         db.session.delete(task)
+        TaskTombstone.record(user_id, [task.id])
+        tasks_changed(user_id, deleted=[task.id])
         db.session.commit()
         return jsonify({'message': 'Task deleted successfully'}), 200
     except Exception as e:
@@ -142,12 +640,20 @@ def complete_task(task_id):
         return jsonify({'error': 'Task is already completed'}), 400
     
     try:
-        task.mark_complete()
-        return jsonify({
+        tasks_changed(user_id, changed=[task.id])
+        completed, xp_earned = complete_tasks(user_id, [task], commit=False)
+        if not completed:
+            db.session.rollback()
+            return jsonify({'error': 'Task is already completed'}), 400
+        
+        # Serialize before the commit expires the task
+        response = {
             'message': 'Task marked as complete',
             'task': task.to_dict(),
-            'xp_earned': task.xp_value
-        }), 200
+            'xp_earned': xp_earned
+        }
+        db.session.commit()
+        return jsonify(response), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
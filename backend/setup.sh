@@ -61,8 +61,12 @@ ls -la
 # Set Python path to include the current directory
 export PYTHONPATH=$PYTHONPATH:$(pwd)
 
+# Apply pending database migrations (e.g. new indexes) before serving
+python -m flask --app "app:create_app()" db upgrade
+
 # Run gunicorn using the application factory pattern with Python module syntax
-exec python -m gunicorn --bind 0.0.0.0:${PORT:-10000} --timeout 600 --workers 4 "app:create_app()"
+# (bind address, workers, timeout and NLP model preloading are set in gunicorn.conf.py)
+exec python -m gunicorn --config gunicorn.conf.py "app:create_app()"
 EOL
 
 chmod +x start.sh
@@ -0,0 +1,130 @@
+import pytest
+from datetime import date, datetime
+from models import db, User, AnalyticsEvent, AnalyticsEventType, DailyUserStats
+from routes.cache import ResponseCache, invalidate_user_responses
+from routes.event_writer import AnalyticsEventWriter
+
+def test_productivity_metrics_cover_requested_window(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'Stretch'}, headers=headers).json['task']
+    client.post(f"/api/tasks/{task['id']}/complete", headers=headers)
+    
+    response = client.get('/api/analytics/productivity?days=7', headers=headers)
+    data = response.json['data']
+    
+    assert response.status_code == 200
+    assert len(data['completion_trend']) == 7
+    assert data['completion_trend'][-1]['date'] == date.today().isoformat()
+    assert data['completion_trend'][-1]['completed'] >= 1
+    assert sum(data['time_distribution']) == sum(day['completed'] for day in data['completion_trend'])
+
+def test_rollup_feeds_heatmap_and_weekday(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'Run', 'category': 'HEALTH'}, headers=headers).json['task']
+    client.post(f"/api/tasks/{task['id']}/complete", headers=headers)
+    
+    heatmap = client.get('/api/analytics/heatmap', headers=headers).json['data']
+    trend = client.get('/api/analytics/trend?days=7', headers=headers).json['data']
+    weekday = client.get('/api/analytics/weekday', headers=headers).json['data']
+    
+    assert len(heatmap) == 78
+    assert heatmap[-1]['count'] >= 1
+    assert trend[-1]['categories']['Health'] >= 1
+    assert weekday[date.today().weekday()]['completions'] == heatmap[-1]['count']
+
+def test_rollup_follows_deletes_reopens_and_edits(app, client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    ids = []
+    for title in ('Swim', 'Read', 'Cook'):
+        task = client.post('/api/tasks', json={'title': title, 'category': 'HEALTH'}, headers=headers).json['task']
+        client.post(f"/api/tasks/{task['id']}/complete", headers=headers)
+        ids.append(task['id'])
+    
+    client.delete(f'/api/tasks/{ids[0]}', headers=headers)
+    client.put(f'/api/tasks/{ids[1]}', json={'is_completed': False}, headers=headers)
+    client.put(f'/api/tasks/{ids[2]}', json={'category': 'study'}, headers=headers)
+    
+    def rollup(user_id):
+        rows = DailyUserStats.query.filter_by(user_id=user_id).order_by(DailyUserStats.day)
+        return [(row.day, row.completions, row.xp, row.minutes, row.category_counts()) for row in rows]
+    
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+        live = rollup(user_id)
+        DailyUserStats.rebuild(user_id)
+        db.session.commit()
+        assert rollup(user_id) == live
+
+def test_dashboard_is_cached_until_tasks_change(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    first = client.get('/api/analytics/dashboard', headers=headers)
+    etag = first.headers['ETag']
+    
+    second = client.get('/api/analytics/dashboard', headers={**headers, 'If-None-Match': etag})
+    assert second.status_code == 304
+    
+    client.post('/api/tasks', json={'title': 'Due today', 'due_date': datetime.utcnow().isoformat()}, headers=headers)
+    third = client.get('/api/analytics/dashboard', headers={**headers, 'If-None-Match': etag})
+    assert third.status_code == 200
+    assert third.headers['ETag'] != etag
+
+def test_savepoint_rollback_keeps_pending_invalidation(app):
+    cache = app.extensions['response_cache']
+    with app.app_context():
+        before = cache.generation('user-1')
+        
+        invalidate_user_responses('user-1')
+        db.session.begin_nested().rollback()
+        db.session.commit()
+    
+    assert cache.generation('user-1') == before + 1
+
+def test_response_cache_invalidation_bumps_generation():
+    cache = ResponseCache(max_size=10)
+    key = cache.make_key('user-1', '/api/analytics/heatmap?')
+    cache.set(key, b'{}', 'etag')
+    
+    assert cache.get(cache.make_key('user-1', '/api/analytics/heatmap?')) == (b'{}', 'etag')
+    
+    cache.invalidate('user-1')
+    assert cache.get(cache.make_key('user-1', '/api/analytics/heatmap?')) is None
+
+def test_event_writer_batches_and_counts_drops(app):
+    writer = AnalyticsEventWriter(app, max_queued=5, batch_size=2)
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+        before = AnalyticsEvent.query.count()
+    
+    writer.enqueue([{
+        'id': f'event-{number}',
+        'user_id': user_id,
+        'event_type': AnalyticsEventType.USER_ACTIVITY,
+        'event_data': {'number': number},
+        'created_at': datetime.utcnow()
+    } for number in range(6)])
+    writer.shutdown()
+    
+    stats = writer.stats()
+    assert (stats['written'], stats['dropped'], stats['batches']) == (5, 1, 3)
+    with app.app_context():
+        assert AnalyticsEvent.query.count() == before + 5
+
+def test_savepoint_rollback_keeps_queued_events(app):
+    writer = app.extensions['analytics_event_writer']
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+        before = writer.stats()['enqueued']
+        
+        AnalyticsEvent.record(user_id, AnalyticsEventType.USER_ACTIVITY, {})
+        db.session.begin_nested().rollback()  # as increment_or_create does on a lost insert race
+        db.session.commit()
+    
+    assert writer.stats()['enqueued'] == before + 1
+
+@pytest.fixture
+def auth_token(client):
+    response = client.post('/api/auth/login', json={
+        'username': 'testuser',
+        'password': 'testpass123'
+    })
+    return response.json['access_token']
@@ -0,0 +1,42 @@
+import pytest
+from datetime import date
+from ai.date_resolver import DateResolver
+
+REFERENCE_DATE = date(2024, 1, 10)  # A Wednesday
+
+@pytest.fixture(scope='module')
+def resolver():
+    return DateResolver()
+
+@pytest.mark.parametrize('text, due', [
+    ('Finish the report by Friday', '2024-01-12'),
+    ('Dentist next Monday', '2024-01-15'),
+    ('Pay bills in 3 days', '2024-01-13'),
+    ('Renew lease by March 14th, 2025', '2025-03-14'),
+    ('Send card 1/5', '2025-01-05'),
+    ('Call Sam tomorrow at 4:30pm', '2024-01-11T16:30:00'),
+    ('Workshop Jan 15-17', '2024-01-17'),
+    ('Review slides tomorrow 2-4pm', '2024-01-11T16:00:00'),
+    ('Clean up this weekend', '2024-01-13'),
+])
+def test_find_resolves_due_dates(resolver, text, due):
+    assert resolver.find(text, REFERENCE_DATE).due() == due
+
+@pytest.mark.parametrize('text', ['Take 2 hours', 'Meditate every morning', 'Send card 2/30'])
+def test_find_ignores_non_dates(resolver, text):
+    assert resolver.find(text, REFERENCE_DATE) is None
+
+def test_range_keeps_start(resolver):
+    resolved = resolver.find('Offsite Monday to Wednesday', REFERENCE_DATE)
+
+    assert (resolved.start.date(), resolved.end.date()) == (date(2024, 1, 15), date(2024, 1, 17))
+    assert not resolved.has_time
+
+def test_resolutions_are_memoized_per_phrase_and_day(resolver):
+    resolver.resolve.cache_clear()
+    resolver.find('by Friday', REFERENCE_DATE)
+    resolver.find('Report by friday', REFERENCE_DATE)
+    resolver.find('by Friday', date(2024, 1, 11))
+
+    info = resolver.resolve.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
@@ -0,0 +1,60 @@
+import pytest
+from routes.pubsub import EventBus, MemoryEventBackend, SQLiteEventBackend, StreamLimitReached
+
+def test_events_reach_only_the_users_streams():
+    bus = EventBus()
+    mine, _ = bus.subscribe('alice')
+    theirs, _ = bus.subscribe('bob')
+
+    bus.publish('alice', 'tasks', {'changed': ['t1'], 'deleted': []})
+
+    event = mine.get(timeout=0.1)
+    assert (event.type, event.data) == ('tasks', '{"changed":["t1"],"deleted":[]}')
+    assert theirs.get(timeout=0.01) is None
+
+def test_resume_replays_missed_events_or_asks_for_reset():
+    bus = EventBus(backend=MemoryEventBackend(max_rows=3))
+    first = bus.publish('alice', 'tasks', {}).id
+    bus.publish('bob', 'tasks', {})
+    bus.publish('alice', 'schedule', {'status': 'stale'})
+
+    resumed, reset = bus.subscribe('alice', last_event_id=first)
+    assert not reset
+    assert resumed.get(timeout=0.1).type == 'schedule'
+
+    # The first event has been pushed out of the history by now
+    bus.publish('alice', 'analytics', {})
+    bus.publish('alice', 'analytics', {})
+    _, reset = bus.subscribe('alice', last_event_id=first - 1)
+    assert reset
+
+def test_new_stream_replaces_the_oldest_beyond_the_cap():
+    bus = EventBus(max_per_user=2)
+    streams = [bus.subscribe('alice')[0] for _ in range(3)]
+
+    assert [stream.closed for stream in streams] == [True, False, False]
+    assert bus.stats()['streams'] == 2
+
+def test_streams_beyond_the_process_limit_are_rejected():
+    bus = EventBus(max_per_user=1, max_streams=2)
+    bus.subscribe('alice')
+    bus.subscribe('bob')
+
+    with pytest.raises(StreamLimitReached):
+        bus.subscribe('carol')
+
+    # Replacing one of the user's own streams doesn't add a thread
+    bus.subscribe('alice')
+    assert bus.stats()['streams'] == 2
+
+def test_shared_backend_fans_out_between_buses(tmp_path):
+    path = str(tmp_path / 'events.db')
+    publisher = EventBus(backend=SQLiteEventBackend(path))
+    listener = EventBus(backend=SQLiteEventBackend(path), poll_interval=0.01)
+    stream, _ = listener.subscribe('alice')
+
+    published = publisher.publish('alice', 'tasks', {'changed': ['t1'], 'deleted': []})
+
+    event = stream.get(timeout=1)
+    assert event.id == published.id
+    listener.unsubscribe(stream)
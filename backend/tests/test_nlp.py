@@ -0,0 +1,125 @@
+import pytest
+import spacy
+from datetime import date
+from ai.nlp_processor import KeywordMatcher, NLPProcessor
+from ai.parse_cache import ParseCache, SQLiteParseCacheBackend
+from ai.parse_service import ParseService
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher({
+        'urgent': [('priority', 3)],
+        'not urgent': [('priority', 1)],
+        'moderate': [('priority', 2), ('energy', 2)],
+        'quick': [('energy', 1)]
+    })
+
+def test_keyword_matcher_prefers_longest_phrase(matcher):
+    assert matcher.find('Call the bank, not urgent') == [('priority', 1)]
+
+def test_keyword_matcher_finds_all_tags_in_one_pass(matcher):
+    assert matcher.find('Quick and moderate, URGENT') == [
+        ('energy', 1), ('priority', 2), ('energy', 2), ('priority', 3)
+    ]
+
+def test_keyword_matcher_respects_word_boundaries(matcher):
+    assert matcher.find('quickly finish the urgently needed slides') == []
+    assert matcher.remove('Fix login, urgent').strip(' ,') == 'Fix login'
+
+def test_parse_cache_lru_and_ttl():
+    cache = ParseCache(max_size=2, ttl_seconds=60)
+    key = ParseCache.make_key('gym  1 hour ', date(2024, 1, 1))
+
+    assert key == ParseCache.make_key('gym 1 hour', date(2024, 1, 1))
+    assert key != ParseCache.make_key('gym 1 hour', date(2024, 1, 2))
+
+    cache.set(key, {'title': 'gym'})
+    cache.set('b', {})
+    cache.get(key)
+    cache.set('c', {})
+
+    assert cache.get(key) == {'title': 'gym'}
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1
+
+def test_parse_cache_shared_backend(tmp_path):
+    backend = SQLiteParseCacheBackend(str(tmp_path / 'parse_cache.db'))
+    writer = ParseCache(backend=backend)
+    reader = ParseCache(backend=backend)
+
+    writer.set('key', {'priority': 3})
+
+    assert reader.get('key') == {'priority': 3}
+    assert reader.stats()['shared_hits'] == 1
+
+def test_rule_tier_resolves_common_input_without_model():
+    processor = NLPProcessor()
+    task, tier = processor.parse('Gym workout tomorrow, quick, 45 minutes, urgent',
+                                 reference_date=date(2024, 1, 10))
+
+    assert tier == 'rules'
+    assert not processor.is_loaded
+    assert task['category'] == 'Health'
+    assert task['priority'] == 3
+    assert task['energy_level'] == 1
+    assert task['estimated_duration'] == 45
+    assert task['due_date'] == '2024-01-11'
+
+@pytest.mark.parametrize('text, needs_model', [
+    ('Write report', False),
+    ('Write report next week', False),
+    ('Write report by Friday', False),
+    ('Write report by the 5th', True),
+])
+def test_rule_tier_defers_unresolved_dates_to_model(text, needs_model):
+    _, result = NLPProcessor().parse_rule_tier(text, reference_date=date(2024, 1, 10))
+
+    assert result == needs_model
+
+def test_parse_service_falls_back_to_rules_when_saturated():
+    service = ParseService(NLPProcessor(), workers=1, max_pending=1)
+    service._slots.acquire()
+
+    task, source = service.parse('Call mom by the 5th, not urgent')
+
+    assert source == 'rules'
+    assert task['priority'] == 1
+    assert service.stats()['fallback_saturated'] == 1
+    assert not service.stats()['started']
+
+def test_parse_service_uses_rules_while_the_pool_warms_up():
+    service = ParseService(NLPProcessor(), workers=1)
+    service.warm()
+
+    task, source = service.parse('Call mom by the 5th, not urgent')
+    service.shutdown()
+
+    assert source == 'rules'
+    assert service.stats()['fallback_warming'] == 1
+
+def test_parse_service_parses_on_threads_with_a_preloaded_model():
+    processor = NLPProcessor()
+    processor._nlp = spacy.blank('en')  # stands in for the model loaded by NLP_PRELOAD
+    service = ParseService(processor, workers=2)
+    service.warm()
+    stats = service.stats()
+    service.shutdown()
+
+    assert (stats['pool'], stats['ready']) == ('threads', True)
+
+def test_parse_service_batches_model_parses_and_sheds_when_saturated():
+    processor = NLPProcessor()
+    processor._nlp = spacy.blank('en')
+    service = ParseService(processor, workers=1, max_pending=1)
+
+    results = service.parse_many(['Gym 45 min', 'Call mom by the 5th', 'Pay rent by the 9th'],
+                                 reference_date=date(2024, 1, 10))
+    assert [tier for _, tier in results] == ['rules', 'model', 'model']
+
+    service._slots.acquire()
+    results = service.parse_many(['Email Bob by the 6th', 'Book dentist by the 7th'],
+                                 reference_date=date(2024, 1, 10))
+    service.shutdown()
+
+    assert [tier for _, tier in results] == ['rules', 'rules']
+    assert service.stats()['fallback_saturated'] == 2
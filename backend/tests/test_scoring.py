@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime, timedelta
+from ai.scoring import TaskColumns, urgency_scores, top_k, rank
+
+NOW = datetime(2024, 1, 1, 12, 0)
+
+def make_columns():
+    return TaskColumns.from_rows([
+        ('low', 1, None, 2, 30),
+        ('high', 3, None, 3, 30),
+        ('due-soon', 2, NOW + timedelta(hours=2), 3, 30),
+        ('overdue', 2, NOW - timedelta(days=3), 5, 60)
+    ])
+
+def test_due_dates_raise_urgency():
+    columns = make_columns()
+    scores = urgency_scores(columns, NOW)
+
+    order = [columns.ids[i] for i in top_k(scores, 4)]
+    assert order == ['overdue', 'due-soon', 'high', 'low']
+
+def test_top_k_returns_best_first():
+    scores = urgency_scores(make_columns(), NOW)
+
+    assert list(top_k(scores, 2)) == [3, 2]
+    assert len(top_k(scores, 10)) == 4
+
+def test_available_energy_penalizes_demanding_tasks():
+    columns = make_columns()
+    scores = urgency_scores(columns, NOW, available_energy=2)
+
+    assert scores[3] < urgency_scores(columns, NOW)[3]
+    assert scores[0] == urgency_scores(columns, NOW)[0]
+
+def test_rank_breaks_ties_by_duration():
+    columns = TaskColumns.from_dicts([
+        {'id': 'long', 'priority': 2, 'estimated_duration': 90},
+        {'id': 'short', 'priority': 2, 'estimated_duration': 15}
+    ])
+
+    assert [columns.ids[i] for i in rank(columns, NOW)] == ['short', 'long']
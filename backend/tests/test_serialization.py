@@ -0,0 +1,30 @@
+import pytest
+from datetime import date, datetime
+from flask import Flask
+from models import TaskCategory
+from routes.serialization import FastJSONProvider, json_default
+
+def test_provider_encodes_column_values_like_to_dict():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    row = {
+        'due_date': datetime(2024, 1, 5, 17, 30, 0, 250000),
+        'day': date(2024, 1, 5),
+        'category': TaskCategory.WORK,
+        'priority': 3
+    }
+
+    with app.app_context():
+        response = app.json.response(row)
+
+    assert response.mimetype == 'application/json'
+    assert app.json.loads(response.get_data()) == {
+        'due_date': '2024-01-05T17:30:00.250000',
+        'day': '2024-01-05',
+        'category': 'Work',
+        'priority': 3
+    }
+
+def test_json_default_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        json_default(object())
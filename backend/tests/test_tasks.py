@@ -1,6 +1,7 @@
 import pytest
 import json
 from datetime import datetime, timedelta
+from models import db, Task, record_task_changes
 
 def test_create_task(client, auth_token):
     headers = {'Authorization': f'Bearer {auth_token}'}
@@ -26,6 +27,170 @@ def test_get_tasks(client, auth_token):
     assert 'tasks' in response.json
     assert isinstance(response.json['tasks'], list)
 
+def test_get_tasks_pages_with_cursor(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    for title in ('Stretch', 'Email landlord', 'Book dentist'):
+        client.post('/api/tasks', json={'title': title, 'category': 'personal'}, headers=headers)
+    
+    seen = []
+    cursor = None
+    while True:
+        params = {'limit': 2, 'category': 'personal', 'fields': 'id,title'}
+        if cursor:
+            params['cursor'] = cursor
+        response = client.get('/api/tasks', query_string=params, headers=headers)
+        assert response.status_code == 200
+        assert all(set(task) == {'id', 'title'} for task in response.json['tasks'])
+        seen += [task['id'] for task in response.json['tasks']]
+        cursor = response.json['next_cursor']
+        if not cursor:
+            break
+    
+    assert len(seen) == len(set(seen)) == 3
+
+def test_task_changes_since_cursor(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    kept = client.post('/api/tasks', json={'title': 'Water plants'}, headers=headers).json['task']
+    dropped = client.post('/api/tasks', json={'title': 'Cancel gym'}, headers=headers).json['task']
+    cursor = client.get('/api/tasks/changes', headers=headers).json['cursor']
+    
+    client.put(f"/api/tasks/{kept['id']}", json={'priority': 3}, headers=headers)
+    client.delete(f"/api/tasks/{dropped['id']}", headers=headers)
+    
+    response = client.get('/api/tasks/changes', query_string={'since': cursor}, headers=headers)
+    assert response.status_code == 200
+    assert [task['id'] for task in response.json['tasks']] == [kept['id']]
+    assert [task['id'] for task in response.json['deleted']] == [dropped['id']]
+    
+    idle = client.get('/api/tasks/changes', query_string={'since': response.json['cursor']}, headers=headers)
+    assert idle.json['tasks'] == [] and idle.json['deleted'] == []
+
+def test_task_changes_include_late_commits_with_older_timestamps(app, client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'Pay rent'}, headers=headers).json['task']
+    cursor = client.get('/api/tasks/changes', headers=headers).json['cursor']
+    
+    # A transaction that stamped updated_at before the cursor was issued but commits after it
+    with app.app_context():
+        late = db.session.get(Task, task['id'])
+        late.title = 'Pay rent early'
+        late.updated_at = datetime.utcnow() - timedelta(minutes=5)
+        record_task_changes(late.user_id, changed=[late.id])
+        db.session.commit()
+    
+    response = client.get('/api/tasks/changes', query_string={'since': cursor}, headers=headers)
+    assert [task['title'] for task in response.json['tasks']] == ['Pay rent early']
+
+def test_create_tasks_batch(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.post('/api/tasks/batch', json={
+        'text': 'Gym 45 min\n\nWeekly report, urgent'
+    }, headers=headers)
+    
+    assert response.status_code == 201
+    assert response.json['created'] == 2
+    assert [r['status'] for r in response.json['results']] == ['created', 'skipped', 'created']
+    assert response.json['results'][0]['task']['estimated_duration'] == 45
+
+def test_generate_schedule_is_served_from_storage_until_tasks_change(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    client.post('/api/tasks', json={'title': 'Write report', 'estimated_duration': 60}, headers=headers)
+    
+    first = client.post('/api/scheduler/generate', json={}, headers=headers)
+    etag = first.headers['ETag']
+    assert first.json['cached'] is False
+    
+    second = client.post('/api/scheduler/generate', json={}, headers={**headers, 'If-None-Match': etag})
+    assert second.status_code == 304
+    
+    client.post('/api/tasks', json={'title': 'Review slides'}, headers=headers)
+    third = client.post('/api/scheduler/generate', json={}, headers={**headers, 'If-None-Match': etag})
+    assert third.status_code == 200
+    assert third.json['cached'] is False
+    assert third.headers['ETag'] != etag
+
+def test_complete_task_credits_xp_once(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'File taxes', 'priority': 3}, headers=headers).json['task']
+    
+    first = client.post(f"/api/tasks/{task['id']}/complete", headers=headers)
+    assert first.status_code == 200
+    assert first.json['xp_earned'] == task['xp_value']
+    assert first.json['task']['is_completed'] is True
+    
+    second = client.post(f"/api/tasks/{task['id']}/complete", headers=headers)
+    assert second.status_code == 400
+
+def test_bulk_operations(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    first = client.post('/api/tasks', json={'title': 'Read paper'}, headers=headers).json['task']
+    second = client.post('/api/tasks', json={'title': 'Old errand'}, headers=headers).json['task']
+    
+    response = client.post('/api/tasks/bulk', json={'operations': [
+        {'op': 'create', 'task': {'title': 'Plan sprint', 'priority': 3}},
+        {'op': 'complete', 'id': first['id']},
+        {'op': 'delete', 'id': second['id']},
+        {'op': 'complete', 'id': 'missing'}
+    ]}, headers=headers)
+    
+    assert response.status_code == 200
+    assert [r['status'] for r in response.json['results']] == ['ok', 'ok', 'ok', 'error']
+    assert response.json['xp_earned'] == first['xp_value']
+    
+    ids = {task['id'] for task in client.get('/api/tasks', headers=headers).json['tasks']}
+    assert response.json['results'][0]['id'] in ids
+    assert second['id'] not in ids
+
+def test_bulk_update_with_invalid_value_leaves_task_unchanged(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'Renew passport'}, headers=headers).json['task']
+    
+    response = client.post('/api/tasks/bulk', json={'operations': [
+        {'op': 'update', 'id': task['id'], 'changes': {'title': 'Renamed', 'category': 'hobby'}}
+    ]}, headers=headers)
+    
+    assert response.status_code == 200
+    assert response.json['results'][0]['status'] == 'error'
+    
+    tasks = client.get('/api/tasks', query_string={'fields': 'id,title,category'}, headers=headers).json['tasks']
+    stored = next(item for item in tasks if item['id'] == task['id'])
+    assert (stored['title'], stored['category']) == ('Renew passport', task['category'])
+
+def test_bulk_update_reopens_completed_task(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'Water plants'}, headers=headers).json['task']
+    client.post(f"/api/tasks/{task['id']}/complete", headers=headers)
+    
+    response = client.post('/api/tasks/bulk', json={'operations': [
+        {'op': 'update', 'id': task['id'], 'changes': {'is_completed': False}}
+    ]}, headers=headers)
+    
+    assert response.json['results'][0]['status'] == 'ok'
+    tasks = client.get('/api/tasks', query_string={'fields': 'id,is_completed,completed_at'}, headers=headers).json['tasks']
+    stored = next(item for item in tasks if item['id'] == task['id'])
+    assert (stored['is_completed'], stored['completed_at']) == (False, None)
+
+def test_create_with_invalid_category_names_the_category(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    
+    response = client.post('/api/tasks/bulk', json={'operations': [
+        {'op': 'create', 'task': {'title': 'Paint fence', 'category': 'nope'}}
+    ]}, headers=headers)
+    
+    assert response.json['results'][0]['error'] == 'Invalid category: nope'
+
+def test_update_with_invalid_category_is_rejected(client, auth_token):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    task = client.post('/api/tasks', json={'title': 'Book flights'}, headers=headers).json['task']
+    cursor = client.get('/api/tasks/changes', headers=headers).json['cursor']
+    
+    response = client.put(f"/api/tasks/{task['id']}", json={'category': 'hobby'}, headers=headers)
+    
+    assert response.status_code == 400
+    assert response.json['error'] == 'Invalid category: hobby'
+    changes = client.get('/api/tasks/changes', query_string={'since': cursor}, headers=headers).json
+    assert changes['tasks'] == []
+
 @pytest.fixture
 def auth_token(client):
     # Login to get token
@@ -32,12 +32,20 @@ export const TaskProvider = ({ children }) => {
       setError(null);
       
       try {
-        const response = await api.getTasks({
-          status: filters.status,
-          priority: filters.priority,
-          category: filters.category,
-        });
-        setTasks(response.data);
+        // GET /api/tasks is paginated; follow next_cursor to the last page
+        const allTasks = [];
+        let cursor = null;
+        do {
+          const response = await api.getTasks({
+            status: filters.status,
+            priority: filters.priority,
+            category: filters.category,
+            cursor,
+          });
+          allTasks.push(...response.data.tasks);
+          cursor = response.data.next_cursor;
+        } while (cursor);
+        setTasks(allTasks);
       } catch (err) {
         console.error('Error fetching tasks:', err);
         setError(err);
@@ -157,9 +165,9 @@ export const TaskProvider = ({ children }) => {
   };
 
   // Reschedule a task
-  const rescheduleTask = async (taskId, newTime, currentSchedule) => {
+  const rescheduleTask = async (taskId, newTime) => {
     try {
-      const response = await api.rescheduleTask(taskId, newTime, currentSchedule);
+      const response = await api.rescheduleTask(taskId, newTime);
       // Update the task with new schedule
       setTasks(prev => 
         prev.map(task => 
@@ -79,8 +79,8 @@ export const completeTask = (id) =>
 export const generateSchedule = (params = {}) => 
   api.post('/scheduler/generate', params);
 
-export const rescheduleTask = (taskId, newTime, currentSchedule) => 
-  api.post('/scheduler/reschedule', { taskId, newTime, currentSchedule });
+export const rescheduleTask = (taskId, newTime, operation = 'move') => 
+  api.post('/scheduler/reschedule', { operation, task_id: taskId, new_start_time: newTime });
 
 // Analytics APIs
 export const trackEvent = (eventData) =>